@@ -0,0 +1,37 @@
+# backend/app/admin.py
+# Administración de usuarios desde la línea de comandos (la API no tiene roles):
+#
+#     cd backend
+#     python -m app.admin disable <usuario>
+#     python -m app.admin enable <usuario>
+#
+# Usa la misma configuración de Redis que el backend; los workers en marcha
+# descartan los tokens cacheados del usuario al recibir la invalidación.
+import argparse
+import asyncio
+import sys
+
+from . import auth, crud
+
+
+async def run(args: argparse.Namespace) -> int:
+    await crud.init_db_connection()
+    try:
+        if not await auth.set_user_disabled(args.username, disabled=args.action == "disable"):
+            print(f"Usuario no encontrado: {args.username}", file=sys.stderr)
+            return 1
+        print(f"Usuario {args.username}: {'deshabilitado' if args.action == 'disable' else 'habilitado'}")
+        return 0
+    finally:
+        await crud.close_db_connection()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Habilita o deshabilita usuarios del backend")
+    parser.add_argument("action", choices=["disable", "enable"])
+    parser.add_argument("username")
+    sys.exit(asyncio.run(run(parser.parse_args())))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,34 +1,117 @@
+import asyncio
 import os
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional, Dict
+from typing import Optional, Tuple
 from jose import JWTError, jwt
 from passlib.context import CryptContext
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Query, status
 from fastapi.security import OAuth2PasswordBearer
 
-from . import models
+from . import crud, models
+from .users import USERS_KEY, UserStore, create_user_store
 
 # Configuración (mejor en variables de entorno)
 JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY", "supersecretkey") # CAMBIA ESTO EN PRODUCCIÓN
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 30))
+# bcrypt es deliberadamente lento (~100-300 ms): corre en un pool propio y
+# acotado para que una ráfaga de logins no congele el event loop ni agote los
+# hilos de Redis.
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", 2))
+# Caché de tokens ya verificados. Deshabilitar un usuario la invalida en todos
+# los workers por pub/sub (TOKEN_INVALIDATION_CHANNEL); si un mensaje se pierde
+# (p.ej. el suscriptor se estaba reconectando), el TTL acota el retraso.
+TOKEN_CACHE_MAX_ENTRIES = int(os.getenv("TOKEN_CACHE_MAX_ENTRIES", 10000))
+TOKEN_CACHE_TTL_SECONDS = float(os.getenv("TOKEN_CACHE_TTL_SECONDS", 30))
+TOKEN_INVALIDATION_CHANNEL = os.getenv("TOKEN_INVALIDATION_CHANNEL", f"{USERS_KEY}:invalidate")
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token", auto_error=False)
 
-# Base de datos de usuarios en memoria (SOLO PARA PoC)
-fake_users_db: Dict[str, models.UserInDB] = {}
+password_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
 
-def init_fake_users_db():
-    # Crear un usuario de ejemplo
-    hashed_password = get_password_hash("testpassword")
-    fake_users_db["testuser"] = models.UserInDB(
+# Usuarios (Redis por defecto, compartidos entre workers; ver users.py)
+user_store: UserStore = create_user_store()
+
+
+class TokenCache:
+    """LRU de token -> usuario ya verificado, con expiración por entrada.
+
+    Cada entrada vence con el token o tras TOKEN_CACHE_TTL_SECONDS, lo que
+    ocurra primero.
+    """
+
+    def __init__(self, max_entries: int = TOKEN_CACHE_MAX_ENTRIES, ttl: float = TOKEN_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[models.User, float]]" = OrderedDict()
+
+    def get(self, token: str) -> Optional[models.User]:
+        entry = self._entries.get(token)
+        if entry is None:
+            return None
+        user, expires_at = entry
+        if expires_at <= time.time():
+            del self._entries[token]
+            return None
+        self._entries.move_to_end(token)
+        return user
+
+    def put(self, token: str, user: models.User, token_expires_at: float):
+        self._entries[token] = (user, min(token_expires_at, time.time() + self.ttl))
+        self._entries.move_to_end(token)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate_user(self, username: str):
+        for token in [t for t, (user, _) in self._entries.items() if user.username == username]:
+            del self._entries[token]
+
+    def clear(self):
+        self._entries.clear()
+
+
+token_cache = TokenCache()
+_invalidation_listener = None
+
+
+def start_token_invalidation_listener():
+    """Escucha en un hilo las invalidaciones publicadas por set_user_disabled (en cualquier worker).
+
+    Usa una conexión propia: la suscripción la ocupa mientras viva el proceso.
+    """
+    global _invalidation_listener
+    loop = asyncio.get_running_loop()
+
+    def on_message(message):
+        loop.call_soon_threadsafe(token_cache.invalidate_user, message["data"])
+
+    pubsub = crud.connect_redis(1).pubsub(ignore_subscribe_messages=True)
+    pubsub.subscribe(**{TOKEN_INVALIDATION_CHANNEL: on_message})
+    _invalidation_listener = pubsub.run_in_thread(sleep_time=1.0, daemon=True)
+
+
+def stop_token_invalidation_listener():
+    global _invalidation_listener
+    if _invalidation_listener is not None:
+        _invalidation_listener.stop()
+        _invalidation_listener = None
+
+
+async def init_fake_users_db():
+    # Crear un usuario de ejemplo (si otro worker ya lo creó, se respeta)
+    hashed_password = await get_password_hash_async("testpassword")
+    await user_store.add_if_missing(models.UserInDB(
         username="testuser",
         email="testuser@example.com",
         full_name="Test User",
         hashed_password=hashed_password,
         disabled=False
-    )
+    ))
 
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
@@ -36,14 +119,33 @@ def verify_password(plain_password, hashed_password):
 def get_password_hash(password):
     return pwd_context.hash(password)
 
-def authenticate_user(db: dict, username: str, password: str) -> Optional[models.User]:
-    user_in_db = db.get(username)
+async def verify_password_async(plain_password, hashed_password) -> bool:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(password_executor, verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password) -> str:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(password_executor, get_password_hash, password)
+
+async def authenticate_user(username: str, password: str) -> Optional[models.User]:
+    user_in_db = await user_store.get(username)
     if not user_in_db:
         return None
-    if not verify_password(password, user_in_db.hashed_password):
+    if not await verify_password_async(password, user_in_db.hashed_password):
         return None
     return models.User(**user_in_db.dict())
 
+async def set_user_disabled(username: str, disabled: bool = True) -> bool:
+    """Habilita o deshabilita un usuario y descarta sus tokens cacheados en todos los workers."""
+    user_in_db = await user_store.get(username)
+    if user_in_db is None:
+        return False
+    user_in_db.disabled = disabled
+    await user_store.put(user_in_db)
+    token_cache.invalidate_user(username)
+    await crud.run_db(crud.redis_conn.publish, TOKEN_INVALIDATION_CHANNEL, username)
+    return True
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -55,6 +157,10 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     return encoded_jwt
 
 async def get_current_user(token: str = Depends(oauth2_scheme)) -> models.User:
+    cached_user = token_cache.get(token)
+    if cached_user is not None:
+        return cached_user
+
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -69,13 +175,25 @@ async def get_current_user(token: str = Depends(oauth2_scheme)) -> models.User:
     except JWTError:
         raise credentials_exception
     
-    user_dict = fake_users_db.get(token_data.username)
-    if user_dict is None:
+    user_dict = await user_store.get(token_data.username)
+    if user_dict is None or user_dict.disabled:
+        # Un usuario deshabilitado invalida sus tokens (y no entra en la caché)
         raise credentials_exception
     user = models.User(**user_dict.dict()) # Convert UserInDB to User
+    token_cache.put(token, user, payload.get("exp") or time.time())
     return user
 
 async def get_current_active_user(current_user: models.User = Depends(get_current_user)):
     if current_user.disabled:
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
+
+async def get_current_active_user_or_query_token(
+    header_token: Optional[str] = Depends(optional_oauth2_scheme),
+    token: Optional[str] = Query(None, description="Para EventSource, que no puede enviar cabeceras"),
+) -> models.User:
+    """Como get_current_active_user, pero acepta también el token en `?token=`."""
+    if not header_token and not token:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated",
+                            headers={"WWW-Authenticate": "Bearer"})
+    return await get_current_active_user(await get_current_user(header_token or token))
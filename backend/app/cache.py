@@ -0,0 +1,80 @@
+# backend/app/cache.py
+import asyncio
+import os
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+GRAPH_CACHE_MAX_ENTRIES = int(os.getenv("GRAPH_CACHE_MAX_ENTRIES", 8))
+GRAPH_CACHE_MAX_BYTES = int(os.getenv("GRAPH_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+
+
+class ResponseCache:
+    """LRU en memoria de respuestas ya serializadas, acotada por entradas y bytes.
+
+    Las claves incluyen la versión del grafo (guardada en Redis), así que una
+    entrada nunca se invalida: simplemente deja de pedirse cuando otro worker o
+    este mismo incrementa la versión, y el LRU la expulsa.
+    """
+
+    def __init__(self, max_entries: int = GRAPH_CACHE_MAX_ENTRIES, max_bytes: int = GRAPH_CACHE_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Hashable, bytes]" = OrderedDict()
+        self._size = 0
+        self._building: Dict[Hashable, asyncio.Lock] = {}
+
+    def get(self, key: Hashable) -> Optional[bytes]:
+        body = self._entries.get(key)
+        if body is not None:
+            self._entries.move_to_end(key)
+        return body
+
+    def put(self, key: Hashable, body: bytes):
+        if len(body) > self.max_bytes:
+            return  # No cabe: mejor no expulsar todo lo demás por una sola respuesta
+        if key in self._entries:
+            self._size -= len(self._entries.pop(key))
+        self._entries[key] = body
+        self._size += len(body)
+        while len(self._entries) > self.max_entries or self._size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= len(evicted)
+
+    async def get_or_build(self, key: Hashable, build: Callable[[], Awaitable[bytes]]) -> bytes:
+        """Devuelve la entrada o la construye una sola vez aunque lleguen peticiones concurrentes."""
+        body = self.get(key)
+        if body is not None:
+            return body
+        lock = self._building.setdefault(key, asyncio.Lock())
+        try:
+            async with lock:
+                body = self.get(key)
+                if body is None:
+                    body = await build()
+                    self.put(key, body)
+                return body
+        finally:
+            if not lock.locked():
+                self._building.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+        self._size = 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {"entries": len(self._entries), "bytes": self._size,
+                "max_entries": self.max_entries, "max_bytes": self.max_bytes}
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Compara la cabecera If-None-Match con un ETag (comparación débil, RFC 7232)."""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    if "*" in candidates:
+        return True
+    bare = etag[2:] if etag.startswith("W/") else etag
+    return any((tag[2:] if tag.startswith("W/") else tag) == bare for tag in candidates)
+
+
+graph_cache = ResponseCache()
@@ -0,0 +1,264 @@
+# backend/app/changes.py
+# Feed de cambios en tiempo real (Server-Sent Events).
+#
+# Las escrituras publican deltas en el stream {graph}:changes (crud.publish_changes).
+# Cada worker tiene un único lector: un XREAD bloqueante sobre los streams de
+# todos los grafos con clientes conectados ({stream: último id, ...}), que reparte
+# las entradas a las colas de los clientes de cada grafo. El costo en Redis no
+# crece con el número de clientes ni de grafos: un hilo y una conexión propios
+# por worker, fuera del executor y del pool de las consultas normales
+# (crud.run_db). Cuando un grafo gana su primer cliente, el lector se despierta
+# con una entrada en su stream privado de aviso para incluirlo en el siguiente
+# XREAD. El id de cada evento SSE es el id
+# de la entrada del stream: al reconectar, EventSource manda Last-Event-ID y se
+# reenvía lo que falte. Si eso ya se recortó del stream (MAXLEN), o el cliente se queda atrás y
+# su cola se llena, recibe un 'reset' y debe recargar el grafo.
+#
+# Uso en el cliente: conectarse, esperar el evento 'ready', cargar /graph-data/
+# y aplicar los deltas que lleguen (son idempotentes: upsert/delete por id).
+# Borrar un nodo borra sus aristas: 'nodes_deleted' no enumera las aristas.
+import asyncio
+import functools
+import json
+import logging
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Dict, Optional, Set, Tuple
+
+import redis
+
+from . import crud
+from .observability import CHANGE_FEED_CLIENTS
+
+logger = logging.getLogger(__name__)
+
+CHANGES_HEARTBEAT_SECONDS = float(os.getenv("CHANGES_HEARTBEAT_SECONDS", 15))
+CHANGES_CLIENT_QUEUE = int(os.getenv("CHANGES_CLIENT_QUEUE", 1000))  # entradas pendientes por cliente
+# Por debajo del timeout de socket de Redis, si hay uno configurado.
+READ_BLOCK_MS = int(min(5000, (crud.REDIS_SOCKET_TIMEOUT or 10) * 500))
+READ_COUNT = 100
+RETRY_MS = 3000  # sugerencia de reconexión para EventSource
+WAKE_MAXLEN = 10
+
+
+class ChangeEvent:
+    __slots__ = ("id", "type", "items")
+
+    def __init__(self, entry_id: str, change_type: str, items: Optional[str] = None):
+        self.id = entry_id
+        self.type = change_type
+        self.items = items  # JSON ya serializado
+
+    @classmethod
+    def from_entry(cls, entry_id: str, fields: Dict[str, str]) -> "ChangeEvent":
+        return cls(entry_id, fields.get("type", "reset"), fields.get("items"))
+
+    def encode(self) -> str:
+        data = f'{{"items": {self.items}}}' if self.items is not None else "{}"
+        return f"id: {self.id}\nevent: {self.type}\ndata: {data}\n\n"
+
+
+def stream_id_key(entry_id: str) -> Tuple[int, int]:
+    """'1700000000000-3' -> (1700000000000, 3), para comparar ids del stream."""
+    ms, _, seq = entry_id.partition("-")
+    return int(ms), int(seq or 0)
+
+
+async def latest_id(stream_key: str) -> str:
+    entries = await crud.run_db(crud.redis_conn.xrevrange, stream_key, count=1)
+    return entries[0][0] if entries else "0-0"
+
+
+class ChangeReader:
+    """XREAD bloqueante único del worker sobre los streams de todos los feeds abiertos."""
+
+    def __init__(self):
+        self.positions: Dict[str, str] = {}  # stream -> último id leído
+        self.wake_key = f"{crud.CHANGES_SUFFIX}:wake:{uuid.uuid4().hex}"
+        self._conn: Optional[redis.Redis] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def add(self, stream_key: str, last_id: str):
+        self.positions[stream_key] = last_id
+        if self._task is None or self._task.done():
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="changes")
+                self._conn = crud.connect_redis(1)
+            self._task = asyncio.create_task(self._read_loop())
+        else:
+            # El XREAD en curso no incluye el stream nuevo: despertarlo.
+            await crud.run_db(crud.redis_conn.xadd, self.wake_key, {"stream": stream_key},
+                              maxlen=WAKE_MAXLEN, approximate=False)
+
+    def remove(self, stream_key: str):
+        self.positions.pop(stream_key, None)
+
+    async def _read_loop(self):
+        loop = asyncio.get_running_loop()
+        wake_id = "0-0"
+        while True:
+            streams = {self.wake_key: wake_id, **self.positions}
+            call = functools.partial(self._conn.xread, streams, count=READ_COUNT, block=READ_BLOCK_MS)
+            try:
+                entries = await loop.run_in_executor(self._executor, call)
+            except asyncio.CancelledError:
+                raise
+            except redis.exceptions.RedisError as e:
+                logger.warning("Error leyendo el feed de cambios: %s", e)
+                await asyncio.sleep(1)
+                continue
+            for stream_key, messages in entries or []:
+                if stream_key == self.wake_key:
+                    wake_id = messages[-1][0]
+                    continue
+                position = self.positions.get(stream_key)
+                feed = _feeds.get(stream_key)
+                for entry_id, fields in messages:
+                    # El feed pudo cerrarse o reabrirse (con otra posición) durante el XREAD.
+                    if position is None or stream_id_key(entry_id) <= stream_id_key(position):
+                        continue
+                    position = self.positions[stream_key] = entry_id
+                    if feed is not None:
+                        feed.dispatch(ChangeEvent.from_entry(entry_id, fields))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._executor is not None:
+            # El hilo termina su XREAD en curso como mucho tras READ_BLOCK_MS.
+            self._executor.shutdown(wait=False)
+            self._conn.connection_pool.disconnect()
+            self._conn = self._executor = None
+            try:
+                await crud.run_db(crud.redis_conn.delete, self.wake_key)
+            except redis.exceptions.RedisError:
+                pass
+        self.positions.clear()
+
+
+class ChangeFeed:
+    """Colas de los clientes de este worker suscritos al stream de un grafo."""
+
+    def __init__(self, stream_key: str):
+        self.stream_key = stream_key
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._registered: Optional[asyncio.Future] = None
+
+    async def subscribe(self) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=CHANGES_CLIENT_QUEUE)
+        self._subscribers.add(queue)  # Antes de esperar: así el feed no se cierra mientras tanto
+        CHANGE_FEED_CLIENTS.inc()
+        try:
+            if self._registered is None:
+                self._registered = asyncio.ensure_future(self._register())
+            # El lector ya fijó la posición del stream: nada publicado después se pierde.
+            await asyncio.shield(self._registered)
+        except BaseException:
+            self.unsubscribe(queue)
+            raise
+        return queue
+
+    async def _register(self):
+        try:
+            last_id = await latest_id(self.stream_key)
+        except BaseException:
+            self._registered = None  # El siguiente cliente lo vuelve a intentar
+            raise
+        if self._subscribers:
+            await _reader.add(self.stream_key, last_id)
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        if queue in self._subscribers:
+            self._subscribers.discard(queue)
+            CHANGE_FEED_CLIENTS.dec()
+        if not self._subscribers and _feeds.get(self.stream_key) is self:
+            # Sin clientes no hace falta seguir leyendo el stream de este grafo.
+            _reader.remove(self.stream_key)
+            _feeds.pop(self.stream_key, None)
+
+    def dispatch(self, event: ChangeEvent):
+        for queue in list(self._subscribers):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # Cliente demasiado lento: en lugar de los deltas pendientes, un 'reset'.
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(ChangeEvent(event.id, "reset"))
+
+
+_reader = ChangeReader()
+_feeds: Dict[str, ChangeFeed] = {}
+
+
+def get_feed(stream_key: str) -> ChangeFeed:
+    feed = _feeds.get(stream_key)
+    if feed is None:
+        feed = _feeds[stream_key] = ChangeFeed(stream_key)
+    return feed
+
+
+async def stop_all():
+    await _reader.stop()
+    _feeds.clear()
+
+
+async def replay(stream_key: str, after_id: str) -> AsyncIterator[ChangeEvent]:
+    """Entradas posteriores a `after_id`; un 'reset' si ya no están en el stream."""
+    oldest = await crud.run_db(crud.redis_conn.xrange, stream_key, count=1)
+    newest = await latest_id(stream_key)
+    after = stream_id_key(after_id)
+    if after >= stream_id_key(newest):
+        if after > stream_id_key(newest):  # id de otro stream (p.ej. Redis reiniciado)
+            yield ChangeEvent(newest, "reset")
+        return
+    if not oldest or after < stream_id_key(oldest[0][0]):
+        # La última entrada que vio el cliente ya se recortó: pudo perder otras.
+        yield ChangeEvent(newest, "reset")
+        return
+    start = after_id
+    while True:
+        entries = await crud.run_db(crud.redis_conn.xrange, stream_key, min=start, max=newest, count=READ_COUNT)
+        entries = [(entry_id, fields) for entry_id, fields in entries if stream_id_key(entry_id) > after]
+        if not entries:
+            return
+        for entry_id, fields in entries:
+            yield ChangeEvent.from_entry(entry_id, fields)
+        after = stream_id_key(entries[-1][0])
+        start = entries[-1][0]
+
+
+async def event_stream(request, last_event_id: Optional[str]) -> AsyncIterator[str]:
+    """Cuerpo de la respuesta SSE de un cliente (del grafo de la petición)."""
+    stream_key = crud.graph_key(crud.CHANGES_SUFFIX)
+    feed = get_feed(stream_key)
+    queue = await feed.subscribe()
+    try:
+        yield f"retry: {RETRY_MS}\n\n"
+        if last_event_id:
+            last_sent = last_event_id
+            async for event in replay(stream_key, last_event_id):
+                yield event.encode()
+                last_sent = event.id
+        else:
+            last_sent = await latest_id(stream_key)
+            yield f"id: {last_sent}\nevent: ready\ndata: {json.dumps({'id': last_sent})}\n\n"
+        last_key = stream_id_key(last_sent)
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), CHANGES_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                if await request.is_disconnected():
+                    return
+                yield ": ping\n\n"  # Mantiene viva la conexión a través de proxies
+                continue
+            if stream_id_key(event.id) <= last_key and event.type != "reset":
+                continue  # Ya enviado durante el replay
+            last_key = max(last_key, stream_id_key(event.id))
+            yield event.encode()
+    finally:
+        feed.unsubscribe(queue)
@@ -1,52 +1,289 @@
 # backend/app/crud.py
 import os
 import json
-from typing import Dict, Any, Tuple, List
+import logging
+import time
+import hashlib
+import re
+import unicodedata
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Tuple, List, Optional, Callable, AsyncIterator
 import redis
-from redisgraph import Graph
 from fastapi import HTTPException
-import traceback
 
-# (Variables globales se mantienen igual)
+from . import graphs
+from .encoding import encode_properties, decode_properties
+from .graphs import GraphHandle
+from .observability import (CHANGES_PUBLISHED, DB_CALLS_IN_FLIGHT, DB_POOL_SIZE, DB_POOL_WAIT,
+                            INGEST_BATCH_LATENCY, INGEST_ITEMS, observe_query)
+
+logger = logging.getLogger(__name__)
+
+def _env_float(name: str, default: Optional[float] = None) -> Optional[float]:
+    value = os.getenv(name)
+    return float(value) if value not in (None, "") else default
+
+
 REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
 REDIS_PORT = int(os.getenv("REDIS_PORT", 6379))
 REDIS_PASSWORD = os.getenv("REDIS_PASSWORD", None)
+# Grafo por defecto, para las peticiones que no indican `graph` (ver graphs.py).
 REDISGRAPH_GRAPH_NAME = os.getenv("REDISGRAPH_GRAPH_NAME", "sivg_graph")
+# Hash con los workspaces conocidos: nombre -> metadatos JSON.
+GRAPHS_KEY = os.getenv("GRAPHS_KEY", "sivg:graphs")
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", 1000))
+GRAPH_PAGE_SIZE = int(os.getenv("GRAPH_PAGE_SIZE", 5000))
 
+# Las propiedades pesadas (el documento fuente completo, estructuras grandes)
+# no se guardan en el nodo sino en un hash de Redis indexado por frontend_id, y
+# solo se envían al pedir el detalle del nodo.
+HEAVY_PROPERTY_KEYS = {"rawJsonData"}
+PAYLOAD_INLINE_LIMIT = int(os.getenv("PAYLOAD_INLINE_LIMIT", 2048))  # bytes de JSON
+# Claves por grafo ("{grafo}:{sufijo}", ver graph_key). La versión es un
+# contador compartido por todos los workers: cualquier escritura lo incrementa
+# y las cachés de lectura se indexan por él.
+PAYLOADS_SUFFIX = "payloads"
+GRAPH_VERSION_SUFFIX = "version"
+
+DEFAULT_INDEXED_LABELS = ["person", "company", "UnknownNode"]
+INDEXED_PROPERTIES = ("frontend_id", "x", "y", "curp", "rfc")
+# Nombre normalizado (minúsculas, sin acentos) con índice full-text por etiqueta.
+SEARCH_NAME_KEY = "search_name"
+# overwrite: borra y recrea el grafo. merge: upsert por frontend_id sin borrar.
+# incremental: como merge, pero además borra los nodos que ya no vienen.
+INGEST_MODES = ("overwrite", "merge", "incremental")
+# Propiedades de control que no forman parte de `data` en el frontend.
+INTERNAL_PROPERTIES = ("x", "y", "frontend_id", "content_hash", "payload_hash", SEARCH_NAME_KEY)
+# Tipo de relación para aristas sin etiqueta (el tipo sale de la etiqueta normalizada).
+DEFAULT_RELATIONSHIP_TYPE = "RELACIONADO_CON"
+
+# Pool de conexiones acotado. Cada consulta ocupa un hilo del executor y una
+# conexión del pool, así que ambos tienen el mismo tamaño.
+REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", 16))
+REDIS_POOL_TIMEOUT = _env_float("REDIS_POOL_TIMEOUT", 5.0)  # espera máxima por una conexión libre
+REDIS_CONNECT_TIMEOUT = _env_float("REDIS_CONNECT_TIMEOUT", 5.0)
+REDIS_SOCKET_TIMEOUT = _env_float("REDIS_SOCKET_TIMEOUT")  # None = sin límite (consultas largas)
+
+redis_pool = None
 redis_conn = None
-redis_graph = None
+db_executor: Optional[ThreadPoolExecutor] = None
+
+
+async def run_db(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """Ejecuta una llamada bloqueante de redis/redisgraph en el executor de la BD.
+
+    redis-py 3.x (requerido por redisgraph 2.4) no tiene cliente asyncio, así que
+    las llamadas se sacan del event loop para no bloquear al resto de peticiones.
+    """
+    loop = asyncio.get_running_loop()
+    submitted = time.perf_counter()
+
+    def call():
+        # El tiempo hasta aquí es la espera por un hilo libre (= conexión del pool).
+        DB_POOL_WAIT.observe(time.perf_counter() - submitted)
+        with DB_CALLS_IN_FLIGHT.track_inprogress():
+            return func(*args, **kwargs)
+
+    return await loop.run_in_executor(db_executor, call)
+
+
+async def graph_query(query: str, params: Optional[Dict[str, Any]] = None, kind: str = "other"):
+    """Ejecuta una consulta Cypher sobre el grafo sin bloquear el event loop.
+
+    `kind` agrupa la latencia en las métricas y en el log de consultas lentas.
+    """
+    started = time.perf_counter()
+    try:
+        return await run_db(current_graph().graph.query, build_params_header(params) + query if params else query)
+    finally:
+        observe_query(kind, query, started)
+
+
+def connect_redis(max_connections: int) -> redis.Redis:
+    """Cliente de Redis con su propio pool acotado (mismos host, credenciales y timeouts)."""
+    pool = redis.BlockingConnectionPool(
+        host=REDIS_HOST, port=REDIS_PORT, password=REDIS_PASSWORD, decode_responses=True,
+        max_connections=max_connections, timeout=REDIS_POOL_TIMEOUT,
+        socket_connect_timeout=REDIS_CONNECT_TIMEOUT, socket_timeout=REDIS_SOCKET_TIMEOUT,
+    )
+    return redis.Redis(connection_pool=pool)
+
 
-# (init_db_connection y close_db_connection se mantienen igual)
 async def init_db_connection():
-    global redis_conn, redis_graph
+    global redis_pool, redis_conn, db_executor
     try:
-        print(f"DEBUG: backend/app/crud.py - redis-py version: {redis.__version__}")
-        print(f"Attempting to connect to Redis: Host={REDIS_HOST}, Port={REDIS_PORT}")
-        redis_conn = redis.Redis(host=REDIS_HOST, port=REDIS_PORT, password=REDIS_PASSWORD, decode_responses=True)
-        redis_conn.ping()
-        print(f"Successfully connected to Redis at {REDIS_HOST}:{REDIS_PORT}")
-        redis_graph = Graph(REDISGRAPH_GRAPH_NAME, redis_conn)
-        print(f"RedisGraph object initialized successfully for graph: {REDISGRAPH_GRAPH_NAME}")
+        logger.debug("redis-py version: %s", redis.__version__)
+        logger.info("Attempting to connect to Redis: Host=%s, Port=%s, MaxConnections=%s",
+                    REDIS_HOST, REDIS_PORT, REDIS_MAX_CONNECTIONS)
+        db_executor = ThreadPoolExecutor(max_workers=REDIS_MAX_CONNECTIONS, thread_name_prefix="redis")
+        redis_conn = connect_redis(REDIS_MAX_CONNECTIONS)
+        redis_pool = redis_conn.connection_pool
+        DB_POOL_SIZE.set(REDIS_MAX_CONNECTIONS)
+        await run_db(redis_conn.ping)
+        logger.info("Successfully connected to Redis at %s:%s", REDIS_HOST, REDIS_PORT)
     except Exception as e:
-        print(f"Failed to initialize Redis connection: {e}\n{traceback.format_exc()}")
+        logger.exception("Failed to initialize Redis connection: %s", e)
         raise HTTPException(status_code=503, detail=f"Could not initialize Redis: {e}")
 
 async def close_db_connection():
-    global redis_conn
-    if redis_conn:
-        redis_conn.close()
-        print("Redis connection closed.")
+    global redis_pool, redis_conn, db_executor
+    if redis_pool:
+        redis_pool.disconnect()
+        redis_pool = None
+        redis_conn = None
+        graphs.registry.clear()
+        logger.info("Redis connection closed.")
+    if db_executor:
+        db_executor.shutdown(wait=False)
+        db_executor = None
 
-async def create_indices_if_needed():
-    if not redis_graph: return
-    for label in ["person", "company", "UnknownNode"]:
+# --- GRAFOS (WORKSPACES) ---
+
+def current_graph() -> GraphHandle:
+    """El grafo de la petición en curso; fuera de una petición (arranque, scripts), el de por defecto."""
+    handle = graphs.current_graph.get()
+    if handle is None:
+        handle = use_graph(REDISGRAPH_GRAPH_NAME)
+    return handle
+
+
+def graph_key(suffix: str) -> str:
+    return current_graph().key(suffix)
+
+
+def use_graph(name: str) -> GraphHandle:
+    """Fija `name` como grafo de la tarea en curso (y de las que cree) sin tocar Redis."""
+    if not graphs.is_valid_graph_name(name):
+        raise HTTPException(status_code=400, detail=f"Invalid graph name: {name!r}")
+    if redis_conn is None:
+        raise HTTPException(status_code=503, detail="Database not connected")
+    handle, _ = graphs.registry.get(name, redis_conn)
+    graphs.current_graph.set(handle)
+    return handle
+
+
+async def open_graph(name: str, create: bool = True) -> GraphHandle:
+    """Como use_graph, y además registra el grafo si hace falta y crea sus índices.
+
+    Con `create=False` un grafo no registrado da 404 (el de por defecto siempre
+    existe). El registro se consulta en Redis en cada petición: otro worker
+    pudo borrar el grafo, o borrarlo y volver a crearlo, desde el último uso.
+    """
+    handle = use_graph(name)
+    registration = await run_db(redis_conn.hget, GRAPHS_KEY, name)
+    if registration is None:
+        if not create and name != REDISGRAPH_GRAPH_NAME:
+            raise HTTPException(status_code=404, detail=f"Graph not found: {name}")
+        await run_db(redis_conn.hsetnx, GRAPHS_KEY, name, json.dumps({"created_at": time.time()}))
+        registration = await run_db(redis_conn.hget, GRAPHS_KEY, name)
+    if registration != handle.registration:
+        # Primer uso en este proceso o grafo recreado: los índices verificados ya no valen.
+        handle.indexed_labels.clear()
+        await create_indices_if_needed()
+        handle.registration = registration
+    return handle
+
+
+async def list_graphs() -> List[Dict[str, Any]]:
+    """Workspaces registrados con sus metadatos y versión actual."""
+    known = await run_db(redis_conn.hgetall, GRAPHS_KEY)
+    names = sorted(known)
+
+    def read_versions():
+        pipe = redis_conn.pipeline(transaction=False)
+        for name in names:
+            pipe.get(f"{name}:{GRAPH_VERSION_SUFFIX}")
+        return pipe.execute()
+
+    versions = await run_db(read_versions) if names else []
+    return [{"name": name, **json.loads(known[name] or "{}"), "version": int(version or 0)}
+            for name, version in zip(names, versions)]
+
+
+async def graph_exists(name: str) -> bool:
+    return bool(await run_db(redis_conn.hexists, GRAPHS_KEY, name))
+
+
+# Claves de un grafo (además del propio grafo) que se borran con él; las de
+# layout (layout.py) se cubren con el patrón.
+GRAPH_KEY_PATTERNS = ["layout*", "upload:*", "job:*"]
+
+
+async def delete_current_graph() -> int:
+    """Borra el grafo en curso, sus claves auxiliares y su registro; devuelve cuántas claves se borraron.
+
+    El lock de ingest no se borra: lo libera quien lo tiene (y expira solo).
+    El contador de versión tampoco: se incrementa, para que un grafo creado
+    después con el mismo nombre no repita versiones (ETag y caché de /graph-data/).
+    """
+    handle = current_graph()
+
+    def delete_keys() -> int:
+        suffixes = [PAYLOADS_SUFFIX, PREVIOUS_PAYLOADS_SUFFIX, CHANGES_SUFFIX]
+        keys = [handle.key(suffix) for suffix in suffixes]
+        for pattern in GRAPH_KEY_PATTERNS:
+            keys.extend(redis_conn.scan_iter(match=handle.key(pattern), count=1000))
+        removed = redis_conn.unlink(*keys)
+        redis_conn.incr(handle.key(GRAPH_VERSION_SUFFIX))
+        redis_conn.hdel(GRAPHS_KEY, handle.name)
+        return removed
+
+    try:
+        await run_db(handle.graph.delete)
+    except redis.exceptions.ResponseError as e:
+        logger.info("El grafo %s no existía en RedisGraph: %s", handle.name, e)
+    removed = await run_db(delete_keys)
+    graphs.registry.evict(handle.name)
+    handle.registration = None
+    handle.indexed_labels.clear()
+    logger.info("Grafo %s borrado (%s claves auxiliares).", handle.name, removed)
+    return removed
+
+
+async def get_graph_version() -> int:
+    return int(await run_db(redis_conn.get, graph_key(GRAPH_VERSION_SUFFIX)) or 0)
+
+
+async def bump_graph_version() -> int:
+    return await run_db(redis_conn.incr, graph_key(GRAPH_VERSION_SUFFIX))
+
+
+
+def _index_exists_error(error: Exception) -> bool:
+    message = str(error).lower()
+    return "already created" in message or "already exists" in message or "already indexed" in message
+
+
+async def ensure_label_indices(labels):
+    """Crea los índices de INDEXED_PROPERTIES y el full-text de búsqueda para cada etiqueta.
+
+    frontend_id lo necesitan MERGE y los MATCH por id; x/y, las consultas por
+    área visible (rangos numéricos); curp/rfc y search_name, la búsqueda.
+    """
+    indexed_labels = current_graph().indexed_labels
+    for label in labels:
+        if label in indexed_labels:
+            continue
+        for prop in INDEXED_PROPERTIES:
+            try:
+                await graph_query(f"CREATE INDEX FOR (n:{label}) ON (n.{prop})", kind="create_index")
+                logger.info("Ensured index exists for :%s(%s)", label, prop)
+            except redis.exceptions.ResponseError as e:
+                if _index_exists_error(e):
+                    logger.debug("Index on :%s(%s) already exists.", label, prop)
+                else: raise e
         try:
-            redis_graph.query(f"CREATE INDEX FOR (n:{label}) ON (n.frontend_id)")
-            print(f"Ensured index exists for :{label}(frontend_id)")
+            await graph_query(f"CALL db.idx.fulltext.createNodeIndex('{label}', '{SEARCH_NAME_KEY}')",
+                              kind="create_index")
         except redis.exceptions.ResponseError as e:
-            if "already created" in str(e).lower() or "already exists" in str(e).lower():
-                print(f"Index on :{label}(frontend_id) already exists.")
-            else: raise e
+            if not _index_exists_error(e):
+                raise e
+        indexed_labels.add(label)
+
+async def create_indices_if_needed():
+    if not redis_conn: return
+    await ensure_label_indices(DEFAULT_INDEXED_LABELS)
 
 # --- NUEVA FUNCIÓN CLAVE: Convertir a un literal de Cypher ---
 def to_cypher_literal(value: Any) -> str:
@@ -69,145 +306,1102 @@ def to_cypher_literal(value: Any) -> str:
     return f'"{escaped_str}"'
 
 
-# --- FUNCIÓN DE ALMACENAMIENTO TOTALMENTE REESCRITA ---
-async def process_and_store_json(data: Dict[str, Any], mode: str = "overwrite"):
-    if not redis_graph:
+def to_property_value(value: Any) -> Any:
+    """Normaliza un valor de Python a algo que RedisGraph acepta como propiedad.
+
+    RedisGraph no admite mapas anidados como propiedad, así que dicts y listas
+    se guardan como JSON (igual que hace `to_cypher_literal`).
+    """
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    return str(value)
+
+
+def to_cypher_param(value: Any) -> str:
+    """Convierte un valor a literal Cypher para la cabecera `CYPHER k=v` de parámetros.
+
+    A diferencia de `to_cypher_literal`, los dicts y listas se emiten como
+    mapas y listas de Cypher (p.ej. las filas de un `UNWIND $rows`).
+    """
+    if isinstance(value, dict):
+        return "{" + ", ".join(f"{k}: {to_cypher_param(v)}" for k, v in value.items()) + "}"
+    if isinstance(value, (list, tuple)):
+        return "[" + ", ".join(to_cypher_param(v) for v in value) + "]"
+    return to_cypher_literal(value)
+
+
+def build_params_header(params: Dict[str, Any]) -> str:
+    """Construye la cabecera de parámetros que RedisGraph separa del texto de la consulta.
+
+    Como la cabecera no forma parte de la consulta, RedisGraph reutiliza el plan
+    cacheado para todas las consultas con el mismo texto.
+    """
+    return "CYPHER " + " ".join(f"{k}={to_cypher_param(v)}" for k, v in params.items()) + " "
+
+
+def _is_heavy_property(key: str, value: Any) -> bool:
+    if key in HEAVY_PROPERTY_KEYS:
+        return True
+    return isinstance(value, (dict, list)) and len(json.dumps(value)) > PAYLOAD_INLINE_LIMIT
+
+
+def node_to_row(node_data: Dict[str, Any]) -> Tuple[str, Dict[str, Any], Optional[Dict[str, Any]]]:
+    """Convierte un nodo del frontend en (label, fila de propiedades, payload pesado).
+
+    El payload es None si el nodo no trae propiedades pesadas. Lanza ValueError
+    si el nodo no es válido.
+    """
+    if not isinstance(node_data, dict):
+        raise ValueError("el nodo no es un objeto JSON")
+
+    frontend_id = node_data.get("id")
+    label = node_data.get("type", "UnknownNode")
+    position = node_data.get("position", {})
+    props_data = node_data.get("data", {})
+
+    if not all([frontend_id, label, isinstance(props_data, dict)]):
+        raise ValueError("nodo inválido: se requieren 'id', 'type' y 'data' (objeto)")
+    if not isinstance(label, str) or not label.isidentifier():
+        raise ValueError(f"etiqueta inválida: {label!r}")
+
+    row = {"frontend_id": to_property_value(frontend_id)}
+    if isinstance(position, dict):
+        row["x"] = to_property_value(position.get("x", 0.0))
+        row["y"] = to_property_value(position.get("y", 0.0))
+
+    payload: Dict[str, Any] = {}
+    light: Dict[str, Any] = {}
+    for key, value in props_data.items():
+        if value is None or (isinstance(value, str) and not value.strip()):
+            continue
+        if _is_heavy_property(key, value):
+            payload[key] = value
+            continue
+        # Asegurarse que la clave es válida para Cypher
+        sanitized_key = "".join(c for c in key if c.isalnum() or c == '_')
+        if sanitized_key:
+            light[sanitized_key] = value
+    # Tipos nativos + sidecar con las claves JSON: la lectura no adivina tipos.
+    row.update(encode_properties(light))
+    if isinstance(light.get("name"), str):
+        row[SEARCH_NAME_KEY] = normalize_search_text(light["name"])
+
+    if payload:
+        row["hasDetails"] = True
+    # Los hashes permiten al modo incremental saltarse los nodos sin cambios.
+    row["content_hash"] = node_content_hash(label, row)
+    if payload:
+        row["payload_hash"] = content_hash(payload)
+    return label, row, payload or None
+
+
+def content_hash(value: Any) -> str:
+    encoded = json.dumps(value, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha1(encoded.encode("utf-8")).hexdigest()
+
+
+def node_content_hash(label: str, row: Dict[str, Any]) -> str:
+    """Hash de las propiedades de un nodo. x/y quedan fuera (el layout los cambia
+    sin pasar por aquí) y se comparan aparte, igual que el payload."""
+    return content_hash([label, {k: v for k, v in row.items()
+                                 if k not in ("x", "y", "content_hash", "payload_hash")}])
+
+
+def normalize_search_text(text: str) -> str:
+    """Minúsculas, sin acentos y solo alfanuméricos separados por un espacio ("José Núñez" -> "jose nunez")."""
+    normalized = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode("ascii")
+    return " ".join(re.sub(r"[^0-9a-z]+", " ", normalized.lower()).split())
+
+
+def relationship_type(label: Any) -> str:
+    """Normaliza la etiqueta libre de una arista ("Socio de") a un tipo válido (SOCIO_DE)."""
+    normalized = unicodedata.normalize("NFKD", str(label or "")).encode("ascii", "ignore").decode("ascii")
+    rel_type = re.sub(r"[^0-9A-Za-z]+", "_", normalized).strip("_").upper()
+    if not rel_type:
+        return DEFAULT_RELATIONSHIP_TYPE
+    return f"R_{rel_type}" if rel_type[0].isdigit() else rel_type
+
+
+def edge_to_row(edge_data: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+    """Convierte una arista de React Flow en (tipo de relación, fila para el ingest).
+
+    La fila lleva los frontend_id de los extremos y las propiedades de la
+    relación en `props`. Lanza ValueError si la arista no es válida.
+    """
+    if not isinstance(edge_data, dict):
+        raise ValueError("la arista no es un objeto JSON")
+
+    source, target = edge_data.get("source"), edge_data.get("target")
+    if not source or not target:
+        raise ValueError("arista inválida: se requieren 'source' y 'target'")
+    data = edge_data.get("data") if isinstance(edge_data.get("data"), dict) else {}
+    label = edge_data.get("label") or data.get("label") or ""
+    rel_type = relationship_type(label)
+    edge_id = str(edge_data.get("id") or f"edge-{source}-{target}-{rel_type}")
+
+    props: Dict[str, Any] = {"frontend_id": edge_id}
+    if label:
+        props["label"] = str(label)
+    for key, value in data.items():
+        if value is None or (isinstance(value, str) and not value.strip()):
+            continue
+        sanitized_key = "".join(c for c in key if c.isalnum() or c == '_')
+        if sanitized_key and sanitized_key not in props:
+            props[sanitized_key] = to_property_value(value)
+    props["content_hash"] = content_hash([rel_type, str(source), str(target), props])
+    return rel_type, {"id": edge_id, "source": str(source), "target": str(target), "props": props}
+
+
+def _chunks(items: List[Any], size: int):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+CREATE_NODES_QUERY = "UNWIND $rows AS r CREATE (n:{label}) SET n = r"
+UPSERT_NODES_QUERY = "UNWIND $rows AS r MERGE (n:{label} {{frontend_id: r.frontend_id}}) SET n = r"
+DELETE_NODES_QUERY = "UNWIND $ids AS id MATCH (n:{label} {{frontend_id: id}}) DETACH DELETE n"
+FIND_NODES_QUERY = "UNWIND $ids AS id MATCH (n:{label} {{frontend_id: id}}) RETURN n.frontend_id"
+_EDGE_ENDPOINTS = ("UNWIND $rows AS r MATCH (s:{source_label} {{frontend_id: r.source}}), "
+                   "(t:{target_label} {{frontend_id: r.target}}) ")
+CREATE_EDGES_QUERY = _EDGE_ENDPOINTS + "CREATE (s)-[e:{rel_type}]->(t) SET e = r.props"
+UPSERT_EDGES_QUERY = _EDGE_ENDPOINTS + "MERGE (s)-[e:{rel_type} {{frontend_id: r.id}}]->(t) SET e = r.props"
+DELETE_EDGES_QUERY = ("UNWIND $rows AS r MATCH (s:{source_label} {{frontend_id: r.source}})"
+                      "-[e:{rel_type} {{frontend_id: r.id}}]->() DELETE e")
+STORED_EDGES_QUERY = ("MATCH (s)-[e]->() WHERE e.frontend_id IS NOT NULL "
+                      "RETURN e.frontend_id, s.frontend_id, labels(s), type(e), e.content_hash")
+STORED_HASHES_QUERY = ("UNWIND $ids AS id MATCH (n:{label} {{frontend_id: id}}) "
+                       "RETURN n.frontend_id, n.content_hash, n.payload_hash, n.x, n.y")
+# En merge las aristas guardadas se buscan por sus extremos (índices de nodos): las
+# relaciones no tienen índice por frontend_id y recorrerlas todas en cada lote no escala.
+_STORED_EDGE_COLUMNS = "RETURN e.frontend_id, s.frontend_id, labels(s), type(e), e.content_hash"
+STORED_EDGES_BY_SOURCE_QUERY = ("UNWIND $rows AS r MATCH (s:{source_label} {{frontend_id: r.source}})-[e]->() "
+                                "WHERE e.frontend_id = r.id " + _STORED_EDGE_COLUMNS)
+STORED_EDGES_BY_TARGET_QUERY = ("UNWIND $rows AS r MATCH (s)-[e]->(t:{target_label} {{frontend_id: r.target}}) "
+                                "WHERE e.frontend_id = r.id " + _STORED_EDGE_COLUMNS)
+# Relaciones completas de unos nodos, para recrearlas cuando cambian de etiqueta.
+NODE_OUTGOING_EDGES_QUERY = ("UNWIND $ids AS id MATCH (s:{label} {{frontend_id: id}})-[e]->(t) "
+                             "RETURN e, s.frontend_id, t.frontend_id")
+NODE_INCOMING_EDGES_QUERY = ("UNWIND $ids AS id MATCH (s)-[e]->(t:{label} {{frontend_id: id}}) "
+                             "RETURN e, s.frontend_id, t.frontend_id")
+ALL_HASHES_QUERY = "MATCH (n) RETURN n.frontend_id, labels(n), n.content_hash, n.payload_hash, n.x, n.y"
+
+
+# --- PAYLOADS PESADOS (hash de Redis fuera del grafo) ---
+async def store_payloads(payloads: Dict[str, Dict[str, Any]]):
+    """Guarda {frontend_id: {propiedad: valor}} en el hash de payloads."""
+    if payloads:
+        mapping = {str(frontend_id): json.dumps(payload) for frontend_id, payload in payloads.items()}
+        await run_db(redis_conn.hset, graph_key(PAYLOADS_SUFFIX), mapping=mapping)
+
+
+async def get_payload(frontend_id: str) -> Optional[Dict[str, Any]]:
+    raw = await run_db(redis_conn.hget, graph_key(PAYLOADS_SUFFIX), frontend_id)
+    return json.loads(raw) if raw else None
+
+
+# En un 'overwrite' el hash de payloads se renombra en lugar de borrarse: los
+# nodos que se reenvían sin su payload (hasDetails sin rawJsonData, p.ej. un
+# grafo exportado desde /graph-data/) recuperan el suyo de la copia anterior.
+PREVIOUS_PAYLOADS_SUFFIX = f"{PAYLOADS_SUFFIX}:previous"
+
+
+async def begin_payload_reset():
+    payloads_key, previous_key = graph_key(PAYLOADS_SUFFIX), graph_key(PREVIOUS_PAYLOADS_SUFFIX)
+    await run_db(redis_conn.unlink, previous_key)
+    if await run_db(redis_conn.exists, payloads_key):
+        await run_db(redis_conn.rename, payloads_key, previous_key)
+
+
+async def carry_over_payloads(frontend_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Payloads de la copia anterior para los ids dados (los que existan)."""
+    kept: Dict[str, Dict[str, Any]] = {}
+    if frontend_ids:
+        for frontend_id, raw in zip(frontend_ids, await run_db(redis_conn.hmget, graph_key(PREVIOUS_PAYLOADS_SUFFIX), frontend_ids)):
+            if raw:
+                kept[frontend_id] = json.loads(raw)
+    return kept
+
+
+async def finish_payload_reset():
+    await run_db(redis_conn.unlink, graph_key(PREVIOUS_PAYLOADS_SUFFIX))
+
+
+# --- FEED DE CAMBIOS ---
+# Las escrituras publican deltas compactos en un Redis Stream; app/changes.py
+# los reparte a los clientes conectados. Los cambios masivos (overwrite,
+# restauración de snapshot, un layout completo) no se detallan: se publica un
+# solo 'reset' y el cliente recarga el grafo.
+CHANGES_SUFFIX = "changes"
+CHANGES_MAXLEN = int(os.getenv("CHANGES_MAXLEN", 10000))  # entradas retenidas para reanudar (aprox.)
+CHANGES_MAX_ITEMS = int(os.getenv("CHANGES_MAX_ITEMS", 5000))  # más elementos que esto -> 'reset'
+CHANGES_ENTRY_ITEMS = 500  # elementos por entrada del stream
+CHANGE_TYPES = ("nodes_upserted", "nodes_deleted", "edges_upserted", "edges_deleted", "positions", "reset")
+
+
+async def publish_changes(change_type: str, items: Optional[List[Any]] = None):
+    """Publica un delta (`items` en trozos de CHANGES_ENTRY_ITEMS) o un 'reset' si `items` es None.
+
+    Un fallo al publicar no hace fallar la escritura: los clientes se
+    resincronizan con el siguiente 'reset' o recargando.
+    """
+    if redis_conn is None or (items is not None and not items):
+        return
+    if items is not None and len(items) > CHANGES_MAX_ITEMS:
+        change_type, items = "reset", None
+    chunks = [None] if items is None else list(_chunks(items, CHANGES_ENTRY_ITEMS))
+    changes_key = graph_key(CHANGES_SUFFIX)
+
+    def add_entries():
+        pipe = redis_conn.pipeline(transaction=False)
+        for chunk in chunks:
+            fields = {"type": change_type}
+            if chunk is not None:
+                fields["items"] = json.dumps(chunk, default=str)
+            pipe.xadd(changes_key, fields, maxlen=CHANGES_MAXLEN, approximate=True)
+        pipe.execute()
+
+    try:
+        await run_db(add_entries)
+        CHANGES_PUBLISHED.labels(change_type).inc(len(chunks))
+    except redis.exceptions.RedisError as e:
+        logger.warning("No se pudo publicar el cambio '%s' en el feed: %s", change_type, e)
+
+
+def _failed_ids(report: Dict[str, Any], kind: str, errors_before: int) -> set:
+    return {str(error["id"]) for error in report["errors"][errors_before:] if error["kind"] == kind}
+
+
+# --- FUNCIÓN DE ALMACENAMIENTO: INGEST POR LOTES ---
+# process_and_store_json cubre el caso normal (todo el payload en memoria). Los
+# ingest por partes (subidas en streaming, trabajos en segundo plano) usan las
+# mismas piezas: begin_ingest, ingest_node_batch / ingest_edge_batch y finish_ingest.
+
+def validate_ingest_mode(mode: str):
+    if mode not in INGEST_MODES:
+        raise HTTPException(status_code=400, detail=f"Invalid mode '{mode}'. Expected one of: {', '.join(INGEST_MODES)}")
+
+
+def new_ingest_report(mode: str, batch_size: int) -> Dict[str, Any]:
+    return {
+        "mode": mode,
+        "batch_size": batch_size,
+        "nodes_received": 0,
+        "nodes_written": 0,
+        "created": 0,
+        "updated": 0,
+        "unchanged": 0,
+        "deleted": 0,
+        "edges_received": 0,
+        "edges_written": 0,
+        "edges_unchanged": 0,
+        "edges_deleted": 0,
+        "dangling_edges": [],
+        "batches": [],
+        "errors": [],
+    }
+
+
+async def begin_ingest(mode: str):
+    """Preparación común a todo ingest: en 'overwrite' borra el grafo y aparta los payloads."""
+    # Los índices verificados valen durante este ingest: un overwrite (aquí o en otro worker) los borra.
+    current_graph().indexed_labels.clear()
+    if mode != "overwrite":
+        return
+    try:
+        await run_db(current_graph().graph.delete)
+        logger.info("Grafo anterior borrado para modo 'overwrite'.")
+    except redis.exceptions.ResponseError as e:
+        logger.warning("No se pudo borrar el grafo (probablemente estaba vacío): %s", e)
+    await create_indices_if_needed()
+    await begin_payload_reset()
+
+
+async def finish_ingest(mode: str, report: Dict[str, Any], started: float) -> Dict[str, Any]:
+    if mode == "overwrite":
+        await finish_payload_reset()
+        await publish_changes("reset")
+    report["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 2)
+    logger.info("Finalizado ingest (%s): %s/%s nodos, %s/%s aristas, %s errores, %.1f ms",
+                mode, report["nodes_written"], report["nodes_received"], report["edges_written"],
+                report["edges_received"], len(report["errors"]), report["elapsed_ms"],
+                # Bajo una sola clave: 'created' es un atributo reservado de LogRecord
+                extra={"ingest": {key: report[key] for key in ("mode", "nodes_written", "created", "updated",
+                                                               "unchanged", "deleted", "edges_written",
+                                                               "elapsed_ms")}})
+    return report
+
+
+async def process_and_store_json(data: Dict[str, Any], mode: str = "overwrite",
+                                 batch_size: int = INGEST_BATCH_SIZE) -> Dict[str, Any]:
+    """Guarda los nodos y aristas del payload `{nodes, edges}` agrupados por etiqueta y en lotes.
+
+    `mode` es uno de INGEST_MODES. En merge e incremental solo se escriben los
+    nodos nuevos o cuyo hash cambió. Devuelve un reporte con los conteos
+    (created/updated/unchanged/deleted), los tiempos de cada lote y la lista
+    completa de nodos que no se pudieron escribir, en lugar de abortar en el
+    primer error.
+    """
+    if not redis_conn:
         raise HTTPException(status_code=503, detail="Database not connected")
+    validate_ingest_mode(mode)
+    batch_size = max(1, int(batch_size))
+
+    logger.info("Iniciando process_and_store_json | Modo: %s | Lote: %s", mode, batch_size)
+    started = time.perf_counter()
+    report = new_ingest_report(mode, batch_size)
+    # Se incrementa antes y después: lo que se lea durante la escritura queda
+    # asociado a una versión intermedia que nadie volverá a pedir.
+    await bump_graph_version()
+    try:
+        await begin_ingest(mode)
+        node_labels = await ingest_node_batch(data.get("nodes", []) or [], mode, batch_size, report)
+        await ingest_edge_batch(data.get("edges", []) or [], node_labels, mode, batch_size, report)
+        return await finish_ingest(mode, report, started)
+    finally:
+        await bump_graph_version()
 
-    print(f"--- Iniciando process_and_store_json | Modo: {mode} ---")
+
+async def ingest_node_batch(nodes: List[Dict[str, Any]], mode: str, batch_size: int, report: Dict[str, Any],
+                            start_index: int = 0) -> Dict[str, str]:
+    """Escribe un grupo de nodos y devuelve {frontend_id: etiqueta} de los escritos con éxito.
+
+    En modo incremental `nodes` debe ser el payload completo: lo que no venga se borra.
+    """
+    report["nodes_received"] += len(nodes)
+    errors_before = len(report["errors"])
+
+    # Agrupar por etiqueta: la etiqueta no puede ser un parámetro en Cypher.
+    rows_by_label: Dict[str, List[Tuple[int, Dict[str, Any]]]] = {}
+    payloads: Dict[str, Dict[str, Any]] = {}
+    for index, node_data in enumerate(nodes, start_index):
+        try:
+            label, row, payload = node_to_row(node_data)
+        except ValueError as e:
+            node_id = node_data.get("id") if isinstance(node_data, dict) else None
+            report["errors"].append({"kind": "node", "index": index, "id": node_id, "error": str(e)})
+            continue
+        rows_by_label.setdefault(label, []).append((index, row))
+        if payload:
+            payloads[str(row["frontend_id"])] = payload
+    node_labels = {str(row["frontend_id"]): label for label, rows in rows_by_label.items() for _, row in rows}
 
     if mode == "overwrite":
+        reused = [str(row["frontend_id"]) for rows in rows_by_label.values() for _, row in rows
+                  if row.get("hasDetails") and str(row["frontend_id"]) not in payloads]
+        kept = await carry_over_payloads(reused)
+        for rows in rows_by_label.values():
+            for _, row in rows:
+                if str(row["frontend_id"]) in kept:
+                    row["payload_hash"] = content_hash(kept[str(row["frontend_id"])])
+        payloads.update(kept)
+        await ensure_label_indices([label for label in rows_by_label if label not in DEFAULT_INDEXED_LABELS])
+        for label, indexed_rows in rows_by_label.items():
+            written = await _write_batches("node", label, indexed_rows, CREATE_NODES_QUERY.format(label=label),
+                                           batch_size, report, payloads)
+            report["created"] += written
+    else:
+        await ensure_label_indices(list(rows_by_label))
+        await _sync_nodes(rows_by_label, payloads, mode, batch_size, report)
+
+    # Los nodos que no se pudieron escribir no sirven como extremos: sus aristas quedan colgantes.
+    for error in report["errors"][errors_before:]:
+        node_labels.pop(str(error["id"]), None)
+    return node_labels
+
+
+async def ingest_edge_batch(edges: List[Dict[str, Any]], node_labels: Dict[str, str], mode: str,
+                            batch_size: int, report: Dict[str, Any], start_index: int = 0):
+    """Escribe un grupo de aristas; los extremos que no estén en `node_labels` se buscan en el grafo."""
+    report["edges_received"] += len(edges)
+    await _store_edges(edges, node_labels, mode, batch_size, report, start_index)
+
+
+async def _write_batches(kind: str, group: str, indexed_rows: List[Tuple[int, Dict[str, Any]]], query: str,
+                         batch_size: int, report: Dict[str, Any],
+                         payloads: Optional[Dict[str, Dict[str, Any]]] = None) -> int:
+    """Escribe las filas ("node" o "edge") en lotes con la consulta dada y devuelve cuántas se escribieron.
+
+    Si un lote falla se reintenta fila a fila para aislar las que fallan.
+    """
+    total_written = 0
+    for batch in _chunks(indexed_rows, batch_size):
+        rows = [row for _, row in batch]
+        batch_started = time.perf_counter()
+        if payloads:
+            # El payload va primero: un payload huérfano es inofensivo, un nodo
+            # con hasDetails sin payload no.
+            await store_payloads({str(row["frontend_id"]): payloads[str(row["frontend_id"])]
+                                  for row in rows if str(row["frontend_id"]) in payloads})
         try:
-            redis_graph.delete()
-            print("INFO: Grafo anterior borrado para modo 'overwrite'.")
-            await create_indices_if_needed()
+            await graph_query(query, {"rows": rows}, kind=f"write_{kind}s")
+            written = len(rows)
         except redis.exceptions.ResponseError as e:
-            print(f"AVISO: No se pudo borrar el grafo (probablemente estaba vacío): {e}")
+            # Reintentar fila a fila para aislar las que fallan.
+            logger.warning("Falló el lote de %s (%s) %s (%s); reintentando individualmente.", len(rows), kind, group, e)
+            written = 0
+            for index, row in batch:
+                try:
+                    await graph_query(query, {"rows": [row]}, kind=f"write_{kind}s")
+                    written += 1
+                except redis.exceptions.ResponseError as row_error:
+                    row_id = row.get("frontend_id", row.get("id"))
+                    report["errors"].append({"kind": kind, "index": index, "id": row_id, "error": str(row_error)})
+        elapsed_ms = (time.perf_counter() - batch_started) * 1000
+        total_written += written
+        report[f"{kind}s_written"] += written
+        report["batches"].append({"kind": kind, "label": group, "size": len(rows), "written": written,
+                                  "elapsed_ms": round(elapsed_ms, 2)})
+        INGEST_ITEMS.labels(kind).inc(written)
+        INGEST_BATCH_LATENCY.labels(kind).observe(elapsed_ms / 1000)
+        logger.debug("Lote (%s) %s de %s escrito en %.1f ms", kind, group, len(rows), elapsed_ms)
+    return total_written
 
-    nodes_to_create = data.get("nodes", [])
-    print(f"INFO: Se procesarán {len(nodes_to_create)} nodos.")
 
-    for node_data in nodes_to_create:
-        try:
-            frontend_id = node_data.get("id")
-            label = node_data.get("type", "UnknownNode")
-            position = node_data.get("position", {})
-            props_data = node_data.get("data", {})
+StoredNode = Tuple[str, Optional[str], Optional[str], Tuple[Any, Any]]
 
-            if not all([frontend_id, label, isinstance(props_data, dict)]):
-                print(f"ERROR: Saltando nodo inválido: {node_data}")
+
+async def _load_stored_hashes(rows_by_label: Dict[str, List[Tuple[int, Dict[str, Any]]]], mode: str,
+                              batch_size: int) -> Dict[str, StoredNode]:
+    """Devuelve {frontend_id: (label, content_hash, payload_hash, (x, y))} de los nodos guardados.
+
+    En modo incremental se necesita el grafo entero (para saber qué borrar); en
+    merge basta con buscar los ids entrantes por el índice de su etiqueta y,
+    los que no aparezcan (nuevos o con la etiqueta cambiada), en las demás.
+    """
+    stored: Dict[str, StoredNode] = {}
+    if mode == "incremental":
+        result = await graph_query(ALL_HASHES_QUERY, kind="load_hashes")
+        for frontend_id, labels, stored_hash, payload_hash, x, y in result.result_set:
+            if frontend_id is None:
                 continue
+            label = labels[0] if isinstance(labels, list) else labels
+            stored[str(frontend_id)] = (label, stored_hash, payload_hash, (x, y))
+        return stored
 
-            # Construir la lista de propiedades como strings de Cypher
-            prop_strings = [f'frontend_id: {to_cypher_literal(frontend_id)}']
-            if isinstance(position, dict):
-                prop_strings.append(f'x: {to_cypher_literal(position.get("x", 0.0))}')
-                prop_strings.append(f'y: {to_cypher_literal(position.get("y", 0.0))}')
-            
-            for key, value in props_data.items():
-                if value is None or (isinstance(value, str) and not value.strip()):
-                    continue
-                # Asegurarse que la clave es válida para Cypher
-                sanitized_key = "".join(c for c in key if c.isalnum() or c == '_')
-                if sanitized_key:
-                    prop_strings.append(f'{sanitized_key}: {to_cypher_literal(value)}')
-            
-            # Unir todas las propiedades en un solo string
-            props_cypher_string = ", ".join(prop_strings)
-            
-            # Construir la consulta final como un f-string
-            query = f"CREATE (n:{label} {{{props_cypher_string}}})"
-            
-            print(f" -> Creando nodo: Label='{label}', ID='{frontend_id}'")
-            # Ejecutar la consulta sin parámetros, ya que todo está "hardcodeado" en el string
-            redis_graph.query(query)
-        
-        except Exception as e:
-            print(f"ERROR CRÍTICO irrecuperable al procesar el nodo {node_data.get('id')}: {e}")
-            traceback.print_exc()
-            raise HTTPException(status_code=500, detail=f"Error al escribir en la base de datos para el nodo {node_data.get('id')}: {e}")
+    for label, indexed_rows in rows_by_label.items():
+        ids = [row["frontend_id"] for _, row in indexed_rows]
+        for ids_batch in _chunks(ids, batch_size):
+            result = await graph_query(STORED_HASHES_QUERY.format(label=label), {"ids": ids_batch}, kind="load_hashes")
+            for frontend_id, stored_hash, payload_hash, x, y in result.result_set:
+                stored[str(frontend_id)] = (label, stored_hash, payload_hash, (x, y))
 
-    print("--- Finalizado process_and_store_json ---")
+    missing = [(row["frontend_id"], label) for label, indexed_rows in rows_by_label.items()
+               for _, row in indexed_rows if str(row["frontend_id"]) not in stored]
+    for label in await get_labels() if missing else []:
+        missing = [(frontend_id, own) for frontend_id, own in missing if str(frontend_id) not in stored]
+        candidates = [frontend_id for frontend_id, own in missing if own != label]
+        for ids_batch in _chunks(candidates, batch_size):
+            result = await graph_query(STORED_HASHES_QUERY.format(label=label), {"ids": ids_batch}, kind="load_hashes")
+            for frontend_id, stored_hash, payload_hash, x, y in result.result_set:
+                stored[str(frontend_id)] = (label, stored_hash, payload_hash, (x, y))
+    return stored
 
 
-# --- FUNCIÓN DE LECTURA (MODIFICADA PARA SER MÁS ROBUSTA) ---
-def from_redis_value(value: str) -> Any:
-    """Intenta convertir un string de Redis de vuelta a su tipo original."""
-    if not isinstance(value, str):
-        return value # Si ya es un número o bool, devolverlo
-    
-    # 1. Intentar deserializar JSON (lo más común para datos complejos)
-    if value.startswith(('{', '[')):
-        try: return json.loads(value)
-        except json.JSONDecodeError: pass
-    
-    # 2. Intentar convertir a booleano
-    if value.lower() == 'true': return True
-    if value.lower() == 'false': return False
-    
-    # 3. Intentar convertir a número (primero a int, luego a float si falla)
-    try: return int(value)
-    except (ValueError, TypeError): pass
-    try: return float(value)
-    except (ValueError, TypeError): pass
+async def _load_node_edges(ids_by_label: Dict[str, List[str]], batch_size: int
+                           ) -> List[Tuple[str, str, str, Dict[str, Any]]]:
+    """(origen, destino, tipo, propiedades) de las relaciones de esos nodos, sin repetir."""
+    edges: Dict[int, Tuple[str, str, str, Dict[str, Any]]] = {}
+    for label, ids in ids_by_label.items():
+        for query in (NODE_OUTGOING_EDGES_QUERY, NODE_INCOMING_EDGES_QUERY):
+            for ids_batch in _chunks(ids, batch_size):
+                result = await graph_query(query.format(label=label), {"ids": ids_batch}, kind="node_edges")
+                for edge, source, target in result.result_set:
+                    edges[edge.id] = (str(source), str(target), edge.relation, edge.properties)
+    return list(edges.values())
+
+
+async def _restore_edges(edges: List[Tuple[str, str, str, Dict[str, Any]]], batch_size: int):
+    """Vuelve a crear relaciones leídas con _load_node_edges (tras recrear sus extremos)."""
+    endpoints = sorted({endpoint for source, target, _, _ in edges for endpoint in (source, target)})
+    node_labels = await _find_node_labels(endpoints, batch_size)
+    groups: Dict[Tuple[str, str, str], List[Dict[str, Any]]] = {}
+    for source, target, rel_type, props in edges:
+        if source in node_labels and target in node_labels:
+            groups.setdefault((node_labels[source], node_labels[target], rel_type), []).append(
+                {"source": source, "target": target, "props": props})
+    for (source_label, target_label, rel_type), rows in groups.items():
+        query = CREATE_EDGES_QUERY.format(source_label=source_label, target_label=target_label, rel_type=rel_type)
+        for batch in _chunks(rows, batch_size):
+            await graph_query(query, {"rows": batch}, kind="restore_edges")
+
+
+async def _delete_nodes(ids_by_label: Dict[str, List[str]], batch_size: int, keep_payloads: set) -> int:
+    """DETACH DELETE por lotes; borra también el payload salvo para los ids de `keep_payloads`."""
+    deleted = 0
+    for label, ids in ids_by_label.items():
+        for ids_batch in _chunks(ids, batch_size):
+            result = await graph_query(DELETE_NODES_QUERY.format(label=label), {"ids": ids_batch}, kind="delete_nodes")
+            deleted += result.nodes_deleted
+            stale = [frontend_id for frontend_id in ids_batch if frontend_id not in keep_payloads]
+            if stale:
+                await run_db(redis_conn.hdel, graph_key(PAYLOADS_SUFFIX), *stale)
+    return deleted
+
+
+async def _sync_nodes(rows_by_label: Dict[str, List[Tuple[int, Dict[str, Any]]]], payloads: Dict[str, Dict[str, Any]],
+                      mode: str, batch_size: int, report: Dict[str, Any]):
+    """Compara el payload con lo guardado y solo escribe lo que cambió (MERGE por frontend_id)."""
+    stored = await _load_stored_hashes(rows_by_label, mode, batch_size)
+
+    incoming_ids = set()
+    to_delete: Dict[str, List[str]] = {}
+    for label, indexed_rows in rows_by_label.items():
+        pending = []
+        created = 0
+        for index, row in indexed_rows:
+            frontend_id = str(row["frontend_id"])
+            incoming_ids.add(frontend_id)
+            previous = stored.get(frontend_id)
+            if previous is None:
+                created += 1
+                pending.append((index, row))
+                continue
+            stored_label, stored_hash, stored_payload_hash, stored_position = previous
+            if frontend_id not in payloads and stored_payload_hash:
+                # Nodo reenviado sin su payload: conservar el que ya está guardado, con
+                # su hasDetails (SET n = r lo borraría y el nodo quedaría sin detalles).
+                row["payload_hash"] = stored_payload_hash
+                if not row.get("hasDetails"):
+                    row["hasDetails"] = True
+                    row["content_hash"] = node_content_hash(label, row)
+            if stored_label != label:
+                # Cambio de etiqueta: se borra el nodo viejo y se crea bajo la nueva.
+                to_delete.setdefault(stored_label, []).append(frontend_id)
+                report["updated"] += 1
+                pending.append((index, row))
+            elif (stored_hash != row["content_hash"] or stored_payload_hash != row.get("payload_hash")
+                  or stored_position != (row.get("x"), row.get("y"))):
+                report["updated"] += 1
+                pending.append((index, row))
+            else:
+                report["unchanged"] += 1
+        report["created"] += created
+        rows_by_label[label] = pending
+
+    if mode == "incremental":
+        for frontend_id, (stored_label, _, _, _) in stored.items():
+            if frontend_id not in incoming_ids:
+                to_delete.setdefault(stored_label, []).append(frontend_id)
+
+    relabeled_edges = []
+    if mode == "merge" and to_delete:
+        # DETACH DELETE se lleva las relaciones del nodo; en merge las que no vengan
+        # en el payload se conservan, así que se guardan para recrearlas.
+        relabeled_edges = await _load_node_edges(to_delete, batch_size)
+    if to_delete:
+        # Los cambios de etiqueta también pasan por aquí, pero no son borrados netos.
+        removed = await _delete_nodes(to_delete, batch_size, keep_payloads=incoming_ids)
+        relabeled = sum(1 for ids in to_delete.values() for frontend_id in ids if frontend_id in incoming_ids)
+        report["deleted"] += max(0, removed - relabeled)
+
+    errors_before = len(report["errors"])
+    for label, pending in rows_by_label.items():
+        if pending:
+            await _write_batches("node", label, pending, UPSERT_NODES_QUERY.format(label=label),
+                                 batch_size, report, payloads)
+    if relabeled_edges:
+        await _restore_edges(relabeled_edges, batch_size)
+
+    failed = _failed_ids(report, "node", errors_before)
+    await publish_changes("nodes_upserted", [
+        properties_to_frontend(label, row) for label, pending in rows_by_label.items()
+        for _, row in pending if str(row["frontend_id"]) not in failed
+    ])
+    await publish_changes("nodes_deleted", [frontend_id for ids in to_delete.values() for frontend_id in ids
+                                            if frontend_id not in incoming_ids])
+
+
+async def get_labels() -> List[str]:
+    result = await graph_query("CALL db.labels()", kind="labels")
+    return [label for (label,) in result.result_set]
+
+
+async def _find_node_labels(frontend_ids: List[str], batch_size: int) -> Dict[str, str]:
+    """Busca en el grafo la etiqueta de nodos que no venían en el payload."""
+    found: Dict[str, str] = {}
+    if not frontend_ids:
+        return found
+    for label in await get_labels():
+        missing = [frontend_id for frontend_id in frontend_ids if frontend_id not in found]
+        if not missing:
+            break
+        for ids_batch in _chunks(missing, batch_size):
+            result = await graph_query(FIND_NODES_QUERY.format(label=label), {"ids": ids_batch}, kind="find_nodes")
+            for (frontend_id,) in result.result_set:
+                found[str(frontend_id)] = label
+    return found
+
+
+async def _load_stored_edges(rows: List[Tuple[int, str, Dict[str, Any]]], node_labels: Dict[str, str],
+                             batch_size: int) -> List[List[Any]]:
+    """Relaciones guardadas con los ids entrantes que salen del origen o llegan al destino entrantes.
+
+    Cubre los cambios de tipo y de uno de los extremos; las mismas columnas que STORED_EDGES_QUERY.
+    """
+    by_source: Dict[str, List[Dict[str, str]]] = {}
+    by_target: Dict[str, List[Dict[str, str]]] = {}
+    for _, _, row in rows:
+        lookup = {"id": row["id"], "source": row["source"], "target": row["target"]}
+        by_source.setdefault(node_labels[row["source"]], []).append(lookup)
+        by_target.setdefault(node_labels[row["target"]], []).append(lookup)
+    found = []
+    for template, groups, label_key in ((STORED_EDGES_BY_SOURCE_QUERY, by_source, "source_label"),
+                                        (STORED_EDGES_BY_TARGET_QUERY, by_target, "target_label")):
+        for label, lookups in groups.items():
+            query = template.format(**{label_key: label})
+            for batch in _chunks(lookups, batch_size):
+                found.extend((await graph_query(query, {"rows": batch}, kind="load_edges")).result_set)
+    return found
+
+
+async def _store_edges(edges: List[Dict[str, Any]], node_labels: Dict[str, str], mode: str,
+                       batch_size: int, report: Dict[str, Any], start_index: int = 0):
+    """Ingest de aristas por lotes, agrupadas por (etiqueta origen, etiqueta destino, tipo).
+
+    Los extremos se resuelven por frontend_id usando el índice de su etiqueta;
+    las aristas cuyo extremo no existe se reportan en `dangling_edges`.
+    """
+    rows: List[Tuple[int, str, Dict[str, Any]]] = []
+    for index, edge_data in enumerate(edges, start_index):
+        try:
+            rel_type, row = edge_to_row(edge_data)
+        except ValueError as e:
+            edge_id = edge_data.get("id") if isinstance(edge_data, dict) else None
+            report["errors"].append({"kind": "edge", "index": index, "id": edge_id, "error": str(e)})
+            continue
+        rows.append((index, rel_type, row))
+    if not rows and mode != "incremental":
+        return
+
+    unknown = sorted({endpoint for _, _, row in rows for endpoint in (row["source"], row["target"])
+                      if endpoint not in node_labels})
+    if unknown and mode != "incremental":  # en incremental, lo que no vino ya se borró
+        node_labels = {**node_labels, **await _find_node_labels(unknown, batch_size)}
+
+    valid: List[Tuple[int, str, Dict[str, Any]]] = []
+    for index, rel_type, row in rows:
+        missing = [endpoint for endpoint in (row["source"], row["target"]) if endpoint not in node_labels]
+        if missing:
+            report["dangling_edges"].append({"index": index, "id": row["id"], "source": row["source"],
+                                             "target": row["target"], "missing": missing})
+            continue
+        valid.append((index, rel_type, row))
+
+    # {frontend_id: {(origen, etiqueta origen, tipo, hash)}}: puede haber más de una
+    # relación con el mismo id (p.ej. duplicados de cargas anteriores).
+    stored: Dict[str, set] = {}
+    if mode == "incremental":
+        result = await graph_query(STORED_EDGES_QUERY, kind="load_edges")
+        stored_rows = result.result_set
+    elif mode == "merge":
+        stored_rows = await _load_stored_edges(valid, node_labels, batch_size)
+    else:
+        stored_rows = []
+    for edge_id, source, labels, rel_type, stored_hash in stored_rows:
+        label = labels[0] if isinstance(labels, list) else labels
+        stored.setdefault(str(edge_id), set()).add((str(source), label, rel_type, stored_hash))
+
+    groups: Dict[Tuple[str, str, str], List[Tuple[int, Dict[str, Any]]]] = {}
+    to_delete: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+    incoming_ids = set()
+    for index, rel_type, row in valid:
+        incoming_ids.add(row["id"])
+        previous = stored.get(row["id"], ())
+        if len(previous) == 1 and next(iter(previous))[3] == row["props"]["content_hash"]:
+            report["edges_unchanged"] += 1
+            continue
+        # Cambió: se borra la relación vieja y se crea de nuevo (puede cambiar de tipo o extremos).
+        for source, source_label, stored_type, _ in previous:
+            to_delete.setdefault((source_label, stored_type), []).append({"id": row["id"], "source": source})
+        key = (node_labels[row["source"]], node_labels[row["target"]], rel_type)
+        groups.setdefault(key, []).append((index, row))
+
+    for edge_id, previous in stored.items():
+        if edge_id not in incoming_ids:
+            for source, source_label, rel_type, _ in previous:
+                to_delete.setdefault((source_label, rel_type), []).append({"id": edge_id, "source": source})
+            report["edges_deleted"] += 1
+
+    for (source_label, rel_type), delete_rows in to_delete.items():
+        query = DELETE_EDGES_QUERY.format(source_label=source_label, rel_type=rel_type)
+        for batch in _chunks(delete_rows, batch_size):
+            await graph_query(query, {"rows": batch}, kind="delete_edges")
+
+    errors_before = len(report["errors"])
+    template = CREATE_EDGES_QUERY if mode != "merge" else UPSERT_EDGES_QUERY
+    for (source_label, target_label, rel_type), indexed_rows in groups.items():
+        query = template.format(source_label=source_label, target_label=target_label, rel_type=rel_type)
+        await _write_batches("edge", f"(:{source_label})-[:{rel_type}]->(:{target_label})", indexed_rows,
+                             query, batch_size, report)
+
+    if mode != "overwrite":  # el overwrite publica un 'reset' al terminar
+        failed = _failed_ids(report, "edge", errors_before)
+        await publish_changes("edges_upserted", [
+            edge_to_frontend(row["source"], row["target"], row["props"].get("label", rel_type), 0, row["id"])
+            for (_, _, rel_type), indexed_rows in groups.items() for _, row in indexed_rows
+            if row["id"] not in failed
+        ])
+        await publish_changes("edges_deleted", [edge_id for edge_id in stored if edge_id not in incoming_ids])
+
+
+# --- FUNCIONES DE LECTURA ---
+EDGE_COLUMNS = ("s.frontend_id AS source, t.frontend_id AS target, coalesce(r.label, type(r)) AS label, "
+                "id(r) as rel_id, r.frontend_id AS edge_id")
+EDGES_QUERY = "MATCH (s{label})-[r]->(t{label}) {where}RETURN " + EDGE_COLUMNS
+
+
+def _is_heavy_stored_value(key: str, value: Any) -> bool:
+    if key in HEAVY_PROPERTY_KEYS:
+        return True
+    return isinstance(value, str) and len(value) > PAYLOAD_INLINE_LIMIT and value.startswith(('{', '['))
+
+
+def node_to_frontend(node, include_heavy: bool = False) -> Optional[Dict[str, Any]]:
+    """Convierte un nodo de RedisGraph al formato que espera React Flow.
+
+    Salvo que se pida `include_heavy`, se omiten las propiedades pesadas que
+    nodos antiguos aún guardan dentro del grafo (se marcan con hasDetails).
+    """
+    return properties_to_frontend(node.label, node.properties, include_heavy)
+
+
+def properties_to_frontend(label: str, properties: Dict[str, Any],
+                           include_heavy: bool = False) -> Optional[Dict[str, Any]]:
+    """Igual que node_to_frontend, a partir de la etiqueta y las propiedades guardadas (o una fila del ingest)."""
+    props = {}
+    has_heavy = False
+    for k, v in properties.items():
+        if not include_heavy and _is_heavy_stored_value(k, v):
+            has_heavy = True
+            continue
+        props[k] = v
+    props = decode_properties(props)
+
+    if 'frontend_id' not in props: return None
+
+    data_for_frontend = {k: v for k, v in props.items() if k not in INTERNAL_PROPERTIES}
+    if has_heavy:
+        data_for_frontend["hasDetails"] = True
+    return {
+        "id": props['frontend_id'],
+        "type": label,
+        "position": {"x": props.get('x', 0.0), "y": props.get('y', 0.0)},
+        "data": data_for_frontend
+    }
+
+
+def edge_to_frontend(source: Any, target: Any, label: str, rel_id: int, edge_id: Optional[str] = None) -> Dict[str, Any]:
+    return {
+        "id": edge_id or f"edge-{rel_id}", "source": source, "target": target, "label": label,
+        "type": "smoothstep", "markerEnd": {"type": "arrowclosed"}
+    }
+
+
+async def fetch_all_graph_data() -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """Como get_all_graph_data, pero propaga los errores (para no cachear un grafo vacío)."""
+    if not redis_conn:
+        raise HTTPException(status_code=503, detail="Database not connected")
+
+    nodes_result = await graph_query("MATCH (n) RETURN n", kind="read_all_nodes")
+    edges_result = await graph_query(EDGES_QUERY.format(label="", where=""), kind="read_all_edges")
+
+    frontend_nodes = []
+    if nodes_result:
+        for record in nodes_result.result_set:
+            frontend_node = node_to_frontend(record[0])
+            if frontend_node:
+                frontend_nodes.append(frontend_node)
+
+    frontend_edges = []
+    if edges_result:
+        for record in edges_result.result_set:
+            frontend_edges.append(edge_to_frontend(*record))
+
+    logger.debug("get_all_graph_data: Devolviendo %s nodos y %s aristas.", len(frontend_nodes), len(frontend_edges))
+    return frontend_nodes, frontend_edges
 
-    # 4. Si todo falla, devolver el string original
-    return value
 
 async def get_all_graph_data() -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
-    if not redis_graph: return [], []
+    if not redis_conn: return [], []
 
     try:
-        nodes_result = redis_graph.query("MATCH (n) RETURN n")
-        edges_result = redis_graph.query("MATCH (s)-[r]->(t) RETURN s.frontend_id AS source, t.frontend_id AS target, type(r) AS label, id(r) as rel_id")
-
-        frontend_nodes = []
-        if nodes_result:
-            for record in nodes_result.result_set:
-                node = record[0]
-                # Aplicar la conversión a cada propiedad
-                props = {k: from_redis_value(v) for k, v in node.properties.items()}
-
-                if 'frontend_id' not in props: continue
-
-                data_for_frontend = {k: v for k, v in props.items() if k not in ['x', 'y', 'frontend_id']}
-                
-                frontend_nodes.append({
-                    "id": props['frontend_id'],
-                    "type": node.label,
-                    "position": {"x": props.get('x', 0.0), "y": props.get('y', 0.0)},
-                    "data": data_for_frontend
-                })
-
-        frontend_edges = []
-        if edges_result:
-            for source, target, label, rel_id in edges_result.result_set:
-                frontend_edges.append({
-                    "id": f"edge-{rel_id}", "source": source, "target": target, "label": label,
-                    "type": "smoothstep", "markerEnd": {"type": "arrowclosed"}
-                })
-        
-        print(f"get_all_graph_data: Devolviendo {len(frontend_nodes)} nodos y {len(frontend_edges)} aristas.")
-        return frontend_nodes, frontend_edges
-
+        return await fetch_all_graph_data()
     except Exception as e:
-        print(f"ERROR CRÍTICO al consultar datos del grafo: {e}")
-        traceback.print_exc()
+        logger.exception("ERROR CRÍTICO al consultar datos del grafo: %s", e)
         return [], []
 
+
+# --- LECTURA PAGINADA ---
+# El cursor es el id interno del último nodo devuelto. `id(n) > $cursor` se
+# resuelve con un NodeByIdSeek por rango, que recorre los ids en orden
+# ascendente, así que cada página cuesta O(limit) y no O(N). Las aristas de una
+# página son las que salen de sus nodos, de modo que cada arista aparece en una
+# sola página. Los ids internos se reutilizan tras un borrado: una paginación
+# concurrente con escrituras no es una instantánea consistente.
+
+def _label_pattern(label: Optional[str]) -> str:
+    if label is None:
+        return ""
+    if not label.isidentifier():
+        raise HTTPException(status_code=400, detail=f"Invalid node type: {label}")
+    return f":{label}"
+
+
+async def get_nodes_page(cursor: int = -1, limit: int = GRAPH_PAGE_SIZE, label: Optional[str] = None
+                         ) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+    """Devuelve (nodos, siguiente_cursor); el cursor es None en la última página.
+
+    Con `label` solo se recorren los nodos de esa etiqueta.
+    """
+    if not redis_conn: return [], None
+
+    result = await graph_query(f"MATCH (n{_label_pattern(label)}) WHERE id(n) > $cursor RETURN n, id(n) LIMIT $limit",
+                               {"cursor": cursor, "limit": limit}, kind="read_nodes_page")
+    nodes = []
+    last_id = cursor
+    for node, node_id in result.result_set:
+        last_id = max(last_id, node_id)
+        frontend_node = node_to_frontend(node)
+        if frontend_node:
+            nodes.append(frontend_node)
+    next_cursor = last_id if len(result.result_set) == limit else None
+    return nodes, next_cursor
+
+
+async def get_edges_from_sources(after_id: int, up_to_id: Optional[int], label: Optional[str] = None
+                                 ) -> List[Dict[str, Any]]:
+    """Aristas cuyo nodo origen tiene id interno en (after_id, up_to_id].
+
+    Con `label` solo las aristas entre nodos de esa etiqueta.
+    """
+    if not redis_conn: return []
+
+    if up_to_id is None:
+        where, params = "WHERE id(s) > $lo ", {"lo": after_id}
+    else:
+        where, params = "WHERE id(s) > $lo AND id(s) <= $hi ", {"lo": after_id, "hi": up_to_id}
+    result = await graph_query(EDGES_QUERY.format(label=_label_pattern(label), where=where), params,
+                               kind="read_edges_page")
+    return [edge_to_frontend(*record) for record in result.result_set]
+
+
+async def get_graph_page(cursor: int = -1, limit: int = GRAPH_PAGE_SIZE, label: Optional[str] = None
+                         ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], Optional[int]]:
+    """Una página de nodos junto con las aristas que salen de ellos."""
+    nodes, next_cursor = await get_nodes_page(cursor, limit, label)
+    edges = await get_edges_from_sources(cursor, next_cursor, label)
+    return nodes, edges, next_cursor
+
+
+async def iter_graph_pages(limit: int = GRAPH_PAGE_SIZE, label: Optional[str] = None
+                           ) -> AsyncIterator[Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]]:
+    """Recorre el grafo completo (o una etiqueta) página a página con memoria acotada por `limit`."""
+    cursor: Optional[int] = -1
+    while cursor is not None:
+        nodes, edges, cursor = await get_graph_page(cursor, limit, label)
+        yield nodes, edges
+
+
+# --- LAYOUT ---
+# Solo lo que necesita el cálculo de posiciones: ids, etiqueta, x/y y la
+# topología como pares de ids internos, leídos por páginas de id(n).
+LAYOUT_NODES_QUERY = ("MATCH (n) WHERE id(n) > $cursor "
+                      "RETURN id(n), n.frontend_id, labels(n)[0], n.x, n.y LIMIT $limit")
+LAYOUT_EDGES_QUERY = "MATCH (s)-[]->(t) WHERE id(s) > $lo AND id(s) <= $hi RETURN id(s), id(t)"
+SET_POSITIONS_QUERY = "UNWIND $rows AS r MATCH (n:{label} {{frontend_id: r.id}}) SET n.x = r.x, n.y = r.y"
+
+
+async def get_layout_input(limit: int = GRAPH_PAGE_SIZE) -> Dict[str, List[Any]]:
+    """Ids internos, frontend_id, etiqueta y x/y de cada nodo, más las aristas como pares de ids internos."""
+    data: Dict[str, List[Any]] = {"internal_ids": [], "ids": [], "labels": [], "positions": [], "edges": []}
+    cursor = -1
+    while cursor is not None:
+        result = await graph_query(LAYOUT_NODES_QUERY, {"cursor": cursor, "limit": limit}, kind="layout_nodes")
+        if not result.result_set:
+            break
+        for internal_id, frontend_id, label, x, y in result.result_set:
+            if frontend_id is not None:
+                data["internal_ids"].append(internal_id)
+                data["ids"].append(frontend_id)
+                data["labels"].append(label)
+                data["positions"].append((x, y))
+        last = max(row[0] for row in result.result_set)
+        edges = await graph_query(LAYOUT_EDGES_QUERY, {"lo": cursor, "hi": last}, kind="layout_edges")
+        data["edges"].extend(edges.result_set)
+        cursor = last if len(result.result_set) == limit else None
+    return data
+
+
+async def write_positions(rows: List[Tuple[str, str, float, float]], batch_size: int = INGEST_BATCH_SIZE):
+    """Actualiza x/y de muchos nodos: un UNWIND por etiqueta y lote, usando el índice de frontend_id."""
+    by_label: Dict[str, List[Dict[str, Any]]] = {}
+    for frontend_id, label, x, y in rows:
+        by_label.setdefault(label, []).append({"id": frontend_id, "x": x, "y": y})
+    for label, label_rows in by_label.items():
+        query = SET_POSITIONS_QUERY.format(label=label)
+        for chunk in _chunks(label_rows, batch_size):
+            await graph_query(query, {"rows": chunk}, kind="write_positions")
+    await publish_changes("positions", [[frontend_id, x, y] for frontend_id, _, x, y in rows])
+
+
+# --- SUBGRAFOS ---
+# Lecturas acotadas para no descargar el grafo completo. Todas parten de
+# búsquedas por índice (frontend_id o rango sobre x), así que su costo crece
+# con el tamaño del resultado y no con el del grafo.
+SUBGRAPH_MAX_NODES = int(os.getenv("SUBGRAPH_MAX_NODES", 5000))
+MAX_NEIGHBORHOOD_HOPS = 3
+
+OUTGOING_EDGES_QUERY = ("UNWIND $ids AS id MATCH (s:{label} {{frontend_id: id}})-[r]->(t) "
+                        "RETURN " + EDGE_COLUMNS + ", t")
+INCOMING_EDGES_QUERY = ("UNWIND $ids AS id MATCH (t:{label} {{frontend_id: id}})<-[r]-(s) "
+                        "RETURN " + EDGE_COLUMNS + ", s")
+
+
+def _ids_by_label(nodes: List[Dict[str, Any]]) -> Dict[str, List[str]]:
+    grouped: Dict[str, List[str]] = {}
+    for node in nodes:
+        grouped.setdefault(node["type"], []).append(node["id"])
+    return grouped
+
+
+async def _adjacent(nodes: List[Dict[str, Any]], direction: str) -> List[Tuple[Dict[str, Any], Any]]:
+    """(arista, nodo vecino) de cada arista saliente ("out") o entrante ("in") de `nodes`."""
+    query = OUTGOING_EDGES_QUERY if direction == "out" else INCOMING_EDGES_QUERY
+    found = []
+    for label, ids in _ids_by_label(nodes).items():
+        for ids_batch in _chunks(ids, INGEST_BATCH_SIZE):
+            result = await graph_query(query.format(label=label), {"ids": ids_batch}, kind=f"adjacent_{direction}")
+            for *edge_fields, neighbor in result.result_set:
+                found.append((edge_to_frontend(*edge_fields), neighbor))
+    return found
+
+
+async def _edges_between(nodes: List[Dict[str, Any]], known_ids) -> Dict[str, Dict[str, Any]]:
+    """Aristas que salen de `nodes` hacia algún nodo de `known_ids`."""
+    return {edge["id"]: edge for edge, _ in await _adjacent(nodes, "out") if edge["target"] in known_ids}
+
+
+async def get_neighborhood(node_id: str, hops: int = 1, label: Optional[str] = None,
+                           labels: Optional[List[str]] = None, max_nodes: int = SUBGRAPH_MAX_NODES
+                           ) -> Optional[Dict[str, Any]]:
+    """Vecindario a `hops` saltos de un nodo, siguiendo aristas en ambas direcciones.
+
+    Se expande por niveles y cada nivel es una búsqueda por índice de la
+    frontera. `labels` limita los tipos de nodo incluidos (y por los que se
+    sigue expandiendo). Devuelve None si el nodo no existe.
+    """
+    if not redis_conn:
+        raise HTTPException(status_code=503, detail="Database not connected")
+    if label is None:
+        label = (await _find_node_labels([node_id], 1)).get(node_id)
+        if label is None:
+            return None
+    result = await graph_query(f"MATCH (n{_label_pattern(label)} {{frontend_id: $node_id}}) RETURN n LIMIT 1",
+                               {"node_id": node_id}, kind="find_node")
+    start = node_to_frontend(result.result_set[0][0]) if result.result_set else None
+    if start is None:
+        return None
+
+    nodes = {start["id"]: start}
+    edges: Dict[str, Dict[str, Any]] = {}
+    frontier = [start]
+    truncated = False
+    for _ in range(hops):
+        next_frontier = []
+        for direction in ("out", "in"):
+            for edge, neighbor in await _adjacent(frontier, direction):
+                node = node_to_frontend(neighbor)
+                if node is None or (labels and node["type"] not in labels):
+                    continue
+                if node["id"] not in nodes:
+                    if len(nodes) >= max_nodes:
+                        truncated = True
+                        continue
+                    nodes[node["id"]] = node
+                    next_frontier.append(node)
+                edges[edge["id"]] = edge
+        frontier = next_frontier
+        if not frontier:
+            break
+    # Las aristas entre nodos del último nivel no se recorrieron al expandir.
+    if frontier:
+        edges.update(await _edges_between(frontier, nodes))
+    return {"nodes": list(nodes.values()), "edges": list(edges.values()), "truncated": truncated}
+
+
+async def get_nodes_in_box(x_min: float, y_min: float, x_max: float, y_max: float,
+                           labels: Optional[List[str]] = None, limit: int = SUBGRAPH_MAX_NODES) -> Dict[str, Any]:
+    """Nodos cuya posición cae en el rectángulo dado, con las aristas entre ellos.
+
+    Pensado para cargar solo el área visible del lienzo. Usa el índice de x de
+    cada etiqueta para el rango; y se filtra sobre ese resultado.
+    """
+    if not redis_conn:
+        raise HTTPException(status_code=503, detail="Database not connected")
+    box = {"x_min": x_min, "x_max": x_max, "y_min": y_min, "y_max": y_max}
+    nodes: List[Dict[str, Any]] = []
+    truncated = False
+    for label in labels or await get_labels():
+        remaining = limit - len(nodes)
+        if remaining <= 0:
+            truncated = True
+            break
+        # Se pide uno de más para saber si el resultado quedó cortado.
+        result = await graph_query(f"MATCH (n{_label_pattern(label)}) WHERE n.x >= $x_min AND n.x <= $x_max "
+                                   "AND n.y >= $y_min AND n.y <= $y_max RETURN n LIMIT $limit",
+                                   {**box, "limit": remaining + 1}, kind="viewport")
+        if len(result.result_set) > remaining:
+            truncated = True
+        for (node,) in result.result_set[:remaining]:
+            frontend_node = node_to_frontend(node)
+            if frontend_node:
+                nodes.append(frontend_node)
+    edges = await _edges_between(nodes, {node["id"] for node in nodes})
+    return {"nodes": nodes, "edges": list(edges.values()), "truncated": truncated}
+
+
+async def get_node_details(node_id: str, label: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """Devuelve el nodo completo, incluido su payload pesado, o None si no existe.
+
+    Con `label` la búsqueda usa el índice de frontend_id de esa etiqueta.
+    """
+    if not redis_conn:
+        raise HTTPException(status_code=503, detail="Database not connected")
+    if label is not None and not label.isidentifier():
+        raise HTTPException(status_code=400, detail=f"Invalid node type: {label}")
+
+    pattern = f"(n:{label} {{frontend_id: $node_id}})" if label else "(n {frontend_id: $node_id})"
+    result = await graph_query(f"MATCH {pattern} RETURN n LIMIT 1", {'node_id': node_id}, kind="node_details")
+    if not result.result_set:
+        return None
+
+    details = node_to_frontend(result.result_set[0][0], include_heavy=True)
+    if details is None:
+        return None
+    payload = await get_payload(node_id)
+    if payload:
+        details["data"].update(payload)
+    return details
+
 # --- NUEVA FUNCIÓN PARA ELIMINAR UN NODO ---
 async def delete_node_by_id(node_id: str):
     """Elimina un nodo y sus relaciones por su frontend_id."""
-    if not redis_graph:
+    if not redis_conn:
         raise HTTPException(status_code=503, detail="Database not connected")
     
     try:
         # Usar DETACH DELETE para eliminar el nodo y todas las relaciones asociadas
         query = "MATCH (n {frontend_id: $node_id}) DETACH DELETE n"
-        result = redis_graph.query(query, {'node_id': node_id})
+        result = await graph_query(query, {'node_id': node_id}, kind="delete_node")
         
         nodes_deleted = result.nodes_deleted
-        print(f"INFO: delete_node_by_id('{node_id}') -> {nodes_deleted} nodo(s) eliminado(s).")
+        await run_db(redis_conn.hdel, graph_key(PAYLOADS_SUFFIX), node_id)
+        if nodes_deleted:
+            await bump_graph_version()
+            await publish_changes("nodes_deleted", [node_id])
+        logger.info("delete_node_by_id('%s') -> %s nodo(s) eliminado(s).", node_id, nodes_deleted)
         
         if nodes_deleted == 0:
             # Esto no es necesariamente un error, podría haber sido eliminado por otro proceso.
@@ -216,6 +1410,5 @@ async def delete_node_by_id(node_id: str):
         return True
         
     except Exception as e:
-        print(f"ERROR CRÍTICO al eliminar el nodo {node_id}: {e}")
-        traceback.print_exc()
+        logger.exception("ERROR CRÍTICO al eliminar el nodo %s: %s", node_id, e)
         raise HTTPException(status_code=500, detail=f"Error al eliminar el nodo de la base de datos: {e}")
\ No newline at end of file
@@ -0,0 +1,379 @@
+# backend/app/dossiers.py
+# Importación masiva de dossiers (JSON crudos de consultas) como nodos persona.
+#
+# Es el equivalente en servidor de extractPersonInfo/processJsonToSinglePersonNode
+# del frontend (utils/jsonProcessor.ts): mismas rutas priorizadas para nombre,
+# CURP, RFC y fecha de nacimiento. El parseo y la extracción corren en un pool
+# de procesos; la deduplicación usa diccionarios y los índices de curp/rfc. Las
+# personas nuevas se escriben con un solo ingest en modo 'merge'; en las que ya
+# existían solo se actualizan los campos extraídos y el payload (SET n +=), así
+# que conservan su posición y lo que haya agregado un analista.
+import asyncio
+import hashlib
+import io
+import json
+import logging
+import multiprocessing
+import os
+import re
+import tarfile
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from fastapi import HTTPException
+
+from . import crud
+from .encoding import JSON_PROPS_KEY
+
+logger = logging.getLogger(__name__)
+
+DOSSIER_WORKERS = int(os.getenv("DOSSIER_WORKERS", max(1, (os.cpu_count() or 2) - 1)))
+DOSSIER_CHUNKSIZE = 16  # archivos por tarea del pool
+MAX_DOSSIER_FILES = int(os.getenv("MAX_DOSSIER_FILES", 20000))
+# Tamaño descomprimido máximo por archivo dentro de un .zip/.tar y por archivo comprimido completo.
+MAX_DOSSIER_FILE_BYTES = int(os.getenv("MAX_DOSSIER_FILE_BYTES", 64 * 1024 * 1024))
+MAX_DOSSIER_ARCHIVE_BYTES = int(os.getenv("MAX_DOSSIER_ARCHIVE_BYTES", 512 * 1024 * 1024))
+UNKNOWN_NAME = "Persona Desconocida"
+# Cuadrícula para los nodos nuevos (los existentes conservan su posición).
+GRID_COLUMNS = 20
+GRID_X, GRID_Y = 240.0, 260.0
+
+CURP_PATHS = (
+    "curp_online.data.registros[0].curp", "buro1.data[0].curp", "ine2.data[0].curp",
+    "ine3.data[0].curp", "vacunacion.data[0].curp", "buro1.data[0].nombre.curp",
+    "pasaportes2022.data[0].solicitud.datos_personales.curp",
+    "pasaportes2023.data[0].solicitud.datos_personales.curp",
+)
+NAME_PATHS = (
+    "buro1.data[0].nombre_completo",
+    "buro1.data[0].nombre.nombre_completo",
+    "buro2.data[0].nombre_completo",
+    "vacunacion.data[0].NOMBRE",
+)
+RFC_PATHS = (
+    "buro1.data[0].rfc_completo",
+    "buro1.data[0].nombre.rfc_completo",
+    "buro2.data[0].rfc_completo",
+)
+BIRTH_DATE_PATHS = (
+    "curp_online.data.registros[0].fechaNacimiento",
+    "buro1.data[0].fecha_nacimiento",
+    "ine1.data[0].fecha_nac",
+    "buro1.data[0].nombre.fecha_nacimiento",
+)
+
+FIND_PEOPLE_QUERY = ("UNWIND $values AS v MATCH (n:person {{{prop}: v}}) "
+                     "RETURN v, n.frontend_id, n.x, n.y, n." + JSON_PROPS_KEY)
+# content_hash se borra: ya no describe el nodo completo y el siguiente merge lo reescribe.
+UPDATE_PEOPLE_QUERY = ("UNWIND $rows AS r MATCH (n:person {frontend_id: r.frontend_id}) "
+                       "SET n += r.props, n.content_hash = NULL")
+PEOPLE_BY_ID_QUERY = "UNWIND $ids AS id MATCH (n:person {frontend_id: id}) RETURN n"
+# Propiedades del nodo que la actualización de una persona existente no toca.
+KEPT_PROPERTIES = ("frontend_id", "x", "y", "content_hash")
+
+_ARRAY_PART_RE = re.compile(r"^(\w+)\[(\d+)\]$")
+
+
+def get_nested(obj: Any, path: str) -> Any:
+    """`get_nested(doc, "buro1.data[0].curp")`; None si algún tramo no existe."""
+    current = obj
+    for part in path.split("."):
+        if not isinstance(current, dict):
+            return None
+        match = _ARRAY_PART_RE.match(part)
+        if match:
+            items = current.get(match.group(1))
+            index = int(match.group(2))
+            if not isinstance(items, list) or index >= len(items):
+                return None
+            current = items[index]
+        elif part in current:
+            current = current[part]
+        else:
+            return None
+    return current
+
+
+def _first_string(doc: Dict[str, Any], paths, min_length: int) -> Tuple[Optional[str], Optional[str]]:
+    for path in paths:
+        value = get_nested(doc, path)
+        if isinstance(value, str) and len(value.strip()) > min_length:
+            return value.strip(), path
+    return None, None
+
+
+def _clean(value: Any) -> str:
+    return value.strip() if isinstance(value, str) else ""
+
+
+def extract_person_info(doc: Dict[str, Any]) -> Dict[str, Optional[str]]:
+    """Nombre, CURP, RFC, fecha de nacimiento e id del documento (None si no aparecen)."""
+    curp, _ = _first_string(doc, CURP_PATHS, 5)
+    name, name_path = _first_string(doc, NAME_PATHS, 3)
+    if name and name_path == "vacunacion.data[0].NOMBRE":  # Completar con apellidos si es de vacunación
+        name = " ".join(filter(None, [name, _clean(get_nested(doc, "vacunacion.data[0].PATERNO")),
+                                      _clean(get_nested(doc, "vacunacion.data[0].MATERNO"))]))
+    if not name or len(name.split(" ")) < 2:
+        nombres = _clean(get_nested(doc, "curp_online.data.registros[0].nombres") or get_nested(doc, "ine1.data[0].nombre"))
+        paterno = _clean(get_nested(doc, "curp_online.data.registros[0].primerApellido") or get_nested(doc, "ine1.data[0].paterno"))
+        materno = _clean(get_nested(doc, "curp_online.data.registros[0].segundoApellido") or get_nested(doc, "ine1.data[0].materno"))
+        if nombres and paterno:
+            name = " ".join(filter(None, [nombres, paterno, materno]))
+    rfc, _ = _first_string(doc, RFC_PATHS, 5)
+    birth_date = next((value for value in (get_nested(doc, path) for path in BIRTH_DATE_PATHS) if value), None)
+    doc_id = get_nested(doc, "_id.$oid")
+    return {"name": name, "curp": curp, "rfc": rfc, "fechaNacimiento": birth_date,
+            "docId": doc_id if isinstance(doc_id, str) else None}
+
+
+def _parse_documents(raw: bytes) -> List[Any]:
+    """Un archivo puede traer un dossier (objeto), una lista de dossiers o NDJSON."""
+    text = raw.decode("utf-8-sig")
+    try:
+        parsed = json.loads(text)
+    except json.JSONDecodeError:
+        return [json.loads(line) for line in text.splitlines() if line.strip()]
+    return parsed if isinstance(parsed, list) else [parsed]
+
+
+def extract_file(item: Tuple[str, bytes]) -> List[Dict[str, Any]]:
+    """Tarea del pool: parsea un archivo y extrae cada dossier que contenga."""
+    source, raw = item
+    try:
+        documents = _parse_documents(raw)
+    except (ValueError, UnicodeDecodeError) as e:
+        return [{"source": source, "error": f"JSON inválido: {e}"}]
+    extracted = []
+    for index, doc in enumerate(documents):
+        if not isinstance(doc, dict):
+            extracted.append({"source": source, "index": index, "error": "el dossier no es un objeto JSON"})
+            continue
+        extracted.append({"source": source, "index": index, "info": extract_person_info(doc), "doc": doc})
+    return extracted
+
+
+def _check_archive_sizes(filename: str, sizes: List[int]):
+    """413 si algún archivo o el total descomprimido pasan de los límites (antes de extraer nada)."""
+    if any(size > MAX_DOSSIER_FILE_BYTES for size in sizes):
+        raise HTTPException(status_code=413,
+                            detail=f"{filename}: file too large once uncompressed (max {MAX_DOSSIER_FILE_BYTES} bytes)")
+    if sum(sizes) > MAX_DOSSIER_ARCHIVE_BYTES:
+        raise HTTPException(status_code=413,
+                            detail=f"{filename}: archive too large once uncompressed "
+                                   f"(max {MAX_DOSSIER_ARCHIVE_BYTES} bytes)")
+
+
+def iter_archive_files(filename: str, raw: bytes) -> Iterator[Tuple[str, bytes]]:
+    """(nombre, bytes) de cada .json/.ndjson dentro de un .zip/.tar(.gz), o el archivo tal cual.
+
+    Los tamaños declarados se validan antes de leer: zipfile no descomprime más
+    allá de file_size (falla el CRC) y en tar el tamaño del miembro es exacto.
+    """
+    lower = filename.lower()
+    if lower.endswith(".zip"):
+        with zipfile.ZipFile(io.BytesIO(raw)) as archive:
+            infos = [info for info in archive.infolist()
+                     if not info.is_dir() and info.filename.lower().endswith((".json", ".ndjson"))]
+            _check_archive_sizes(filename, [info.file_size for info in infos])
+            for info in infos:
+                yield f"{filename}/{info.filename}", archive.read(info)
+    elif lower.endswith((".tar", ".tar.gz", ".tgz")):
+        with tarfile.open(fileobj=io.BytesIO(raw)) as archive:
+            members = [member for member in archive.getmembers()
+                       if member.isfile() and member.name.lower().endswith((".json", ".ndjson"))]
+            _check_archive_sizes(filename, [member.size for member in members])
+            for member in members:
+                yield f"{filename}/{member.name}", archive.extractfile(member).read()
+    else:
+        yield filename, raw
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # spawn: el worker de uvicorn ya tiene hilos (executor de Redis) y fork no es seguro.
+        _pool = ProcessPoolExecutor(max_workers=DOSSIER_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+
+def shutdown_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False)
+        _pool = None
+
+
+async def extract_files(files: List[Tuple[str, bytes]]) -> List[Dict[str, Any]]:
+    loop = asyncio.get_running_loop()
+    if len(files) == 1:
+        # Un solo archivo (p.ej. un NDJSON grande) también se parsea fuera del event loop.
+        return await loop.run_in_executor(_get_pool(), extract_file, files[0])
+    results = await loop.run_in_executor(
+        None, lambda: list(_get_pool().map(extract_file, files, chunksize=DOSSIER_CHUNKSIZE))
+    )
+    return [entry for entries in results for entry in entries]
+
+
+def person_node_id(info: Dict[str, Optional[str]], doc: Dict[str, Any]) -> str:
+    """Id estable: por CURP, si no por RFC, si no nombre + hash del documento (sin bucles de colisión)."""
+    if info["curp"]:
+        return f"person-{info['curp']}"
+    if info["rfc"]:
+        return f"person-rfc-{info['rfc']}"
+    slug = re.sub(r"[^a-zA-Z0-9]", "_", info["name"] or "").lower() or "persona"
+    digest = hashlib.sha1(json.dumps(doc, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:10]
+    return f"person-{slug}-{digest}"
+
+
+def person_node(node_id: str, info: Dict[str, Optional[str]], doc: Dict[str, Any],
+                position: Dict[str, float]) -> Dict[str, Any]:
+    """Mismo nodo que arma processJsonToSinglePersonNode en el frontend."""
+    details = {}
+    if info["rfc"]:
+        details["RFC"] = info["rfc"]
+    if info["fechaNacimiento"]:
+        details["Fec. Nac."] = info["fechaNacimiento"]
+    if info["docId"]:
+        details["ID Doc."] = info["docId"][:10] + "..."
+    data = {
+        "name": info["name"] or UNKNOWN_NAME,
+        "title": f"CURP: {info['curp'] or 'N/A'}",
+        "typeDetails": "Persona",
+        "status": "normal",
+        "details": details,
+        "rawJsonData": doc,
+    }
+    if info["curp"]:
+        data["curp"] = info["curp"]
+    if info["rfc"]:
+        data["rfc"] = info["rfc"]
+    return {"id": node_id, "type": "person", "position": position, "data": data}
+
+
+async def find_existing_people(values_by_prop: Dict[str, List[str]], batch_size: int) -> Dict[Tuple[str, str], Dict[str, Any]]:
+    """(propiedad, valor) -> {id, x, y, json_props} de las personas ya guardadas con ese CURP/RFC (por índice)."""
+    found: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    for prop, values in values_by_prop.items():
+        for values_batch in crud._chunks(sorted(set(values)), batch_size):
+            result = await crud.graph_query(FIND_PEOPLE_QUERY.format(prop=prop), {"values": values_batch},
+                                            kind="dossier_dedup")
+            for value, frontend_id, x, y, json_props in result.result_set:
+                found.setdefault((prop, value), {"id": frontend_id, "x": x, "y": y, "json_props": json_props})
+    return found
+
+
+def person_update_row(node: Dict[str, Any], stored_json_props: Optional[str]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """(fila para UPDATE_PEOPLE_QUERY, payload) de una persona que ya existe.
+
+    Solo lleva las propiedades extraídas; el sidecar de claves JSON se combina
+    con el guardado para que las demás propiedades se sigan leyendo igual.
+    """
+    _, row, payload = crud.node_to_row(node)
+    props = {key: value for key, value in row.items() if key not in KEPT_PROPERTIES}
+    if stored_json_props is None:
+        del props[JSON_PROPS_KEY]  # Nodo antiguo sin sidecar: se lee con decode_legacy_value
+    else:
+        kept = [key for key in stored_json_props.split(",") if key and key not in props]
+        props[JSON_PROPS_KEY] = ",".join(kept + [key for key in row[JSON_PROPS_KEY].split(",") if key])
+    return {"frontend_id": row["frontend_id"], "props": props}, payload or {}
+
+
+async def update_existing_people(updates: List[Tuple[Dict[str, Any], Optional[str]]], batch_size: int,
+                                 report: Dict[str, Any]):
+    """Actualiza en su lugar las personas ya guardadas: [(nodo, json_props guardado)]."""
+    rows, payloads = [], {}
+    for index, (node, stored_json_props) in enumerate(updates, report["nodes_received"]):
+        row, payload = person_update_row(node, stored_json_props)
+        rows.append((index, row))
+        payloads[str(row["frontend_id"])] = payload
+    report["nodes_received"] += len(rows)
+
+    payloads_key = crud.graph_key(crud.PAYLOADS_SUFFIX)
+    ids = list(payloads)
+    for ids_batch in crud._chunks(ids, batch_size):
+        # El payload nuevo reemplaza las claves extraídas; las demás propiedades pesadas se conservan.
+        stored = await crud.run_db(crud.redis_conn.hmget, payloads_key, ids_batch)
+        for frontend_id, raw in zip(ids_batch, stored):
+            if raw:
+                payloads[frontend_id] = {**json.loads(raw), **payloads[frontend_id]}
+    for _, row in rows:
+        row["props"]["payload_hash"] = crud.content_hash(payloads[str(row["frontend_id"])])
+
+    await crud.bump_graph_version()
+    try:
+        errors_before = len(report["errors"])
+        report["updated"] += await crud._write_batches("node", "person", rows, UPDATE_PEOPLE_QUERY,
+                                                       batch_size, report, payloads)
+        failed = crud._failed_ids(report, "node", errors_before)
+        written = [frontend_id for frontend_id in ids if frontend_id not in failed]
+        nodes = []
+        for ids_batch in crud._chunks(written, batch_size):
+            result = await crud.graph_query(PEOPLE_BY_ID_QUERY, {"ids": ids_batch}, kind="dossier_nodes")
+            nodes.extend(crud.node_to_frontend(node) for node, in result.result_set)
+        await crud.publish_changes("nodes_upserted", nodes)
+    finally:
+        await crud.bump_graph_version()
+
+
+async def import_dossiers(files: List[Tuple[str, bytes]], batch_size: int = crud.INGEST_BATCH_SIZE) -> Dict[str, Any]:
+    """Extrae, deduplica y guarda como personas los dossiers de `files` [(nombre, bytes)]."""
+    if not crud.redis_conn:
+        raise HTTPException(status_code=503, detail="Database not connected")
+    if len(files) > MAX_DOSSIER_FILES:
+        raise HTTPException(status_code=413, detail=f"Too many files (max {MAX_DOSSIER_FILES})")
+
+    entries = await extract_files(files)
+    summary = {"files": len(files), "documents": len(entries), "persons": 0, "matched_existing": 0,
+               "duplicates_in_batch": 0, "skipped": [], "errors": []}
+
+    # Deduplicación dentro del lote: la primera aparición de cada CURP/RFC gana.
+    people: List[Tuple[Dict[str, Any], Dict[str, Any]]] = []
+    seen: Dict[Tuple[str, str], int] = {}
+    for entry in entries:
+        if "error" in entry:
+            summary["errors"].append({k: entry[k] for k in ("source", "index", "error") if k in entry})
+            continue
+        info = entry["info"]
+        if not info["name"] and not info["curp"]:
+            summary["skipped"].append({"source": entry["source"], "index": entry["index"],
+                                       "reason": "no se pudo identificar a la persona"})
+            continue
+        keys = [(prop, info[prop]) for prop in ("curp", "rfc") if info[prop]]
+        if any(key in seen for key in keys):
+            summary["duplicates_in_batch"] += 1
+            continue
+        for key in keys:
+            seen[key] = len(people)
+        people.append((info, entry["doc"]))
+
+    values_by_prop: Dict[str, List[str]] = {}
+    for prop, value in seen:
+        values_by_prop.setdefault(prop, []).append(value)
+    existing = await find_existing_people(values_by_prop, batch_size)
+
+    nodes = []
+    updates: List[Tuple[Dict[str, Any], Optional[str]]] = []
+    for info, doc in people:
+        match = next((existing[(prop, info[prop])] for prop in ("curp", "rfc")
+                      if info[prop] and (prop, info[prop]) in existing), None)
+        if match is not None:
+            # Se actualiza el nodo existente en su lugar (mismo id, posición y demás propiedades).
+            updates.append((person_node(match["id"], info, doc, {}), match["json_props"]))
+            continue
+        new_index = len(nodes)
+        position = {"x": (new_index % GRID_COLUMNS) * GRID_X, "y": (new_index // GRID_COLUMNS) * GRID_Y}
+        nodes.append(person_node(person_node_id(info, doc), info, doc, position))
+
+    summary["persons"] = len(nodes) + len(updates)
+    summary["matched_existing"] = len(updates)
+    summary["report"] = report = await crud.process_and_store_json({"nodes": nodes, "edges": []}, "merge",
+                                                                   batch_size)
+    if updates:
+        await update_existing_people(updates, batch_size, report)
+    logger.info("Importados %s dossiers: %s personas (%s existentes, %s duplicados en el lote)",
+                summary["documents"], summary["persons"], summary["matched_existing"], summary["duplicates_in_batch"])
+    return summary
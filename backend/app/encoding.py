@@ -0,0 +1,79 @@
+# backend/app/encoding.py
+import json
+from typing import Any, Dict, Tuple
+
+# Propiedad "sidecar" de cada nodo escrito con el codificador tipado: lista
+# separada por comas de las propiedades que guardan JSON (dicts/listas, que
+# RedisGraph no admite como propiedad). El resto se guarda con su tipo nativo
+# (str, int, float, bool) y RedisGraph lo devuelve igual. Las claves ya vienen
+# saneadas (solo alfanuméricos y "_"), así que la coma no es ambigua.
+# Su presencia distingue los nodos tipados de los antiguos.
+JSON_PROPS_KEY = "json_props"
+
+
+def encode_value(value: Any) -> Tuple[Any, bool]:
+    """Devuelve (valor a guardar, si se guardó como JSON)."""
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value, False
+    if isinstance(value, (dict, list, tuple)):
+        return json.dumps(value), True
+    return str(value), False
+
+
+def encode_properties(props: Dict[str, Any]) -> Dict[str, Any]:
+    """Codifica un dict de propiedades y añade el sidecar JSON_PROPS_KEY."""
+    row: Dict[str, Any] = {}
+    json_keys = []
+    for key, value in props.items():
+        row[key], is_json = encode_value(value)
+        if is_json:
+            json_keys.append(key)
+    row[JSON_PROPS_KEY] = ",".join(json_keys)
+    return row
+
+
+def decode_properties(properties: Dict[str, Any]) -> Dict[str, Any]:
+    """Decodifica las propiedades leídas de un nodo.
+
+    Los nodos tipados solo parsean las claves listadas en el sidecar; los
+    antiguos (sin sidecar) pasan por `decode_legacy_value`.
+    """
+    json_props = properties.get(JSON_PROPS_KEY)
+    if json_props is None:
+        return {key: decode_legacy_value(value) for key, value in properties.items()}
+
+    decoded = dict(properties)
+    del decoded[JSON_PROPS_KEY]
+    if json_props:
+        for key in json_props.split(","):
+            if key in decoded:  # Las propiedades pesadas pueden haberse omitido
+                decoded[key] = json.loads(decoded[key])
+    return decoded
+
+
+def decode_legacy_value(value: Any) -> Any:
+    """Intenta convertir un string de Redis de vuelta a su tipo original.
+
+    Solo para nodos escritos antes del sidecar: adivina el tipo y puede
+    convertir en número un string que lo parece (p.ej. un teléfono).
+    """
+    if not isinstance(value, str):
+        return value # Si ya es un número o bool, devolverlo
+    
+    # 1. Intentar deserializar JSON (lo más común para datos complejos)
+    if value.startswith(('{', '[')):
+        try: return json.loads(value)
+        except json.JSONDecodeError: pass
+    
+    # 2. Intentar convertir a booleano
+    if value.lower() == 'true': return True
+    if value.lower() == 'false': return False
+    
+    # 3. Intentar convertir a número (primero a int, luego a float si falla)
+    try: return int(value)
+    except (ValueError, TypeError): pass
+    try: return float(value)
+    except (ValueError, TypeError): pass
+
+    # 4. Si todo falla, devolver el string original
+    return value
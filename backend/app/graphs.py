@@ -0,0 +1,77 @@
+# backend/app/graphs.py
+# Grafos con nombre: un workspace (grafo de RedisGraph + sus claves) por caso.
+#
+# Cada petición elige su grafo con el parámetro `graph` (main.select_graph), que
+# deja el GraphHandle en la variable de contexto `current_graph`; crud y los
+# demás módulos lo leen de ahí en lugar de un grafo global. Las tareas asyncio
+# heredan el contexto, así que un trabajo en segundo plano o una respuesta en
+# streaming siguen operando sobre el grafo de la petición que los creó.
+import contextvars
+import os
+import re
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from redisgraph import Graph
+
+GRAPH_NAME_PATTERN = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_-]{0,63}$")
+GRAPH_HANDLES_MAX = int(os.getenv("GRAPH_HANDLES_MAX", 64))
+
+
+class GraphHandle:
+    """El objeto Graph de redisgraph más el estado de este proceso para ese grafo."""
+
+    def __init__(self, name: str, conn):
+        self.name = name
+        self.graph = Graph(name, conn)
+        # Etiquetas cuyos índices ya se verificaron (ver crud.ensure_label_indices).
+        self.indexed_labels: set = set()
+        # Registro del grafo en Redis (crud.GRAPHS_KEY) con el que se crearon los
+        # índices; si cambia, otro worker lo borró y recreó (ver crud.open_graph).
+        self.registration: Optional[str] = None
+
+    def key(self, suffix: str) -> str:
+        """Clave de Redis asociada al grafo: "{grafo}:{suffix}"."""
+        return f"{self.name}:{suffix}"
+
+
+class GraphRegistry:
+    """LRU de GraphHandle por nombre: se crean al primer uso y se descartan los menos usados.
+
+    Descartar un handle solo libera la caché de esquema de redisgraph y la
+    memoria de índices verificados; el grafo en Redis no se toca.
+    """
+
+    def __init__(self, max_handles: int = GRAPH_HANDLES_MAX):
+        self.max_handles = max_handles
+        self._handles: "OrderedDict[str, GraphHandle]" = OrderedDict()
+
+    def get(self, name: str, conn) -> Tuple[GraphHandle, bool]:
+        """Devuelve (handle, creado_ahora)."""
+        handle = self._handles.get(name)
+        if handle is not None:
+            self._handles.move_to_end(name)
+            return handle, False
+        handle = GraphHandle(name, conn)
+        self._handles[name] = handle
+        while len(self._handles) > self.max_handles:
+            self._handles.popitem(last=False)
+        return handle, True
+
+    def evict(self, name: str):
+        self._handles.pop(name, None)
+
+    def clear(self):
+        self._handles.clear()
+
+    def __len__(self) -> int:
+        return len(self._handles)
+
+
+def is_valid_graph_name(name: str) -> bool:
+    # Sin ':' para que las claves "{grafo}:..." de dos grafos nunca se mezclen.
+    return isinstance(name, str) and bool(GRAPH_NAME_PATTERN.match(name))
+
+
+current_graph: "contextvars.ContextVar[Optional[GraphHandle]]" = contextvars.ContextVar("current_graph", default=None)
+registry = GraphRegistry()
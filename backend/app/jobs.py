@@ -0,0 +1,180 @@
+# backend/app/jobs.py
+import asyncio
+import contextlib
+import logging
+import os
+import time
+from typing import Any, AsyncIterator, Dict, Optional
+
+import redis
+from fastapi import HTTPException
+
+from . import crud, layout, streaming
+from .progress import ProgressTracker
+
+logger = logging.getLogger(__name__)
+
+INGEST_LOCK_SUFFIX = "ingest_lock"  # un lock por grafo: cargas de casos distintos corren en paralelo
+INGEST_LOCK_TTL = int(os.getenv("INGEST_LOCK_TTL", 60))  # se renueva mientras dura la carga
+INGEST_LOCK_WAIT = float(os.getenv("INGEST_LOCK_WAIT", 30))  # espera máxima de las cargas síncronas
+LOCK_POLL_INTERVAL = 1.0
+
+# Tareas de este worker. El estado de cada trabajo vive en Redis (ProgressTracker
+# "job"), así que cualquier worker puede consultarlo o pedir su cancelación.
+_running: Dict[str, asyncio.Task] = {}
+
+
+class JobCancelled(Exception):
+    pass
+
+
+async def _keep_lock_alive(lock):
+    while True:
+        await asyncio.sleep(INGEST_LOCK_TTL / 3)
+        await crud.run_db(lock.reacquire)
+
+
+@contextlib.asynccontextmanager
+async def graph_write_lock(wait: Optional[float] = INGEST_LOCK_WAIT):
+    """Lock de escritura del grafo en curso, compartido por todos los workers.
+
+    Evita que dos cargas (p.ej. dos 'overwrite') del mismo grafo se intercalen. Con `wait=None`
+    se espera indefinidamente; si no, se responde 409 al agotar la espera.
+    """
+    # thread_local=False: acquire y release pueden correr en hilos distintos del executor.
+    lock = crud.redis_conn.lock(crud.graph_key(INGEST_LOCK_SUFFIX), timeout=INGEST_LOCK_TTL, thread_local=False)
+    deadline = None if wait is None else time.monotonic() + wait
+    while not await crud.run_db(lock.acquire, blocking=False):
+        if deadline is not None and time.monotonic() >= deadline:
+            raise HTTPException(status_code=409, detail="Another load is in progress for this graph. Try again later.")
+        await asyncio.sleep(LOCK_POLL_INTERVAL)
+    keep_alive = asyncio.create_task(_keep_lock_alive(lock))
+    try:
+        yield
+    finally:
+        keep_alive.cancel()
+        try:
+            await crud.run_db(lock.release)
+        except redis.exceptions.LockError:
+            logger.warning("El lock de escritura del grafo expiró antes de liberarse.")
+
+
+async def _payload_items(data: Dict[str, Any]) -> AsyncIterator[streaming.GraphItem]:
+    for node in data.get("nodes", []) or []:
+        yield "node", node
+    for edge in data.get("edges", []) or []:
+        yield "edge", edge
+
+
+async def _cancel_requested(tracker: ProgressTracker) -> bool:
+    return await crud.run_db(crud.redis_conn.hget, tracker.key, "cancel_requested") == "true"
+
+
+async def submit_load_job(data: Dict[str, Any], mode: str, batch_size: int, username: str) -> str:
+    """Registra un trabajo de carga y lo lanza como tarea asyncio; devuelve su id."""
+    crud.validate_ingest_mode(mode)
+    tracker = ProgressTracker("job")
+    await tracker.update(status="queued", mode=mode, submitted_by=username, submitted_at=time.time(),
+                         nodes_total=len(data.get("nodes", []) or []),
+                         edges_total=len(data.get("edges", []) or []),
+                         nodes_written=0, edges_written=0)
+    task = asyncio.create_task(_run_load_job(tracker, data, mode, batch_size))
+    _running[tracker.id] = task
+    task.add_done_callback(lambda _: _running.pop(tracker.id, None))
+    return tracker.id
+
+
+async def _run_load_job(tracker: ProgressTracker, data: Dict[str, Any], mode: str, batch_size: int):
+    nodes_total = len(data.get("nodes", []) or [])
+    edges_total = len(data.get("edges", []) or [])
+    try:
+        async with graph_write_lock(wait=None):
+            if await _cancel_requested(tracker):
+                raise JobCancelled()
+            tracker.started_at = time.time()
+            await tracker.start()
+            started = time.monotonic()
+
+            async def on_batch(report: Dict[str, Any]):
+                if await _cancel_requested(tracker):
+                    raise JobCancelled()
+                elapsed = max(time.monotonic() - started, 1e-6)
+                done = report["nodes_received"] + report["edges_received"]
+                rate = done / elapsed
+                remaining = max(0, nodes_total + edges_total - done)
+                await tracker.update(nodes_written=report["nodes_written"], edges_written=report["edges_written"],
+                                     errors=len(report["errors"]), items_per_s=round(rate, 1),
+                                     eta_s=round(remaining / rate, 1) if rate else None,
+                                     percent=round(100 * done / max(1, nodes_total + edges_total), 1))
+
+            if mode == "incremental":
+                # El diff necesita el payload completo: no hay lotes intermedios que reportar.
+                report = await crud.process_and_store_json(data, mode, batch_size)
+            else:
+                report = await streaming.ingest_items(_payload_items(data), mode, batch_size, on_batch)
+        await tracker.finish("completed", percent=100.0, eta_s=0, nodes_written=report["nodes_written"],
+                             edges_written=report["edges_written"], errors=len(report["errors"]), report=report)
+    except (JobCancelled, asyncio.CancelledError):
+        logger.info("Trabajo de carga %s cancelado.", tracker.id)
+        await tracker.finish("cancelled")
+    except HTTPException as e:
+        await tracker.finish("failed", error=str(e.detail))
+    except Exception as e:
+        logger.exception("Falló el trabajo de carga %s: %s", tracker.id, e)
+        await tracker.finish("failed", error=str(e))
+
+
+async def submit_layout_job(algorithm: str, incremental: bool, iterations: Optional[int], force: bool,
+                            username: str) -> str:
+    """Lanza el cálculo de layout en segundo plano; se consulta como cualquier otro trabajo."""
+    tracker = ProgressTracker("job")
+    await tracker.update(status="queued", kind="layout", algorithm=algorithm, incremental=incremental,
+                         submitted_by=username, submitted_at=time.time())
+    task = asyncio.create_task(_run_layout_job(tracker, algorithm, incremental, iterations, force))
+    _running[tracker.id] = task
+    task.add_done_callback(lambda _: _running.pop(tracker.id, None))
+    return tracker.id
+
+
+async def _run_layout_job(tracker: ProgressTracker, algorithm: str, incremental: bool,
+                          iterations: Optional[int], force: bool):
+    try:
+        async with graph_write_lock(wait=None):
+            if await _cancel_requested(tracker):
+                raise JobCancelled()
+            tracker.started_at = time.time()
+            await tracker.start()
+            report = await layout.run_layout(algorithm, incremental, iterations, force)
+        await tracker.finish("completed", percent=100.0, report=report)
+    except (JobCancelled, asyncio.CancelledError):
+        logger.info("Trabajo de layout %s cancelado.", tracker.id)
+        await tracker.finish("cancelled")
+    except HTTPException as e:
+        await tracker.finish("failed", error=str(e.detail))
+    except Exception as e:
+        logger.exception("Falló el trabajo de layout %s: %s", tracker.id, e)
+        await tracker.finish("failed", error=str(e))
+
+
+async def get_job(job_id: str) -> Optional[Dict[str, Any]]:
+    return await ProgressTracker.load("job", job_id)
+
+
+async def cancel_job(job_id: str) -> Optional[Dict[str, Any]]:
+    """Pide la cancelación; el trabajo se detiene entre lotes (lo ya escrito se mantiene)."""
+    job = await get_job(job_id)
+    if job is None:
+        return None
+    if job.get("status") in ("queued", "running"):
+        await ProgressTracker("job", job_id).update(cancel_requested=True)
+        task = _running.get(job_id)
+        if task is not None and job.get("status") == "queued":
+            task.cancel()  # Aún esperando el lock en este worker: no hay nada a medio escribir
+    return await get_job(job_id)
+
+
+async def shutdown():
+    for task in list(_running.values()):
+        task.cancel()
+    if _running:
+        await asyncio.gather(*_running.values(), return_exceptions=True)
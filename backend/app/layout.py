@@ -0,0 +1,304 @@
+# backend/app/layout.py
+# Layout del grafo en el servidor (el frontend solo sabe colocar en cuadrícula).
+#
+# - "force": Fruchterman-Reingold vectorizado con NumPy. Hasta EXACT_REPULSION_MAX
+#   nodos la repulsión es exacta (O(N²) por bloques); por encima se aproxima con
+#   una cuadrícula (particle-mesh): exacta dentro de cada celda y, entre celdas,
+#   la masa de cada celda convolucionada con el núcleo de repulsión vía FFT.
+# - "hierarchical": capas por BFS desde las raíces (sin aristas entrantes),
+#   ordenadas dentro de cada capa por el baricentro de sus padres.
+#
+# Las posiciones se escriben de vuelta en el grafo en bloque y el resultado queda
+# registrado con la versión del grafo: pedir otra vez el mismo layout sobre la
+# misma versión no recalcula nada. En modo incremental solo se mueven los nodos
+# que no estaban en el último layout; los demás se quedan fijos.
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from fastapi import HTTPException
+
+from . import crud
+
+logger = logging.getLogger(__name__)
+
+LAYOUT_ALGORITHMS = ("force", "hierarchical")
+LAYOUT_SUFFIX = "layout"
+LAYOUT_NODES_SUFFIX = "layout:nodes"  # ids colocados por el último layout (para el incremental)
+
+NODE_SPACING = float(os.getenv("LAYOUT_NODE_SPACING", 250))  # distancia ideal entre nodos (px)
+LAYER_SPACING = float(os.getenv("LAYOUT_LAYER_SPACING", 300))
+EXACT_REPULSION_MAX = int(os.getenv("LAYOUT_EXACT_MAX", 3000))
+NODES_PER_CELL = 16
+MAX_GRID_SIDE = 512
+PAIR_BLOCK = 4_000_000  # pares (i, j) por bloque: acota la memoria a ~100 MB
+GRAVITY = 0.5
+MAX_LAYOUT_ITERATIONS = 500
+
+
+def default_iterations(n: int, incremental: bool = False) -> int:
+    if incremental:
+        return 60
+    return 300 if n <= 1000 else 150 if n <= 20000 else 60
+
+
+def _exact_repulsion(pos: np.ndarray, k2: float) -> np.ndarray:
+    n = len(pos)
+    disp = np.zeros_like(pos)
+    rows = max(1, PAIR_BLOCK // max(n, 1))
+    for start in range(0, n, rows):
+        delta = pos[start:start + rows, None, :] - pos[None, :, :]
+        dist2 = np.maximum(np.einsum("ijk,ijk->ij", delta, delta), 1e-2)
+        disp[start:start + rows] = np.einsum("ijk,ij->ik", delta, k2 / dist2)
+    return disp
+
+
+def _grid_repulsion(pos: np.ndarray, k2: float) -> np.ndarray:
+    n = len(pos)
+    side = int(np.clip(round(np.sqrt(n / NODES_PER_CELL)), 1, MAX_GRID_SIDE))
+    lo = pos.min(axis=0)
+    cell_size = np.maximum((pos.max(axis=0) - lo) / side, 1e-6)
+    cell_xy = np.minimum(((pos - lo) / cell_size).astype(np.int64), side - 1)
+    cell = cell_xy[:, 0] * side + cell_xy[:, 1]
+
+    # Entre celdas: la masa de la cuadrícula convolucionada (FFT) con el núcleo
+    # de repulsión k²·r/|r|²; el núcleo vale 0 en la propia celda.
+    mass = np.bincount(cell, minlength=side * side).astype(np.float64)
+    offsets = np.arange(-side + 1, side)
+    dx, dy = np.meshgrid(offsets * cell_size[0], offsets * cell_size[1], indexing="ij")
+    dist2 = dx * dx + dy * dy
+    dist2[side - 1, side - 1] = np.inf
+    shape = (3 * side - 2, 3 * side - 2)
+    mass_hat = np.fft.rfft2(mass.reshape(side, side), shape)
+    far = np.empty((side * side, 2))
+    for axis, component in enumerate((dx, dy)):
+        kernel_hat = np.fft.rfft2(k2 * component / dist2, shape)
+        full = np.fft.irfft2(mass_hat * kernel_hat, shape)
+        far[:, axis] = full[side - 1:2 * side - 1, side - 1:2 * side - 1].ravel()
+    disp = far[cell]
+    counts = mass.astype(np.int64)
+
+    # Dentro de cada celda: exacta. Con los nodos ordenados por celda, cada nodo
+    # se compara con el bloque contiguo de su celda; los pares se generan por lotes.
+    order = np.argsort(cell, kind="stable")
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    sorted_cell = cell[order]
+    reps = counts[sorted_cell]
+    cumulative = np.cumsum(reps)
+    begin = 0
+    while begin < n:
+        end = int(np.searchsorted(cumulative, (cumulative[begin - 1] if begin else 0) + PAIR_BLOCK, side="right"))
+        end = min(max(end, begin + 1), n)
+        block_reps = reps[begin:end]
+        total = int(block_reps.sum())
+        a = np.repeat(np.arange(begin, end), block_reps)
+        within = np.arange(total) - np.repeat(np.cumsum(block_reps) - block_reps, block_reps)
+        b = starts[sorted_cell[a]] + within
+        ia, ib = order[a], order[b]
+        delta = pos[ia] - pos[ib]
+        dist2 = np.maximum(np.einsum("ij,ij->i", delta, delta), 1e-2)
+        factor = np.where(ia == ib, 0.0, k2 / dist2)
+        disp[:, 0] += np.bincount(ia, weights=delta[:, 0] * factor, minlength=n)
+        disp[:, 1] += np.bincount(ia, weights=delta[:, 1] * factor, minlength=n)
+        begin = end
+    return disp
+
+
+def force_directed(positions: np.ndarray, edges: np.ndarray, movable: Optional[np.ndarray] = None,
+                   iterations: Optional[int] = None, spacing: float = NODE_SPACING) -> np.ndarray:
+    """Fruchterman-Reingold sobre `positions` (N x 2); `edges` es (M x 2) con índices de nodo.
+
+    Los nodos con `movable` False ejercen fuerza pero no se mueven.
+    """
+    pos = np.array(positions, dtype=np.float64)
+    n = len(pos)
+    if n < 2:
+        return pos
+    if movable is None:
+        movable = np.ones(n, dtype=bool)
+    iterations = iterations or default_iterations(n, not movable.all())
+    k = spacing
+    k2 = k * k
+    src, dst = (edges[:, 0], edges[:, 1]) if len(edges) else (np.empty(0, np.int64), np.empty(0, np.int64))
+    repulsion = _exact_repulsion if n <= EXACT_REPULSION_MAX else _grid_repulsion
+    # Temperatura: desplazamiento máximo por iteración, con enfriamiento lineal.
+    start_temp = k * np.sqrt(movable.sum()) / 4 if movable.all() else k * 3
+    for step in range(iterations):
+        disp = repulsion(pos, k2)
+        if len(src):
+            delta = pos[src] - pos[dst]
+            dist = np.maximum(np.sqrt(np.einsum("ij,ij->i", delta, delta)), 1e-2)
+            pull = delta * (dist / k)[:, None]
+            for axis in (0, 1):
+                disp[:, axis] -= np.bincount(src, weights=pull[:, axis], minlength=n)
+                disp[:, axis] += np.bincount(dst, weights=pull[:, axis], minlength=n)
+        # Gravedad débil hacia el centro: evita que los componentes sueltos se alejen sin límite.
+        disp -= GRAVITY * (pos - pos.mean(axis=0))
+        length = np.maximum(np.sqrt(np.einsum("ij,ij->i", disp, disp)), 1e-9)
+        temp = start_temp * (1 - step / iterations) + 1.0
+        disp *= (np.minimum(length, temp) / length)[:, None]
+        disp[~movable] = 0.0
+        pos += disp
+    return pos
+
+
+def hierarchical(n: int, edges: np.ndarray, spacing: float = NODE_SPACING,
+                 layer_spacing: float = LAYER_SPACING) -> np.ndarray:
+    """Capas de arriba abajo: profundidad BFS desde las raíces; orden por baricentro de los padres."""
+    depth = np.full(n, -1, dtype=np.int64)
+    if n == 0:
+        return np.zeros((0, 2))
+    src = edges[:, 0] if len(edges) else np.empty(0, np.int64)
+    dst = edges[:, 1] if len(edges) else np.empty(0, np.int64)
+    order = np.argsort(src, kind="stable")
+    targets = dst[order]
+    offsets = np.concatenate([[0], np.cumsum(np.bincount(src, minlength=n))])
+    indegree = np.bincount(dst, minlength=n)
+    # Raíces: sin aristas entrantes; en ciclos sin raíz se arranca del primer nodo no visitado.
+    frontier = list(np.nonzero(indegree == 0)[0])
+    candidates = iter(range(n))
+    level = 0
+    while True:
+        if not frontier:
+            start = next((i for i in candidates if depth[i] < 0), None)
+            if start is None:
+                break
+            frontier = [start]
+            level = 0
+        frontier = np.unique(np.asarray(frontier, dtype=np.int64))
+        frontier = frontier[depth[frontier] < 0]
+        if not len(frontier):
+            frontier = []
+            continue
+        depth[frontier] = level
+        children = np.concatenate([targets[offsets[i]:offsets[i + 1]] for i in frontier]) \
+            if len(frontier) else np.empty(0, np.int64)
+        frontier = list(children[depth[children] < 0]) if len(children) else []
+        level += 1
+
+    x = np.zeros(n)
+    for layer in range(int(depth.max()) + 1):
+        members = np.nonzero(depth == layer)[0]
+        if layer > 0 and len(src):
+            # Baricentro de los padres ya colocados en capas anteriores.
+            parent_edges = (depth[dst] == layer) & (depth[src] < layer)
+            sums = np.bincount(dst[parent_edges], weights=x[src[parent_edges]], minlength=n)
+            counts = np.bincount(dst[parent_edges], minlength=n)
+            keys = np.where(counts[members] > 0, sums[members] / np.maximum(counts[members], 1), np.inf)
+            members = members[np.argsort(keys, kind="stable")]
+        x[members] = (np.arange(len(members)) - (len(members) - 1) / 2) * spacing
+    return np.stack([x, depth * layer_spacing], axis=1)
+
+
+def place_new_nodes(pos: np.ndarray, known: np.ndarray, edges: np.ndarray, spacing: float = NODE_SPACING,
+                    seed: int = 0) -> np.ndarray:
+    """Posición inicial de los nodos nuevos: media de sus vecinos ya colocados (o cerca del centro) + ruido."""
+    rng = np.random.default_rng(seed)
+    pos = np.array(pos, dtype=np.float64)
+    n = len(pos)
+    new = ~known
+    if not new.any():
+        return pos
+    if known.any():
+        center = pos[known].mean(axis=0)
+        radius = max(float(np.ptp(pos[known], axis=0).max()) / 2, spacing)
+    else:
+        center = np.zeros(2)
+        radius = spacing * np.sqrt(n) / 2
+    sums = np.zeros((n, 2))
+    counts = np.zeros(n)
+    if len(edges):
+        for a, b in ((0, 1), (1, 0)):
+            usable = known[edges[:, b]]
+            ends, others = edges[usable, a], edges[usable, b]
+            counts += np.bincount(ends, minlength=n)
+            for axis in (0, 1):
+                sums[:, axis] += np.bincount(ends, weights=pos[others, axis], minlength=n)
+    anchored = new & (counts > 0)
+    pos[anchored] = sums[anchored] / counts[anchored, None] + rng.normal(0, spacing / 2, (anchored.sum(), 2))
+    loose = new & (counts == 0)
+    pos[loose] = center + rng.uniform(-radius, radius, (loose.sum(), 2))
+    return pos
+
+
+def layout_arrays(data: Dict[str, List[Any]]):
+    """Pasa la salida de crud.get_layout_input a arrays: posiciones (NaN si faltan) y aristas como índices."""
+    internal = np.asarray(data["internal_ids"], dtype=np.int64)
+    order = np.argsort(internal)
+    positions = np.array([[x if isinstance(x, (int, float)) else np.nan, y if isinstance(y, (int, float)) else np.nan]
+                          for x, y in data["positions"]], dtype=np.float64).reshape(-1, 2)
+    pairs = np.asarray(data["edges"], dtype=np.int64).reshape(-1, 2)
+    if not len(internal):
+        return positions, np.empty((0, 2), dtype=np.int64)
+    slot = np.searchsorted(internal, pairs, sorter=order).clip(0, len(internal) - 1)
+    index = order[slot]
+    valid = (internal[index] == pairs).all(axis=1)  # aristas hacia nodos sin frontend_id
+    return positions, index[valid]
+
+
+def compute_positions(algorithm: str, positions: np.ndarray, known: np.ndarray, edges: np.ndarray,
+                      incremental: bool, iterations: Optional[int]) -> np.ndarray:
+    """Parte síncrona (CPU) del layout; se ejecuta fuera del event loop."""
+    if algorithm == "hierarchical":
+        return hierarchical(len(positions), edges)
+    start = place_new_nodes(positions, known if incremental else np.zeros(len(positions), dtype=bool), edges)
+    return force_directed(start, edges, movable=~known if incremental else None, iterations=iterations)
+
+
+async def get_layout_state() -> Dict[str, Any]:
+    return await crud.run_db(crud.redis_conn.hgetall, crud.graph_key(LAYOUT_SUFFIX)) or {}
+
+
+async def run_layout(algorithm: str = "force", incremental: bool = False, iterations: Optional[int] = None,
+                     force: bool = False, batch_size: int = crud.INGEST_BATCH_SIZE) -> Dict[str, Any]:
+    """Calcula el layout, escribe las posiciones y registra la versión resultante.
+
+    Debe llamarse con el lock de escritura del grafo tomado.
+    """
+    if algorithm not in LAYOUT_ALGORITHMS:
+        raise HTTPException(status_code=400, detail=f"Invalid layout algorithm. Use one of: {', '.join(LAYOUT_ALGORITHMS)}")
+    if incremental and algorithm != "force":
+        raise HTTPException(status_code=400, detail="Incremental layout is only supported for 'force'")
+    if iterations is not None and not 1 <= iterations <= MAX_LAYOUT_ITERATIONS:
+        raise HTTPException(status_code=400, detail=f"iterations must be between 1 and {MAX_LAYOUT_ITERATIONS}")
+    if not crud.redis_conn:
+        raise HTTPException(status_code=503, detail="Database not connected")
+
+    version = await crud.get_graph_version()
+    state = await get_layout_state()
+    if not force and state.get("algorithm") == algorithm and state.get("version") == str(version):
+        return {**state, "cached": True}
+
+    started = time.monotonic()
+    data = await crud.get_layout_input()
+    ids, labels = data["ids"], data["labels"]
+    positions, edges = layout_arrays(data)
+    placed = await crud.run_db(crud.redis_conn.smembers, crud.graph_key(LAYOUT_NODES_SUFFIX)) if incremental else set()
+    known = np.array([node_id in placed for node_id in ids], dtype=bool)
+    known &= ~np.isnan(positions).any(axis=1)
+    moved = len(ids) if not incremental else int((~known).sum())
+
+    if moved:
+        positions = np.nan_to_num(positions)
+        loop = asyncio.get_running_loop()
+        new_positions = await loop.run_in_executor(
+            None, compute_positions, algorithm, positions, known, edges, incremental, iterations
+        )
+        changed = np.ones(len(ids), dtype=bool) if not incremental else ~known
+        await crud.write_positions([(ids[i], labels[i], float(new_positions[i, 0]), float(new_positions[i, 1]))
+                                    for i in np.nonzero(changed)[0]], batch_size)
+        version = await crud.bump_graph_version()
+
+    nodes_key = crud.graph_key(LAYOUT_NODES_SUFFIX)
+    await crud.run_db(crud.redis_conn.delete, nodes_key)
+    for chunk in crud._chunks(ids, batch_size):
+        await crud.run_db(crud.redis_conn.sadd, nodes_key, *chunk)
+    state = {"algorithm": algorithm, "version": str(version), "nodes": str(len(ids)), "moved": str(moved),
+             "edges": str(len(edges)), "computed_at": str(time.time()),
+             "duration_ms": str(round(1000 * (time.monotonic() - started), 1))}
+    await crud.run_db(crud.redis_conn.hset, crud.graph_key(LAYOUT_SUFFIX), mapping=state)
+    logger.info("Layout %s: %s nodos (%s movidos) en %s ms", algorithm, len(ids), moved, state["duration_ms"])
+    return {**state, "cached": False}
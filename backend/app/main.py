@@ -3,19 +3,28 @@ import logging
 # Silenciar el warning específico de passlib sobre la versión de bcrypt
 logging.getLogger('passlib').setLevel(logging.ERROR)
 
-from fastapi import FastAPI, File, UploadFile, Depends, HTTPException, status, Request
+from fastapi import FastAPI, File, UploadFile, Depends, HTTPException, status, Request, Query, Header, Response
 from fastapi.security import OAuth2PasswordRequestForm
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
+from starlette.background import BackgroundTask
 import json
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional, Literal
 from datetime import timedelta
 from pydantic import BaseModel
 import os
-import traceback
+import tarfile
+import tempfile
+import time
+import zipfile
 
-from . import crud, models, auth
+from . import crud, models, auth, streaming, jobs, serialization, observability, search, dossiers, layout, snapshot, changes
+from .cache import graph_cache, etag_matches
+from .progress import ProgressTracker
+
+observability.configure_logging()
+logger = logging.getLogger(__name__)
 
 app = FastAPI(title="SIVG Backend")
 
@@ -31,21 +40,56 @@ app.add_middleware(
     expose_headers=["*"]     # Expose all headers
 )
 
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    # Se etiqueta con la plantilla de la ruta (no la URL) para acotar la cardinalidad.
+    # En respuestas en streaming mide hasta el primer byte.
+    started = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        observability.REQUEST_LATENCY.labels(
+            request.method, getattr(route, "path", "unmatched"), str(status_code)
+        ).observe(time.perf_counter() - started)
+
 # 2. Event Handlers
 @app.on_event("startup")
 async def startup_event():
     await crud.init_db_connection()
-    auth.init_fake_users_db()  # Initialize fake users after DB connection
-    await crud.create_indices_if_needed()  # Create indices after DB and users are set
+    await auth.init_fake_users_db()  # Initialize fake users after DB connection
+    auth.start_token_invalidation_listener()
+    await crud.open_graph(crud.REDISGRAPH_GRAPH_NAME)  # Registra el grafo por defecto y crea sus índices
 
 @app.on_event("shutdown")
 async def shutdown_event():
+    await jobs.shutdown()  # Cancela los trabajos de este worker antes de cerrar Redis
+    await changes.stop_all()
+    auth.stop_token_invalidation_listener()
     await crud.close_db_connection()
+    auth.password_executor.shutdown(wait=False)
+    dossiers.shutdown_pool()
+    observability.mark_process_dead()
 
 # 3. API Routes (Define ALL of these BEFORE static files/catch-all)
+async def select_graph(
+    graph: str = Query(crud.REDISGRAPH_GRAPH_NAME, description="Workspace (grafo) sobre el que opera la petición")
+):
+    """Dependencia de los endpoints que cargan datos: fija el grafo de la petición y lo crea si no existe (ver app/graphs.py)."""
+    return await crud.open_graph(graph)
+
+async def select_existing_graph(
+    graph: str = Query(crud.REDISGRAPH_GRAPH_NAME, description="Workspace (grafo) sobre el que opera la petición")
+):
+    """Como select_graph, pero un grafo inexistente da 404: leer o editar no crea workspaces."""
+    return await crud.open_graph(graph, create=False)
+
 @app.post("/token", response_model=models.Token)
 async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends()):
-    user = auth.authenticate_user(auth.fake_users_db, form_data.username, form_data.password)
+    user = await auth.authenticate_user(form_data.username, form_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -58,15 +102,33 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
     )
     return {"access_token": access_token, "token_type": "bearer"}
 
+@app.get("/metrics")
+async def metrics():
+    """Métricas en formato Prometheus (agregadas de todos los workers si PROMETHEUS_MULTIPROC_DIR está definido)."""
+    return Response(content=observability.render_metrics(), media_type=observability.METRICS_CONTENT_TYPE)
+
 @app.get("/users/me/", response_model=models.User)
 async def read_users_me(current_user: models.User = Depends(auth.get_current_active_user)):
     return current_user
 
-@app.post("/upload-json/")
+@app.post("/upload-json/", dependencies=[Depends(select_graph)])
 async def upload_json_file(
     file: UploadFile = File(...),
+    mode: str = Query("overwrite"),
+    stream: bool = Query(False, description="Leer y escribir por lotes sin cargar el archivo completo en memoria"),
+    upload_id: Optional[str] = Query(None, description="Id para consultar el progreso mientras se procesa"),
+    batch_size: Optional[int] = Query(None, ge=1),
     current_user: models.User = Depends(auth.get_current_active_user) # Proteger endpoint
 ):
+    if stream:
+        tracker = ProgressTracker("upload", upload_id)
+        try:
+            async with jobs.graph_write_lock():
+                report = await streaming.stream_upload(file, mode, batch_size or crud.INGEST_BATCH_SIZE, tracker)
+        finally:
+            await file.close()
+        return {"message": "JSON streamed and data stored successfully.", "upload_id": tracker.id, "report": report}
+
     try:
         contents = await file.read()
         data = json.loads(contents)
@@ -79,58 +141,345 @@ async def upload_json_file(
 
     # Aquí llamas a la función que procesa el JSON y lo guarda en Neo4j
     try:
-        await crud.process_and_store_json(data)
-        return {"message": "JSON processed and data stored successfully."}
+        async with jobs.graph_write_lock():
+            report = await crud.process_and_store_json(data, mode, batch_size or crud.INGEST_BATCH_SIZE)
+        return {"message": "JSON processed and data stored successfully.", "report": report}
+    except HTTPException:
+        raise
     except Exception as e:
-        # Log the error e
-        print(f"Error processing JSON: {e}")
+        logger.exception("Error processing JSON: %s", e)
         raise HTTPException(status_code=500, detail=f"Error processing JSON data: {str(e)}")
 
+@app.get("/upload-json/{upload_id}/progress", dependencies=[Depends(select_existing_graph)])
+async def get_upload_progress(
+    upload_id: str,
+    current_user: models.User = Depends(auth.get_current_active_user)
+):
+    progress = await ProgressTracker.load("upload", upload_id)
+    if progress is None:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    return progress
+
 class GraphLoadPayload(BaseModel):
     jsonData: Dict[str, Any]
     mode: str
+    batchSize: Optional[int] = None
 
-@app.post("/graph/load-json")
+@app.post("/graph/load-json", dependencies=[Depends(select_graph)])
 async def load_json_to_graph(
     payload: GraphLoadPayload,
     current_user: models.User = Depends(auth.get_current_active_user)
 ):
     try:
-        await crud.process_and_store_json(payload.jsonData, payload.mode)
-        return {"message": f"JSON data processed ({payload.mode}) and stored successfully."}
+        async with jobs.graph_write_lock():
+            report = await crud.process_and_store_json(
+                payload.jsonData, payload.mode, payload.batchSize or crud.INGEST_BATCH_SIZE
+            )
+        return {"message": f"JSON data processed ({payload.mode}) and stored successfully.", "report": report}
     except HTTPException as he:
         raise he
     except Exception as e:
-        print(f"Error processing/loading JSON: {e}\n{traceback.format_exc()}")
+        logger.exception("Error processing/loading JSON: %s", e)
         raise HTTPException(
             status_code=500,
             detail=f"Error processing/loading JSON data: {str(e)}"
         )
 
-@app.get("/graph-data/")
+@app.post("/graph/import-dossiers", dependencies=[Depends(select_graph)])
+async def import_dossiers(
+    files: List[UploadFile] = File(..., description="Dossiers .json/.ndjson o archivos .zip/.tar(.gz) con ellos"),
+    batch_size: Optional[int] = Query(None, ge=1),
+    current_user: models.User = Depends(auth.get_current_active_user)
+):
+    """Crea/actualiza un nodo persona por dossier, deduplicando por CURP/RFC contra el grafo."""
+    raw_files = []
+    try:
+        for upload in files:
+            raw = await upload.read()
+            try:
+                raw_files.extend(dossiers.iter_archive_files(upload.filename or "upload.json", raw))
+            except (zipfile.BadZipFile, tarfile.TarError):
+                raise HTTPException(status_code=400, detail=f"Invalid archive: {upload.filename}")
+    finally:
+        for upload in files:
+            await upload.close()
+
+    try:
+        async with jobs.graph_write_lock():
+            summary = await dossiers.import_dossiers(raw_files, batch_size or crud.INGEST_BATCH_SIZE)
+        return {"message": "Dossiers imported successfully.", **summary}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("Error importing dossiers: %s", e)
+        raise HTTPException(status_code=500, detail=f"Error importing dossiers: {str(e)}")
+
+@app.get("/graph/changes", dependencies=[Depends(select_existing_graph)])
+async def graph_changes(
+    request: Request,
+    last_event_id: Optional[str] = Header(None),
+    since: Optional[str] = Query(None, description="Id del último evento recibido (alternativa a Last-Event-ID)"),
+    current_user: models.User = Depends(auth.get_current_active_user_or_query_token)
+):
+    """Feed de cambios del grafo como Server-Sent Events (ver app/changes.py)."""
+    resume_from = last_event_id or since
+    if resume_from:
+        try:
+            changes.stream_id_key(resume_from)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid event id")
+    return StreamingResponse(
+        changes.event_stream(request, resume_from), media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.get("/graph/snapshot", dependencies=[Depends(select_existing_graph)])
+async def export_graph_snapshot(current_user: models.User = Depends(auth.get_current_active_user)):
+    """Descarga un snapshot binario del grafo (se escribe primero a disco, no en memoria)."""
+    fd, path = tempfile.mkstemp(prefix="snapshot-", suffix=".sivgsnap", dir=snapshot.SNAPSHOT_DIR)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            async with jobs.graph_write_lock():
+                summary = await snapshot.export_snapshot(f)
+    except BaseException:
+        os.unlink(path)
+        raise
+    return FileResponse(
+        path, media_type="application/octet-stream",
+        filename=f"{crud.current_graph().name}-v{summary['version']}.sivgsnap",
+        headers={"X-Snapshot-Nodes": str(summary["nodes"]), "X-Snapshot-Edges": str(summary["edges"]),
+                 "X-Snapshot-Codec": summary["codec"]},
+        background=BackgroundTask(os.unlink, path),
+    )
+
+@app.post("/graph/snapshot", dependencies=[Depends(select_graph)])
+async def restore_graph_snapshot(
+    file: UploadFile = File(...),
+    batch_size: Optional[int] = Query(None, ge=1),
+    current_user: models.User = Depends(auth.get_current_active_user)
+):
+    """Reemplaza el grafo por el de un snapshot generado con GET /graph/snapshot."""
+    fd, path = tempfile.mkstemp(prefix="restore-", suffix=".sivgsnap", dir=snapshot.SNAPSHOT_DIR)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            async for chunk in streaming.iter_upload_chunks(file):
+                f.write(chunk)
+        await file.close()
+        async with jobs.graph_write_lock():
+            report = await snapshot.restore_snapshot(path, batch_size or snapshot.SNAPSHOT_BATCH_SIZE)
+        return {"message": "Snapshot restored successfully.", "report": report}
+    finally:
+        os.unlink(path)
+
+@app.post("/graph/jobs", status_code=status.HTTP_202_ACCEPTED, dependencies=[Depends(select_graph)])
+async def submit_load_job(
+    payload: GraphLoadPayload,
+    current_user: models.User = Depends(auth.get_current_active_user)
+):
+    """Igual que /graph/load-json pero en segundo plano: responde de inmediato con el id del trabajo."""
+    job_id = await jobs.submit_load_job(
+        payload.jsonData, payload.mode, payload.batchSize or crud.INGEST_BATCH_SIZE, current_user.username
+    )
+    return {"job_id": job_id, "status": "queued"}
+
+@app.post("/graph/layout", status_code=status.HTTP_202_ACCEPTED, dependencies=[Depends(select_existing_graph)])
+async def submit_layout_job(
+    algorithm: str = Query("force", description="force | hierarchical"),
+    incremental: bool = Query(False, description="Solo mover los nodos que no estaban en el último layout"),
+    iterations: Optional[int] = Query(None, ge=1, le=layout.MAX_LAYOUT_ITERATIONS),
+    force: bool = Query(False, description="Recalcular aunque el grafo no haya cambiado"),
+    current_user: models.User = Depends(auth.get_current_active_user)
+):
+    """Calcula posiciones en el servidor; el progreso se consulta en /graph/jobs/{job_id}."""
+    if algorithm not in layout.LAYOUT_ALGORITHMS:
+        raise HTTPException(status_code=400, detail=f"Invalid layout algorithm. Use one of: {', '.join(layout.LAYOUT_ALGORITHMS)}")
+    if incremental and algorithm != "force":
+        raise HTTPException(status_code=400, detail="Incremental layout is only supported for 'force'")
+    job_id = await jobs.submit_layout_job(algorithm, incremental, iterations, force, current_user.username)
+    return {"job_id": job_id, "status": "queued"}
+
+@app.get("/graph/layout", dependencies=[Depends(select_existing_graph)])
+async def get_layout_state(current_user: models.User = Depends(auth.get_current_active_user)):
+    """Último layout calculado y si sigue vigente para la versión actual del grafo."""
+    state = await layout.get_layout_state()
+    version = await crud.get_graph_version()
+    return {**state, "current_version": version, "up_to_date": state.get("version") == str(version)}
+
+@app.get("/graph/jobs/{job_id}", dependencies=[Depends(select_existing_graph)])
+async def get_load_job(
+    job_id: str,
+    current_user: models.User = Depends(auth.get_current_active_user)
+):
+    job = await jobs.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@app.delete("/graph/jobs/{job_id}", dependencies=[Depends(select_existing_graph)])
+async def cancel_load_job(
+    job_id: str,
+    current_user: models.User = Depends(auth.get_current_active_user)
+):
+    job = await jobs.cancel_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+MAX_GRAPH_PAGE_SIZE = 50000
+
+async def _stream_graph_ndjson(limit: int, label: Optional[str] = None):
+    """Una línea JSON por nodo (`{"node": ...}`) o arista (`{"edge": ...}`), página a página."""
+    try:
+        async for nodes, edges in crud.iter_graph_pages(limit, label):
+            lines = [serialization.dumps({"node": node}) for node in nodes]
+            lines.extend(serialization.dumps({"edge": edge}) for edge in edges)
+            if lines:
+                yield b"\n".join(lines) + b"\n"
+    except Exception as e:
+        logger.exception("Error streaming graph data: %s", e)
+        raise  # Ver _stream_graph_json
+
+async def _stream_graph_json(limit: int, label: Optional[str] = None):
+    """Emite el mismo `{"nodes": [...], "edges": [...]}` que el modo completo, por trozos.
+
+    Primero se recorren las páginas de nodos y luego las aristas de cada ventana
+    de ids, así que en memoria solo hay una página a la vez. Un error a mitad de
+    camino aborta la respuesta.
+    """
+    try:
+        yield b'{"nodes": ['
+        windows = []
+        separator = b""
+        cursor = -1
+        while cursor is not None:
+            nodes, next_cursor = await crud.get_nodes_page(cursor, limit, label)
+            windows.append((cursor, next_cursor))
+            if nodes:
+                yield separator + b", ".join(serialization.dumps(node) for node in nodes)
+                separator = b", "
+            cursor = next_cursor
+        yield b'], "edges": ['
+        separator = b""
+        for after_id, up_to_id in windows:
+            edges = await crud.get_edges_from_sources(after_id, up_to_id, label)
+            if edges:
+                yield separator + b", ".join(serialization.dumps(edge) for edge in edges)
+                separator = b", "
+        yield b']}'
+    except Exception as e:
+        logger.exception("Error streaming graph data: %s", e)
+        # El 200 ya se envió: se corta la conexión sin el último trozo, para que
+        # el cliente vea una respuesta incompleta y no un documento truncado.
+        raise
+
+async def _cached_full_graph_response(if_none_match: Optional[str], accept_encoding: Optional[str]) -> Response:
+    """Grafo completo ya serializado (y comprimido), cacheado por grafo, versión y codificación, con ETag/304."""
+    version = await crud.get_graph_version()
+    encoding = serialization.negotiate_encoding(accept_encoding)
+    # Cada codificación es una representación distinta: su propio ETag.
+    graph_name = crud.current_graph().name
+    etag = f'"{graph_name}-v{version}{"-" + encoding if encoding else ""}"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache", "Vary": "Accept-Encoding"}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    async def build() -> bytes:
+        nodes, relationships = await crud.fetch_all_graph_data()
+        return serialization.dumps({"nodes": nodes, "edges": relationships})
+
+    async def build_encoded() -> bytes:
+        body = await graph_cache.get_or_build(("graph-data", graph_name, version, None), build)
+        return await serialization.compress_async(body, encoding)
+
+    try:
+        body = await graph_cache.get_or_build(("graph-data", graph_name, version, encoding), build_encoded if encoding else build)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("Error building graph data: %s", e)
+        raise HTTPException(status_code=500, detail=f"Error reading graph data: {e}")
+    return Response(content=body, media_type="application/json",
+                    headers={**headers, **serialization.encoding_headers(encoding)})
+
+@app.get("/graph-data/", dependencies=[Depends(select_existing_graph)])
 async def get_graph_data(
+    cursor: Optional[int] = Query(None, description="Cursor devuelto como next_cursor por la página anterior"),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_GRAPH_PAGE_SIZE),
+    stream: Optional[Literal["ndjson", "json"]] = Query(None, description="Respuesta en streaming"),
+    type: Optional[str] = Query(None, description="Solo nodos de esta etiqueta y las aristas entre ellos"),
+    if_none_match: Optional[str] = Header(None),
+    accept_encoding: Optional[str] = Header(None),
+    current_user: models.User = Depends(auth.get_current_active_user)
+):
+    page_size = limit or crud.GRAPH_PAGE_SIZE
+    if stream == "ndjson":
+        return serialization.streaming_response(_stream_graph_ndjson(page_size, type), "application/x-ndjson",
+                                                accept_encoding)
+    if stream == "json":
+        return serialization.streaming_response(_stream_graph_json(page_size, type), "application/json",
+                                                accept_encoding)
+
+    if cursor is None and limit is None and type is None:
+        return await _cached_full_graph_response(if_none_match, accept_encoding)
+
+    nodes, relationships, next_cursor = await crud.get_graph_page(-1 if cursor is None else cursor, page_size, type)
+    return await serialization.json_response(
+        {"nodes": nodes, "edges": relationships, "next_cursor": next_cursor}, accept_encoding
+    )
+
+@app.get("/graph/neighborhood/{node_id}", dependencies=[Depends(select_existing_graph)])
+async def get_node_neighborhood(
+    node_id: str,
+    hops: int = Query(1, ge=1, le=crud.MAX_NEIGHBORHOOD_HOPS),
+    type: Optional[str] = Query(None, description="Etiqueta del nodo inicial; evita buscarla en cada etiqueta"),
+    labels: Optional[List[str]] = Query(None, description="Solo incluir nodos de estas etiquetas"),
+    limit: int = Query(crud.SUBGRAPH_MAX_NODES, ge=1, le=MAX_GRAPH_PAGE_SIZE),
+    accept_encoding: Optional[str] = Header(None),
+    current_user: models.User = Depends(auth.get_current_active_user)
+):
+    subgraph = await crud.get_neighborhood(node_id, hops, type, labels, limit)
+    if subgraph is None:
+        raise HTTPException(status_code=404, detail="Node not found")
+    return await serialization.json_response(subgraph, accept_encoding)
+
+@app.get("/graph/viewport", dependencies=[Depends(select_existing_graph)])
+async def get_viewport_nodes(
+    x_min: float, y_min: float, x_max: float, y_max: float,
+    labels: Optional[List[str]] = Query(None, description="Solo incluir nodos de estas etiquetas"),
+    limit: int = Query(crud.SUBGRAPH_MAX_NODES, ge=1, le=MAX_GRAPH_PAGE_SIZE),
+    accept_encoding: Optional[str] = Header(None),
+    current_user: models.User = Depends(auth.get_current_active_user)
+):
+    if x_min > x_max or y_min > y_max:
+        raise HTTPException(status_code=400, detail="Invalid bounding box")
+    subgraph = await crud.get_nodes_in_box(x_min, y_min, x_max, y_max, labels, limit)
+    return await serialization.json_response(subgraph, accept_encoding)
+
+@app.get("/graph/search", dependencies=[Depends(select_existing_graph)])
+async def search_graph(
+    q: str = Query(..., min_length=1, description="CURP, RFC o nombre (sin importar acentos ni mayúsculas)"),
+    type: Optional[str] = Query(None, description="Solo nodos de esta etiqueta"),
+    limit: int = Query(20, ge=1, le=search.SEARCH_MAX_LIMIT),
+    offset: int = Query(0, ge=0),
+    accept_encoding: Optional[str] = Header(None),
     current_user: models.User = Depends(auth.get_current_active_user)
 ):
-    nodes, relationships = await crud.get_all_graph_data()
-    return {"nodes": nodes, "edges": relationships}
+    results = await search.search_nodes(q, type, limit, offset)
+    return await serialization.json_response(results, accept_encoding)
 
-@app.get("/node-details/{node_id}")
+@app.get("/node-details/{node_id}", dependencies=[Depends(select_existing_graph)])
 async def get_node_details(
     node_id: str,
+    type: Optional[str] = Query(None, description="Etiqueta del nodo; permite usar el índice de frontend_id"),
     current_user: models.User = Depends(auth.get_current_active_user)
 ):
-    try:
-        node_id_int = int(node_id)  # Convert to int since we're using internal IDs
-    except ValueError:
-        raise HTTPException(status_code=400, detail="Invalid node ID format")
-        
-    details = await crud.get_node_properties(node_id)
+    details = await crud.get_node_details(node_id, type)
     if not details:
         raise HTTPException(status_code=404, detail="Node not found")
     return details
 
 # --- NUEVO ENDPOINT PARA ELIMINAR UN NODO ---
-@app.delete("/graph/node/{node_id}")
+@app.delete("/graph/node/{node_id}", dependencies=[Depends(select_existing_graph)])
 async def delete_node_from_graph(
     node_id: str,
     current_user: models.User = Depends(auth.get_current_active_user)
@@ -144,12 +493,32 @@ async def delete_node_from_graph(
     except HTTPException as he:
         raise he
     except Exception as e:
-        print(f"Error deleting node: {e}\n{traceback.format_exc()}")
+        logger.exception("Error deleting node: %s", e)
         raise HTTPException(
             status_code=500,
             detail=f"Error deleting node: {str(e)}"
         )
 
+@app.get("/graphs")
+async def list_graphs(current_user: models.User = Depends(auth.get_current_active_user)):
+    """Workspaces existentes (un grafo por caso) con su versión actual."""
+    if not crud.redis_conn:
+        raise HTTPException(status_code=503, detail="Database not connected")
+    return {"default": crud.REDISGRAPH_GRAPH_NAME, "graphs": await crud.list_graphs()}
+
+@app.delete("/graphs/{name}")
+async def delete_graph(
+    name: str,
+    current_user: models.User = Depends(auth.get_current_active_user)
+):
+    """Borra un workspace completo: el grafo, sus payloads, feed de cambios, layout y progreso."""
+    crud.use_graph(name)  # Valida el nombre
+    if not await crud.graph_exists(name):
+        raise HTTPException(status_code=404, detail="Graph not found")
+    async with jobs.graph_write_lock():
+        removed = await crud.delete_current_graph()
+    return {"message": f"Graph '{name}' deleted successfully.", "keys_removed": removed}
+
 # 4. Static Files and SPA Catch-all (Define these LAST)
 # In the final production Docker image (docker/Dockerfile),
 # backend code is in /app/backend/ and built frontend is in /app/frontend/static/
@@ -159,7 +528,7 @@ BUILT_FRONTEND_DIR = "/app/frontend/static"
 # Check if the directory for the built frontend exists.
 # This check ensures these routes are only active if the frontend has been built and placed here.
 if os.path.exists(BUILT_FRONTEND_DIR) and os.path.isdir(BUILT_FRONTEND_DIR):
-    print(f"INFO:     Serving static frontend files from {BUILT_FRONTEND_DIR}")
+    logger.info("Serving static frontend files from %s", BUILT_FRONTEND_DIR)
     
     # Serve assets from the 'static' subfolder of the build (e.g., /static/css, /static/js)
     # Create React App typically puts its assets here.
@@ -171,14 +540,14 @@ if os.path.exists(BUILT_FRONTEND_DIR) and os.path.isdir(BUILT_FRONTEND_DIR):
             name="frontend_static_assets"
         )
     else:
-        print(f"WARNING:  No 'static' subfolder found in {BUILT_FRONTEND_DIR}. Check your frontend build output.")
+        logger.warning("No 'static' subfolder found in %s. Check your frontend build output.", BUILT_FRONTEND_DIR)
 
     # Serve root files like index.html, favicon.ico, manifest.json, etc.
     # This catch-all MUST be the last route defined.
     @app.get("/{full_path:path}")
     async def serve_spa(request: Request, full_path: str):
         # Check if the request seems to be for an API endpoint that wasn't matched
-        if full_path.startswith(("token", "users/me", "graph/", "node-details/", "upload-json/")):
+        if full_path.startswith(("token", "users/me", "graph/", "graphs", "node-details/", "upload-json/", "metrics")):
             raise HTTPException(status_code=404, detail="API endpoint not found")
             
         index_path = os.path.join(BUILT_FRONTEND_DIR, "index.html")
@@ -192,7 +561,7 @@ if os.path.exists(BUILT_FRONTEND_DIR) and os.path.isdir(BUILT_FRONTEND_DIR):
             return FileResponse(index_path)
         else:
             # This should ideally not be reached if BUILT_FRONTEND_DIR and index.html exist.
-            print(f"ERROR:    index.html not found at {index_path} for SPA path: {full_path}")
+            logger.error("index.html not found at %s for SPA path: %s", index_path, full_path)
             raise HTTPException(status_code=404, detail="Frontend application not found.")
 else:
-    print(f"INFO:     Static file serving for frontend is SKIPPED (directory {BUILT_FRONTEND_DIR} not found). Assumed dev environment where frontend is served separately.")
+    logger.info("Static file serving for frontend is SKIPPED (directory %s not found). Assumed dev environment where frontend is served separately.", BUILT_FRONTEND_DIR)
@@ -0,0 +1,114 @@
+# backend/app/observability.py
+import json
+import logging
+import os
+import sys
+import time
+from typing import Optional
+
+from prometheus_client import (CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram,
+                               REGISTRY, generate_latest)
+
+# --- LOGGING ---
+# LOG_FORMAT=json emite una línea JSON por registro (con los campos de `extra`),
+# útil para los agregadores de logs; "text" es legible en la consola de desarrollo.
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text")
+# Umbral del log de consultas lentas (ms). Sin definir, el log está apagado.
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS")) if os.getenv("SLOW_QUERY_MS") else None
+
+_RESERVED_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        entry.update({k: v for k, v in vars(record).items() if k not in _RESERVED_ATTRS})
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+def configure_logging():
+    handler = logging.StreamHandler(sys.stderr)
+    if LOG_FORMAT == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)-7s %(name)s: %(message)s"))
+    app_logger = logging.getLogger("app")
+    app_logger.handlers[:] = [handler]
+    app_logger.setLevel(LOG_LEVEL)
+    app_logger.propagate = False
+
+
+# --- MÉTRICAS ---
+# Con varios workers de uvicorn cada proceso tiene sus propios contadores.
+# prometheus_client los agrega si PROMETHEUS_MULTIPROC_DIR apunta a un
+# directorio vacío al arrancar (ver docker-compose.yml); sin esa variable las
+# métricas son solo del proceso que atiende /metrics.
+MULTIPROCESS = bool(os.getenv("PROMETHEUS_MULTIPROC_DIR"))
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "Latencia de las peticiones HTTP por ruta",
+    ["method", "route", "status"],
+)
+QUERY_LATENCY = Histogram(
+    "redisgraph_query_duration_seconds", "Latencia de las consultas a RedisGraph por tipo",
+    ["kind"],
+)
+SLOW_QUERIES = Counter("redisgraph_slow_queries_total", "Consultas por encima de SLOW_QUERY_MS", ["kind"])
+INGEST_ITEMS = Counter("ingest_items_written_total", "Nodos/aristas escritos por el ingest", ["kind"])
+INGEST_BATCH_LATENCY = Histogram(
+    "ingest_batch_duration_seconds", "Duración de cada lote del ingest", ["kind"],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+DB_CALLS_IN_FLIGHT = Gauge(
+    "redis_calls_in_flight", "Llamadas a Redis ocupando un hilo/conexión del pool",
+    multiprocess_mode="livesum",
+)
+DB_POOL_SIZE = Gauge("redis_pool_max_connections", "Tamaño del pool de conexiones a Redis",
+                     multiprocess_mode="livesum")
+CHANGE_FEED_CLIENTS = Gauge("change_feed_clients", "Clientes conectados al feed de cambios (SSE)",
+                            multiprocess_mode="livesum")
+CHANGES_PUBLISHED = Counter("change_feed_events_total", "Entradas publicadas en el feed de cambios", ["type"])
+DB_POOL_WAIT = Histogram(
+    "redis_pool_wait_seconds", "Espera por un hilo/conexión libre antes de ejecutar la llamada",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+
+query_logger = logging.getLogger("app.slow_queries")
+
+
+def observe_query(kind: str, query: str, started: float):
+    """Registra la latencia de una consulta y, si supera SLOW_QUERY_MS, la registra en el log."""
+    elapsed = time.perf_counter() - started
+    QUERY_LATENCY.labels(kind).observe(elapsed)
+    if SLOW_QUERY_MS is not None and elapsed * 1000 >= SLOW_QUERY_MS:
+        SLOW_QUERIES.labels(kind).inc()
+        # Solo el texto de la consulta: los parámetros pueden traer datos personales.
+        query_logger.warning("Consulta lenta", extra={"kind": kind, "elapsed_ms": round(elapsed * 1000, 1),
+                                                      "query": query[:500]})
+
+
+def render_metrics() -> bytes:
+    if MULTIPROCESS:
+        from prometheus_client import multiprocess
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
+
+def mark_process_dead(pid: Optional[int] = None):
+    """Descarta los gauges "live" de este worker al apagarse."""
+    if MULTIPROCESS:
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(pid or os.getpid())
+
+
+METRICS_CONTENT_TYPE = CONTENT_TYPE_LATEST
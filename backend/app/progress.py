@@ -0,0 +1,54 @@
+# backend/app/progress.py
+import json
+import os
+import time
+import uuid
+from typing import Any, Dict, Optional
+
+from . import crud
+
+PROGRESS_TTL_SECONDS = int(os.getenv("PROGRESS_TTL_SECONDS", 24 * 3600))
+
+
+def progress_key(kind: str, progress_id: str) -> str:
+    return crud.graph_key(f"{kind}:{progress_id}")
+
+
+class ProgressTracker:
+    """Estado de una operación larga guardado en un hash de Redis.
+
+    Vive en Redis y no en memoria para que cualquier worker de uvicorn pueda
+    responder a la consulta de progreso. Cada campo se guarda como JSON para
+    conservar su tipo al leerlo.
+    """
+
+    def __init__(self, kind: str, progress_id: Optional[str] = None):
+        self.kind = kind
+        self.id = progress_id or uuid.uuid4().hex
+        self.key = progress_key(kind, self.id)
+        self.started_at = time.time()
+
+    async def update(self, **fields: Any):
+        fields["updated_at"] = time.time()
+        mapping = {name: json.dumps(value) for name, value in fields.items()}
+        await crud.run_db(self._write, mapping)
+
+    def _write(self, mapping: Dict[str, str]):
+        pipe = crud.redis_conn.pipeline(transaction=False)
+        pipe.hset(self.key, mapping=mapping)
+        pipe.expire(self.key, PROGRESS_TTL_SECONDS)
+        pipe.execute()
+
+    async def start(self, **fields: Any):
+        await self.update(status="running", started_at=self.started_at, **fields)
+
+    async def finish(self, status: str = "completed", **fields: Any):
+        await self.update(status=status, finished_at=time.time(),
+                          elapsed_s=round(time.time() - self.started_at, 3), **fields)
+
+    @staticmethod
+    async def load(kind: str, progress_id: str) -> Optional[Dict[str, Any]]:
+        raw = await crud.run_db(crud.redis_conn.hgetall, progress_key(kind, progress_id))
+        if not raw:
+            return None
+        return {"id": progress_id, **{name: json.loads(value) for name, value in raw.items()}}
@@ -0,0 +1,101 @@
+# backend/app/search.py
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+import redis
+from fastapi import HTTPException
+
+from . import crud
+
+SEARCH_MAX_LIMIT = 100
+IDENTIFIER_PROPERTIES = ("curp", "rfc")
+# CURP = 18 caracteres, RFC = 12 (moral) o 13 (física). Se busca exacto en ambos.
+_IDENTIFIER_RE = re.compile(r"^[A-Za-z0-9&Ññ]{12,18}$")
+
+# Orden de los resultados: primero coincidencias exactas de CURP/RFC, luego
+# nombres idénticos a la búsqueda, luego nombres que empiezan por ella y al
+# final el resto de resultados del índice full-text (en el orden de RediSearch).
+RANK_IDENTIFIER, RANK_EXACT_NAME, RANK_NAME_PREFIX, RANK_TEXT = range(4)
+
+
+def fulltext_query(terms: List[str]) -> str:
+    """Todos los términos deben aparecer; cada uno como prefijo (RediSearch exige 2+ caracteres)."""
+    return " ".join(f"{term}*" if len(term) >= 2 else term for term in terms)
+
+
+async def _identifier_hits(value: str, labels: List[str], limit: int) -> List[Tuple[Any, str]]:
+    values = list(dict.fromkeys([value, value.upper()]))
+    hits = []
+    for label in labels:
+        for prop in IDENTIFIER_PROPERTIES:
+            result = await crud.graph_query(
+                f"UNWIND $values AS v MATCH (n:{label} {{{prop}: v}}) RETURN n LIMIT $limit",
+                {"values": values, "limit": limit}, kind="search_identifier",
+            )
+            hits.extend((node, prop) for (node,) in result.result_set)
+    return hits
+
+
+async def _text_hits(terms: List[str], labels: List[str], limit: int) -> List[Any]:
+    hits = []
+    for label in labels:
+        try:
+            result = await crud.graph_query(
+                f"CALL db.idx.fulltext.queryNodes('{label}', $query) YIELD node RETURN node LIMIT $limit",
+                {"query": fulltext_query(terms), "limit": limit}, kind="search_text",
+            )
+        except redis.exceptions.ResponseError:
+            continue  # Etiqueta sin índice full-text (p.ej. creada antes de existir la búsqueda)
+        hits.extend(node for (node,) in result.result_set)
+    return hits
+
+
+async def search_nodes(query: str, label: Optional[str] = None, limit: int = 20, offset: int = 0) -> Dict[str, Any]:
+    """Busca nodos por CURP/RFC exacto o por nombre (sin acentos, por prefijo de palabra).
+
+    Todo sale de índices: el de cada propiedad identificadora y el full-text de
+    `search_name`. Cada etiqueta aporta a lo sumo offset+limit candidatos, que
+    se ordenan y paginan aquí.
+    """
+    if not crud.redis_conn:
+        raise HTTPException(status_code=503, detail="Database not connected")
+    if label is not None and not label.isidentifier():
+        raise HTTPException(status_code=400, detail=f"Invalid node type: {label}")
+    labels = [label] if label else await crud.get_labels()
+    wanted = offset + limit + 1  # uno de más para saber si hay otra página
+
+    ranked: Dict[str, Tuple[Tuple[int, int], Dict[str, Any], str]] = {}
+
+    def add(node, rank: int, position: int, match: str):
+        frontend_node = crud.node_to_frontend(node)
+        if frontend_node is None:
+            return
+        key = frontend_node["id"]
+        if key not in ranked or (rank, position) < ranked[key][0]:
+            ranked[key] = ((rank, position), frontend_node, match)
+
+    compact = re.sub(r"\s+", "", query)
+    if _IDENTIFIER_RE.match(compact):
+        for position, (node, prop) in enumerate(await _identifier_hits(compact, labels, wanted)):
+            add(node, RANK_IDENTIFIER, position, prop)
+
+    normalized = crud.normalize_search_text(query)
+    if normalized:
+        for position, node in enumerate(await _text_hits(normalized.split(), labels, wanted)):
+            name = node.properties.get(crud.SEARCH_NAME_KEY) or ""
+            if name == normalized:
+                rank = RANK_EXACT_NAME
+            elif name.startswith(normalized):
+                rank = RANK_NAME_PREFIX
+            else:
+                rank = RANK_TEXT
+            add(node, rank, position, "name")
+
+    ordered = sorted(ranked.values(), key=lambda entry: entry[0])
+    page = ordered[offset:offset + limit]
+    return {
+        "results": [{"node": node, "match": match} for _, node, match in page],
+        "offset": offset,
+        "limit": limit,
+        "has_more": len(ordered) > offset + limit,
+    }
@@ -0,0 +1,125 @@
+# backend/app/serialization.py
+import asyncio
+import gzip
+import json
+import os
+import zlib
+from typing import Any, AsyncIterator, Dict, Optional, Union
+
+from fastapi.responses import Response, StreamingResponse
+
+# orjson y brotli son opcionales: sin ellos se usa json de la stdlib y solo gzip.
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depende del entorno
+    orjson = None
+try:
+    import brotli
+except ImportError:  # pragma: no cover - depende del entorno
+    brotli = None
+
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", 5))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", 4))
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", 1024))  # las respuestas pequeñas no compensan
+# Por encima de este tamaño la compresión corre en un hilo (zlib/brotli liberan el GIL).
+COMPRESS_OFFLOAD_BYTES = 1024 * 1024
+
+SUPPORTED_ENCODINGS = ("br", "gzip") if brotli else ("gzip",)
+
+
+def dumps(value: Any) -> bytes:
+    """Serializa a JSON en bytes (orjson si está instalado)."""
+    if orjson is not None:
+        return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """Elige la codificación con mayor q de Accept-Encoding; en empate prefiere br."""
+    if not accept_encoding:
+        return None
+    weights: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name.strip().lower()] = q
+    best, best_q = None, 0.0
+    for encoding in SUPPORTED_ENCODINGS:
+        q = weights.get(encoding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def compress(body: bytes, encoding: Optional[str]) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=GZIP_LEVEL)
+    return body
+
+
+async def compress_async(body: bytes, encoding: Optional[str]) -> bytes:
+    if encoding is None:
+        return body
+    if len(body) < COMPRESS_OFFLOAD_BYTES:
+        return compress(body, encoding)
+    return await asyncio.get_running_loop().run_in_executor(None, compress, body, encoding)
+
+
+def encoding_headers(encoding: Optional[str]) -> Dict[str, str]:
+    headers = {"Vary": "Accept-Encoding"}
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return headers
+
+
+async def json_response(content: Any, accept_encoding: Optional[str] = None, status_code: int = 200,
+                        headers: Optional[Dict[str, str]] = None) -> Response:
+    """Respuesta JSON sin pasar por jsonable_encoder, comprimida si el cliente lo acepta.
+
+    `content` debe ser ya JSON-serializable (dicts, listas y escalares).
+    """
+    body = dumps(content)
+    encoding = negotiate_encoding(accept_encoding) if len(body) >= COMPRESS_MIN_BYTES else None
+    body = await compress_async(body, encoding)
+    return Response(content=body, status_code=status_code, media_type="application/json",
+                    headers={**(headers or {}), **encoding_headers(encoding)})
+
+
+class _StreamCompressor:
+    def __init__(self, encoding: str):
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+            self.compress, self._flush = self._compressor.process, self._compressor.finish
+        else:
+            # wbits=31: formato gzip (cabecera y CRC), no zlib crudo
+            self._compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+            self.compress, self._flush = self._compressor.compress, self._compressor.flush
+
+    def finish(self) -> bytes:
+        return self._flush()
+
+
+async def _compress_stream(chunks: AsyncIterator[Union[str, bytes]], encoding: str) -> AsyncIterator[bytes]:
+    compressor = _StreamCompressor(encoding)
+    async for chunk in chunks:
+        data = compressor.compress(chunk.encode("utf-8") if isinstance(chunk, str) else chunk)
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+def streaming_response(chunks: AsyncIterator[Union[str, bytes]], media_type: str,
+                       accept_encoding: Optional[str] = None) -> StreamingResponse:
+    """StreamingResponse comprimida por trozos según Accept-Encoding."""
+    encoding = negotiate_encoding(accept_encoding)
+    if encoding:
+        chunks = _compress_stream(chunks, encoding)
+    return StreamingResponse(chunks, media_type=media_type, headers=encoding_headers(encoding))
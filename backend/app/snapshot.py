@@ -0,0 +1,281 @@
+# backend/app/snapshot.py
+# Snapshots binarios del grafo para respaldo y restauración rápidos.
+#
+# Formato: MAGIC + 1 byte de códec, seguido de frames con prefijo de longitud
+# (uint32 big-endian) cuyo contenido es msgpack comprimido frame a frame
+# (zstd si está instalado, si no zlib). Frames, en este orden:
+#   meta -> nodos (por etiqueta) -> aristas (por tipo y etiquetas) -> payloads -> end
+# Los nodos y aristas se guardan con sus propiedades tal como están en
+# RedisGraph (ya codificadas, con hashes y sidecar), así que restaurar no vuelve
+# a pasar por node_to_row: es un CREATE por lotes directo. El frame "end" lleva
+# los conteos; si falta, el archivo está truncado.
+import asyncio
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import time
+import zlib
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import msgpack
+from fastapi import HTTPException
+
+from . import crud
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - zstandard es opcional
+    zstandard = None
+
+# Errores de un frame corrupto; ZstdError no hereda de ValueError.
+_FRAME_ERRORS = (zlib.error, ValueError, msgpack.ExtraData) + ((zstandard.ZstdError,) if zstandard else ())
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_MAGIC = b"SIVGSNP1"
+SNAPSHOT_FORMAT = 1
+CODEC_ZLIB, CODEC_ZSTD = 1, 2
+CODEC_NAMES = {CODEC_ZLIB: "zlib", CODEC_ZSTD: "zstd"}
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR") or tempfile.gettempdir()
+SNAPSHOT_PAGE_SIZE = int(os.getenv("SNAPSHOT_PAGE_SIZE", 5000))  # filas por frame al exportar
+SNAPSHOT_BATCH_SIZE = int(os.getenv("SNAPSHOT_BATCH_SIZE", 5000))  # filas por CREATE al restaurar
+_LENGTH = struct.Struct(">I")
+
+EXPORT_NODES_QUERY = "MATCH (n) WHERE id(n) > $cursor RETURN n, id(n) LIMIT $limit"
+EXPORT_EDGES_QUERY = ("MATCH (s)-[r]->(t) WHERE id(s) > $lo AND id(s) <= $hi "
+                      "RETURN labels(s)[0], s.frontend_id, labels(t)[0], t.frontend_id, type(r), r")
+NODE_IDS_QUERY = "MATCH (n) WHERE id(n) > $cursor RETURN id(n) LIMIT $limit"
+
+
+class SnapshotFormatError(ValueError):
+    pass
+
+
+def default_codec() -> int:
+    return CODEC_ZSTD if zstandard is not None else CODEC_ZLIB
+
+
+def _compressor(codec: int):
+    if codec == CODEC_ZSTD:
+        if zstandard is None:
+            raise SnapshotFormatError("the snapshot is zstd-compressed but zstandard is not installed")
+        return zstandard.ZstdCompressor(level=3).compress, zstandard.ZstdDecompressor().decompress
+    if codec == CODEC_ZLIB:
+        return (lambda data: zlib.compress(data, 6)), zlib.decompress
+    raise SnapshotFormatError(f"unknown snapshot codec {codec}")
+
+
+class SnapshotWriter:
+    """Escribe frames en un archivo abierto en modo binario."""
+
+    def __init__(self, file, codec: Optional[int] = None):
+        self.file = file
+        self.codec = codec or default_codec()
+        self._compress, _ = _compressor(self.codec)
+        file.write(SNAPSHOT_MAGIC + bytes([self.codec]))
+
+    def write(self, frame: Dict[str, Any]):
+        body = self._compress(msgpack.packb(frame, use_bin_type=True))
+        self.file.write(_LENGTH.pack(len(body)))
+        self.file.write(body)
+
+
+def _frame_spans(buffer) -> Iterator[Tuple[int, int]]:
+    """(inicio, fin) del contenido de cada frame; valida la cabecera y las longitudes."""
+    header = len(SNAPSHOT_MAGIC) + 1
+    if len(buffer) < header or buffer[:len(SNAPSHOT_MAGIC)] != SNAPSHOT_MAGIC:
+        raise SnapshotFormatError("not a graph snapshot file")
+    offset = header
+    while offset < len(buffer):
+        if offset + _LENGTH.size > len(buffer):
+            raise SnapshotFormatError("truncated snapshot (incomplete frame header)")
+        (length,) = _LENGTH.unpack_from(buffer, offset)
+        start = offset + _LENGTH.size
+        if start + length > len(buffer):
+            raise SnapshotFormatError("truncated snapshot (incomplete frame)")
+        yield start, start + length
+        offset = start + length
+
+
+def _decode_frame(buffer, span: Tuple[int, int], decompress) -> Dict[str, Any]:
+    start, end = span
+    try:
+        frame = msgpack.unpackb(decompress(buffer[start:end]), raw=False)
+    except _FRAME_ERRORS as e:
+        raise SnapshotFormatError(f"corrupt frame at byte {start}: {e}")
+    if not isinstance(frame, dict):
+        raise SnapshotFormatError(f"corrupt frame at byte {start}")
+    return frame
+
+
+def iter_frames(buffer) -> Iterator[Dict[str, Any]]:
+    """Lee los frames de un buffer (bytes o mmap) sin cargar el archivo entero.
+
+    Antes de decodificar nada recorre las longitudes y el frame final, así un
+    archivo truncado se rechaza antes de tocar el grafo.
+    """
+    spans = list(_frame_spans(buffer))
+    _, decompress = _compressor(buffer[len(SNAPSHOT_MAGIC)])
+    if not spans or _decode_frame(buffer, spans[-1], decompress).get("kind") != "end":
+        raise SnapshotFormatError("truncated snapshot (missing end frame)")
+    for span in spans:
+        yield _decode_frame(buffer, span, decompress)
+
+
+# --- EXPORTACIÓN ---
+
+async def _node_frames(counts: Dict[str, int]):
+    cursor = -1
+    while cursor is not None:
+        result = await crud.graph_query(EXPORT_NODES_QUERY, {"cursor": cursor, "limit": SNAPSHOT_PAGE_SIZE},
+                                        kind="snapshot_nodes")
+        by_label: Dict[str, List[Dict[str, Any]]] = {}
+        for node, node_id in result.result_set:
+            by_label.setdefault(node.label, []).append(node.properties)
+            cursor = max(cursor, node_id)
+        for label, rows in by_label.items():
+            counts["nodes"] += len(rows)
+            yield {"kind": "nodes", "label": label, "rows": rows}
+        if len(result.result_set) < SNAPSHOT_PAGE_SIZE:
+            cursor = None
+
+
+async def _edge_frames(counts: Dict[str, int]):
+    # Se pagina por id del nodo origen, igual que la lectura paginada del grafo.
+    cursor = -1
+    while cursor is not None:
+        ids = await crud.graph_query(NODE_IDS_QUERY, {"cursor": cursor, "limit": SNAPSHOT_PAGE_SIZE},
+                                     kind="snapshot_node_ids")
+        if not ids.result_set:
+            break
+        last = max(row[0] for row in ids.result_set)
+        result = await crud.graph_query(EXPORT_EDGES_QUERY, {"lo": cursor, "hi": last}, kind="snapshot_edges")
+        groups: Dict[Tuple[str, str, str], List[Dict[str, Any]]] = {}
+        for source_label, source, target_label, target, rel_type, edge in result.result_set:
+            if source is None or target is None:
+                continue
+            groups.setdefault((source_label, target_label, rel_type), []).append(
+                {"source": source, "target": target, "props": edge.properties})
+        for (source_label, target_label, rel_type), rows in groups.items():
+            counts["edges"] += len(rows)
+            yield {"kind": "edges", "source_label": source_label, "target_label": target_label,
+                   "rel_type": rel_type, "rows": rows}
+        cursor = last if len(ids.result_set) == SNAPSHOT_PAGE_SIZE else None
+
+
+async def _payload_frames(counts: Dict[str, int]):
+    payloads_key = crud.graph_key(crud.PAYLOADS_SUFFIX)
+    cursor = 0
+    while True:
+        cursor, items = await crud.run_db(crud.redis_conn.hscan, payloads_key, cursor, None, SNAPSHOT_PAGE_SIZE)
+        if items:
+            counts["payloads"] += len(items)
+            yield {"kind": "payloads", "items": items}  # JSON tal como está guardado
+        if not cursor:
+            break
+
+
+async def export_snapshot(file, codec: Optional[int] = None) -> Dict[str, Any]:
+    """Vuelca el grafo en `file` (binario) página a página; devuelve los conteos.
+
+    Hay que llamarlo con el lock de escritura tomado para que sea una instantánea consistente.
+    """
+    if not crud.redis_conn:
+        raise HTTPException(status_code=503, detail="Database not connected")
+    started = time.perf_counter()
+    loop = asyncio.get_running_loop()
+    writer = SnapshotWriter(file, codec)
+    version = await crud.get_graph_version()
+    writer.write({"kind": "meta", "format": SNAPSHOT_FORMAT, "graph": crud.current_graph().name,
+                  "version": version, "created_at": time.time()})
+    counts = {"nodes": 0, "edges": 0, "payloads": 0}
+    for frames in (_node_frames, _edge_frames, _payload_frames):
+        async for frame in frames(counts):
+            # msgpack + compresión fuera del event loop (un frame son miles de filas).
+            await loop.run_in_executor(None, writer.write, frame)
+    writer.write({"kind": "end", **counts})
+    file.flush()
+    summary = {**counts, "version": version, "codec": CODEC_NAMES[writer.codec],
+               "bytes": file.tell(), "elapsed_ms": round((time.perf_counter() - started) * 1000, 2)}
+    logger.info("Snapshot exportado: %s nodos, %s aristas, %s payloads, %s bytes (%s)",
+                counts["nodes"], counts["edges"], counts["payloads"], summary["bytes"], summary["codec"])
+    return summary
+
+
+# --- RESTAURACIÓN ---
+
+async def restore_snapshot(path: str, batch_size: int = SNAPSHOT_BATCH_SIZE) -> Dict[str, Any]:
+    """Reemplaza el grafo por el contenido del snapshot en `path` (leído vía mmap)."""
+    if not crud.redis_conn:
+        raise HTTPException(status_code=503, detail="Database not connected")
+    batch_size = max(1, int(batch_size))
+    started = time.perf_counter()
+    report = crud.new_ingest_report("overwrite", batch_size)
+    report["payloads_written"] = 0
+
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            raise HTTPException(status_code=400, detail="Invalid snapshot: empty file")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            try:
+                frames = iter_frames(buffer)
+                meta = next(frames, None)
+                if not meta or meta.get("kind") != "meta":
+                    raise SnapshotFormatError("missing meta frame")
+                if meta.get("format") != SNAPSHOT_FORMAT:
+                    raise SnapshotFormatError(f"unsupported snapshot format {meta.get('format')}")
+                await crud.bump_graph_version()
+                try:
+                    await crud.begin_ingest("overwrite")
+                    end = await _restore_frames(frames, batch_size, report)
+                finally:
+                    await crud.bump_graph_version()
+            except SnapshotFormatError as e:
+                raise HTTPException(status_code=400, detail=f"Invalid snapshot: {e}")
+
+    report = await crud.finish_ingest("overwrite", report, started)
+    report["snapshot"] = {"graph": meta.get("graph"), "version": meta.get("version"),
+                          "created_at": meta.get("created_at"), "expected": end}
+    return report
+
+
+async def _restore_frames(frames: Iterator[Dict[str, Any]], batch_size: int, report: Dict[str, Any]) -> Dict[str, Any]:
+    loop = asyncio.get_running_loop()
+    while True:
+        frame = await loop.run_in_executor(None, next, frames, None)  # descompresión fuera del event loop
+        if frame is None:
+            break
+        kind = frame.get("kind")
+        if kind == "nodes":
+            label = frame["label"]
+            if not isinstance(label, str) or not label.isidentifier():
+                raise SnapshotFormatError(f"invalid label {label!r}")
+            rows = frame["rows"]
+            start = report["nodes_received"]
+            report["nodes_received"] += len(rows)
+            await crud.ensure_label_indices([label])
+            report["created"] += await crud._write_batches(
+                "node", label, list(enumerate(rows, start)), crud.CREATE_NODES_QUERY.format(label=label),
+                batch_size, report)
+        elif kind == "edges":
+            names = (frame["source_label"], frame["target_label"], frame["rel_type"])
+            if not all(isinstance(name, str) and name.isidentifier() for name in names):
+                raise SnapshotFormatError(f"invalid edge group {names!r}")
+            rows = frame["rows"]
+            start = report["edges_received"]
+            report["edges_received"] += len(rows)
+            query = crud.CREATE_EDGES_QUERY.format(source_label=names[0], target_label=names[1], rel_type=names[2])
+            await crud._write_batches("edge", f"(:{names[0]})-[:{names[2]}]->(:{names[1]})",
+                                      list(enumerate(rows, start)), query, batch_size, report)
+        elif kind == "payloads":
+            items = frame["items"]
+            for chunk in crud._chunks(list(items.items()), batch_size):
+                await crud.run_db(crud.redis_conn.hset, crud.graph_key(crud.PAYLOADS_SUFFIX), mapping=dict(chunk))
+            report["payloads_written"] += len(items)
+        elif kind == "end":
+            return {key: frame.get(key) for key in ("nodes", "edges", "payloads")}
+        else:
+            raise SnapshotFormatError(f"unknown frame kind {kind!r}")
+    raise SnapshotFormatError("truncated snapshot (missing end frame)")
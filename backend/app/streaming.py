@@ -0,0 +1,260 @@
+# backend/app/streaming.py
+# Ingest incremental: lectura en streaming de JSON/NDJSON y escritura por lotes.
+#
+# La memoria usada es proporcional al tamaño de lote y no al del archivo: los
+# nodos se escriben según se van leyendo y las aristas se apartan en un archivo
+# temporal hasta que todos los nodos están escritos (pueden apuntar a nodos que
+# aparecen más adelante en el archivo).
+import codecs
+import json
+import os
+import tempfile
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, UploadFile
+
+from . import crud
+
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", 1024 * 1024))
+# Tamaño máximo de un solo nodo/arista en el archivo (un dossier grande cabe de sobra).
+MAX_JSON_ITEM_BYTES = int(os.getenv("MAX_JSON_ITEM_BYTES", 64 * 1024 * 1024))
+# Modos compatibles con el streaming: 'incremental' necesita el payload completo.
+STREAMING_MODES = ("overwrite", "merge")
+
+GraphItem = Tuple[str, Dict[str, Any]]  # ("node" | "edge", objeto)
+
+
+class StreamFormatError(ValueError):
+    pass
+
+
+async def iter_upload_chunks(file: UploadFile, on_read: Optional[Callable[[int], None]] = None) -> AsyncIterator[bytes]:
+    while True:
+        chunk = await file.read(UPLOAD_CHUNK_SIZE)
+        if not chunk:
+            return
+        if on_read:
+            on_read(len(chunk))
+        yield chunk
+
+
+class IncrementalJsonReader:
+    """Decodifica un documento JSON que llega por trozos, un valor a la vez.
+
+    Solo mantiene en memoria el texto aún no consumido, así que un array
+    enorme se recorre elemento a elemento.
+    """
+
+    def __init__(self, chunks: AsyncIterator[bytes]):
+        self._chunks = chunks.__aiter__()
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._json = json.JSONDecoder()
+        self._text = ""
+        self._pos = 0
+        self._eof = False
+
+    async def _fill(self) -> bool:
+        if self._eof:
+            return False
+        try:
+            chunk = await self._chunks.__anext__()
+        except StopAsyncIteration:
+            self._text += self._decoder.decode(b"", final=True)
+            self._eof = True
+            return False
+        if self._pos > UPLOAD_CHUNK_SIZE:
+            self._text = self._text[self._pos:]
+            self._pos = 0
+        self._text += self._decoder.decode(chunk)
+        return True
+
+    async def peek(self) -> str:
+        """Siguiente carácter que no sea espacio, sin consumirlo ('' al final)."""
+        while True:
+            while self._pos < len(self._text) and self._text[self._pos].isspace():
+                self._pos += 1
+            if self._pos < len(self._text):
+                return self._text[self._pos]
+            if not await self._fill():
+                return ""
+
+    async def expect(self, *chars: str) -> str:
+        char = await self.peek()
+        if char not in chars:
+            found = repr(char) if char else "fin del archivo"
+            raise StreamFormatError(f"Se esperaba {' o '.join(repr(c) for c in chars)} y se encontró {found}")
+        self._pos += 1
+        return char
+
+    async def value(self) -> Any:
+        await self.peek()
+        while True:
+            try:
+                value, end = self._json.raw_decode(self._text, self._pos)
+                # Un número al final del buffer podría estar cortado: exigir un carácter más.
+                if end < len(self._text) or self._eof:
+                    self._pos = end
+                    return value
+            except json.JSONDecodeError as e:
+                if self._eof:
+                    raise StreamFormatError(f"JSON inválido: {e}") from e
+            if len(self._text) - self._pos > MAX_JSON_ITEM_BYTES:
+                raise StreamFormatError("Elemento JSON demasiado grande")
+            await self._fill()
+
+
+async def iter_json_graph_items(chunks: AsyncIterator[bytes]) -> AsyncIterator[GraphItem]:
+    """Recorre `{"nodes": [...], "edges": [...]}` emitiendo cada nodo y arista por separado."""
+    reader = IncrementalJsonReader(chunks)
+    await reader.expect("{")
+    if await reader.peek() == "}":
+        return
+    while True:
+        key = await reader.value()
+        await reader.expect(":")
+        if key in ("nodes", "edges") and await reader.peek() == "[":
+            kind = key[:-1]
+            await reader.expect("[")
+            if await reader.peek() == "]":
+                await reader.expect("]")
+            else:
+                while True:
+                    yield kind, await reader.value()
+                    if await reader.expect(",", "]") == "]":
+                        break
+        else:
+            await reader.value()  # Otras claves de nivel superior se ignoran
+        if await reader.expect(",", "}") == "}":
+            return
+
+
+async def iter_ndjson_graph_items(chunks: AsyncIterator[bytes]) -> AsyncIterator[GraphItem]:
+    """Una línea por elemento: `{"node": ...}`, `{"edge": ...}` (como /graph-data/?stream=ndjson)
+    o el objeto sin envolver, que se toma como arista si tiene source y target."""
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    pending = ""
+    line_number = 0
+
+    def parse(line: str) -> Optional[GraphItem]:
+        if not line.strip():
+            return None
+        try:
+            item = json.loads(line)
+        except json.JSONDecodeError as e:
+            raise StreamFormatError(f"Línea {line_number}: JSON inválido: {e}") from e
+        if not isinstance(item, dict):
+            raise StreamFormatError(f"Línea {line_number}: se esperaba un objeto JSON")
+        if len(item) == 1 and ("node" in item or "edge" in item):
+            kind = next(iter(item))
+            return kind, item[kind]
+        return ("edge" if "source" in item and "target" in item else "node"), item
+
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            line_number += 1
+            item = parse(line)
+            if item:
+                yield item
+        if len(pending) > MAX_JSON_ITEM_BYTES:
+            raise StreamFormatError(f"Línea {line_number + 1}: elemento JSON demasiado grande")
+    pending += decoder.decode(b"", final=True)
+    line_number += 1
+    item = parse(pending)
+    if item:
+        yield item
+
+
+async def ingest_items(items: AsyncIterator[GraphItem], mode: str = "overwrite",
+                       batch_size: int = crud.INGEST_BATCH_SIZE,
+                       on_batch: Optional[Callable[[Dict[str, Any]], Awaitable[None]]] = None) -> Dict[str, Any]:
+    """Escribe nodos y aristas según llegan, en lotes de `batch_size`.
+
+    `on_batch` se llama con el reporte parcial después de cada lote (progreso).
+    """
+    if mode not in STREAMING_MODES:
+        raise HTTPException(status_code=400, detail=f"Mode '{mode}' is not supported for streaming ingest. "
+                                                    f"Expected one of: {', '.join(STREAMING_MODES)}")
+    batch_size = max(1, int(batch_size))
+    started = time.perf_counter()
+    report = crud.new_ingest_report(mode, batch_size)
+
+    await crud.bump_graph_version()
+    try:
+        await crud.begin_ingest(mode)
+        with tempfile.TemporaryFile("w+", encoding="utf-8") as edge_spool:
+            nodes: List[Dict[str, Any]] = []
+            node_index = 0
+            edge_count = 0
+            async for kind, item in items:
+                if kind == "node":
+                    nodes.append(item)
+                    if len(nodes) >= batch_size:
+                        await crud.ingest_node_batch(nodes, mode, batch_size, report, node_index)
+                        node_index += len(nodes)
+                        nodes = []
+                        if on_batch:
+                            await on_batch(report)
+                else:
+                    edge_spool.write(json.dumps(item) + "\n")
+                    edge_count += 1
+            if nodes:
+                await crud.ingest_node_batch(nodes, mode, batch_size, report, node_index)
+                if on_batch:
+                    await on_batch(report)
+
+            edge_spool.seek(0)
+            edges: List[Dict[str, Any]] = []
+            edge_index = 0
+            for line in edge_spool:
+                edges.append(json.loads(line))
+                if len(edges) >= batch_size:
+                    await crud.ingest_edge_batch(edges, {}, mode, batch_size, report, edge_index)
+                    edge_index += len(edges)
+                    edges = []
+                    if on_batch:
+                        await on_batch(report)
+            if edges:
+                await crud.ingest_edge_batch(edges, {}, mode, batch_size, report, edge_index)
+                if on_batch:
+                    await on_batch(report)
+        return await crud.finish_ingest(mode, report, started)
+    finally:
+        await crud.bump_graph_version()
+
+
+async def stream_upload(file: UploadFile, mode: str, batch_size: int, tracker) -> Dict[str, Any]:
+    """Ingest en streaming de un UploadFile (JSON `{nodes, edges}` o NDJSON) con progreso en `tracker`."""
+    filename = (file.filename or "").lower()
+    is_ndjson = filename.endswith((".ndjson", ".jsonl")) or (file.content_type or "").endswith("ndjson")
+    total_bytes = getattr(file, "size", None)
+    counters = {"bytes_read": 0}
+
+    def on_read(size: int):
+        counters["bytes_read"] += size
+
+    async def on_batch(report: Dict[str, Any]):
+        fields = {"bytes_read": counters["bytes_read"], "nodes_written": report["nodes_written"],
+                  "edges_written": report["edges_written"], "errors": len(report["errors"])}
+        if total_bytes:
+            fields["percent"] = round(100 * counters["bytes_read"] / total_bytes, 1)
+        await tracker.update(**fields)
+
+    await tracker.start(filename=file.filename, format="ndjson" if is_ndjson else "json",
+                        mode=mode, total_bytes=total_bytes, bytes_read=0, nodes_written=0, edges_written=0)
+    chunks = iter_upload_chunks(file, on_read)
+    items = iter_ndjson_graph_items(chunks) if is_ndjson else iter_json_graph_items(chunks)
+    try:
+        report = await ingest_items(items, mode, batch_size, on_batch)
+    except StreamFormatError as e:
+        await tracker.finish("failed", error=str(e), bytes_read=counters["bytes_read"])
+        raise HTTPException(status_code=400, detail=f"Invalid JSON file: {e}")
+    except Exception as e:
+        await tracker.finish("failed", error=str(e), bytes_read=counters["bytes_read"])
+        raise
+    await tracker.finish("completed", percent=100.0, bytes_read=counters["bytes_read"],
+                         nodes_written=report["nodes_written"], edges_written=report["edges_written"],
+                         errors=len(report["errors"]))
+    return report
@@ -0,0 +1,70 @@
+# backend/app/users.py
+import json
+import os
+from abc import ABC, abstractmethod
+from typing import Dict, Optional
+
+from . import crud, models
+
+# "redis" comparte los usuarios entre todos los workers; "memory" es el dict
+# en proceso de la PoC (útil para desarrollo sin Redis).
+USER_STORE_BACKEND = os.getenv("USER_STORE", "redis")
+USERS_KEY = os.getenv("USERS_KEY", "sivg:users")
+
+
+class UserStore(ABC):
+    """Interfaz del almacén de usuarios que usa auth."""
+
+    @abstractmethod
+    async def get(self, username: str) -> Optional[models.UserInDB]:
+        ...
+
+    @abstractmethod
+    async def put(self, user: models.UserInDB):
+        ...
+
+    @abstractmethod
+    async def add_if_missing(self, user: models.UserInDB) -> bool:
+        """Guarda el usuario solo si no existe; devuelve True si lo creó."""
+
+
+class MemoryUserStore(UserStore):
+    def __init__(self):
+        self._users: Dict[str, models.UserInDB] = {}
+
+    async def get(self, username: str) -> Optional[models.UserInDB]:
+        return self._users.get(username)
+
+    async def put(self, user: models.UserInDB):
+        self._users[user.username] = user
+
+    async def add_if_missing(self, user: models.UserInDB) -> bool:
+        if user.username in self._users:
+            return False
+        self._users[user.username] = user
+        return True
+
+
+class RedisUserStore(UserStore):
+    """Usuarios en un hash de Redis (campo = username, valor = UserInDB en JSON)."""
+
+    def __init__(self, key: str = USERS_KEY):
+        self.key = key
+
+    async def get(self, username: str) -> Optional[models.UserInDB]:
+        raw = await crud.run_db(crud.redis_conn.hget, self.key, username)
+        return models.UserInDB(**json.loads(raw)) if raw else None
+
+    async def put(self, user: models.UserInDB):
+        await crud.run_db(crud.redis_conn.hset, self.key, user.username, json.dumps(user.dict()))
+
+    async def add_if_missing(self, user: models.UserInDB) -> bool:
+        return bool(await crud.run_db(crud.redis_conn.hsetnx, self.key, user.username, json.dumps(user.dict())))
+
+
+def create_user_store(backend: str = USER_STORE_BACKEND) -> UserStore:
+    if backend == "memory":
+        return MemoryUserStore()
+    if backend == "redis":
+        return RedisUserStore()
+    raise ValueError(f"USER_STORE desconocido: {backend!r} (usar 'redis' o 'memory')")
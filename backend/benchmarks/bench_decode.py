@@ -0,0 +1,66 @@
+# backend/benchmarks/bench_decode.py
+"""Mide el decodificado de propiedades de nodos: codificación tipada vs. la antigua.
+
+No necesita Redis: reproduce en memoria las propiedades tal como RedisGraph las
+devuelve para cada codificación y cronometra solo el decodificado:
+
+    cd backend
+    python -m benchmarks.bench_decode --nodes 100000 --repeat 3
+
+"antigua" son nodos sin sidecar (cada string pasa por JSON/bool/int/float);
+"tipada" son nodos con `json_props`, que solo parsean las claves JSON. También
+cuenta los valores que la decodificación antigua devuelve con otro tipo.
+"""
+import argparse
+import time
+from typing import Any, Dict, List
+
+from app.encoding import JSON_PROPS_KEY, decode_legacy_value, decode_properties, encode_properties
+from benchmarks.synthetic import make_graph
+
+
+def stored_properties(num_nodes: int) -> List[Dict[str, Any]]:
+    """Propiedades ligeras de cada nodo con la codificación tipada (como las guarda node_to_row)."""
+    rows = []
+    for node in make_graph(num_nodes)["nodes"]:
+        light = {k: v for k, v in node["data"].items() if k != "rawJsonData"}
+        # Strings que parecen números: se perdían con la decodificación antigua
+        light["telefono"] = f"55{len(rows):08d}"
+        light["codigoPostal"] = "06700"
+        rows.append({"frontend_id": node["id"], "x": node["position"]["x"], "y": node["position"]["y"],
+                     **encode_properties(light)})
+    return rows
+
+
+def time_decode(rows: List[Dict[str, Any]], decode, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for properties in rows:
+            decode(properties)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--nodes", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    typed = stored_properties(args.nodes)
+    legacy = [{k: v for k, v in row.items() if k != JSON_PROPS_KEY} for row in typed]
+
+    print(f"{'codificación':>12} {'segundos':>10} {'nodos/s':>12}")
+    for name, rows in (("antigua", legacy), ("tipada", typed)):
+        seconds = time_decode(rows, decode_properties, args.repeat)
+        print(f"{name:>12} {seconds:10.3f} {args.nodes / seconds:12.0f}")
+
+    changed = sum(1 for row in legacy for value in row.values()
+                  if isinstance(value, str) and not isinstance(decode_legacy_value(value), str)
+                  and not value.startswith(("{", "[")))
+    print(f"strings que la decodificación antigua convierte a otro tipo: {changed}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+# backend/benchmarks/bench_ingest.py
+"""Compara el ingest por lotes de `crud.process_and_store_json` con el bucle nodo por nodo.
+
+Requiere un RedisGraph accesible con las mismas variables de entorno que el
+backend (REDIS_HOST, REDIS_PORT, ...). Usa un grafo propio para no tocar datos:
+
+    cd backend
+    REDISGRAPH_GRAPH_NAME=bench_graph python -m benchmarks.bench_ingest --sizes 1000 10000 100000
+"""
+import argparse
+import asyncio
+import time
+
+from app import crud
+from benchmarks.synthetic import make_graph
+
+
+def legacy_per_node_ingest(data):
+    """Reproduce el bucle original: una consulta CREATE con literales por cada nodo."""
+    for node_data in data.get("nodes", []):
+        label, row, payload = crud.node_to_row(node_data)
+        # El bucle original guardaba también el documento completo dentro del nodo
+        row.update({k: crud.to_property_value(v) for k, v in (payload or {}).items()})
+        props = ", ".join(f"{k}: {crud.to_cypher_literal(v)}" for k, v in row.items())
+        crud.current_graph().graph.query(f"CREATE (n:{label} {{{props}}})")
+
+
+async def run(sizes, batch_size, legacy_limit):
+    await crud.init_db_connection()
+    print(f"{'nodos':>8} {'modo':>10} {'segundos':>10} {'nodos/s':>10}")
+    try:
+        for size in sizes:
+            data = make_graph(size)
+
+            if size <= legacy_limit:
+                try:
+                    crud.current_graph().graph.delete()
+                except Exception:
+                    pass
+                started = time.perf_counter()
+                legacy_per_node_ingest(data)
+                elapsed = time.perf_counter() - started
+                print(f"{size:>8} {'por nodo':>10} {elapsed:>10.2f} {size / elapsed:>10.0f}")
+            else:
+                print(f"{size:>8} {'por nodo':>10} {'(omitido)':>10}")
+
+            started = time.perf_counter()
+            report = await crud.process_and_store_json(data, mode="overwrite", batch_size=batch_size)
+            elapsed = time.perf_counter() - started
+            print(f"{size:>8} {'por lotes':>10} {elapsed:>10.2f} {size / elapsed:>10.0f}"
+                  f"  ({len(report['batches'])} lotes, {len(report['errors'])} errores)")
+    finally:
+        try:
+            crud.current_graph().graph.delete()
+        except Exception:
+            pass
+        await crud.close_db_connection()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--batch-size", type=int, default=crud.INGEST_BATCH_SIZE)
+    parser.add_argument("--legacy-limit", type=int, default=100000,
+                        help="No ejecutar el bucle por nodo por encima de este tamaño")
+    args = parser.parse_args()
+    asyncio.run(run(args.sizes, args.batch_size, args.legacy_limit))
+
+
+if __name__ == "__main__":
+    main()
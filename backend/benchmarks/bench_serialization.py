@@ -0,0 +1,74 @@
+# backend/benchmarks/bench_serialization.py
+"""Compara la serialización de /graph-data/: camino por defecto de FastAPI vs. app.serialization.
+
+No necesita Redis; arma en memoria grafos con la forma que devuelve
+`crud.node_to_frontend` y mide tiempo de CPU y bytes a enviar:
+
+    cd backend
+    python -m benchmarks.bench_serialization --sizes 10000 100000
+
+"fastapi" es jsonable_encoder + json.dumps (lo que hace un endpoint que
+devuelve un dict). "dumps" es `serialization.dumps` (orjson si está
+instalado). Las filas gzip/br incluyen el tiempo de compresión.
+"""
+import argparse
+import json
+import time
+from typing import Any, Callable, Dict
+
+from fastapi.encoders import jsonable_encoder
+
+from app import serialization
+from benchmarks.synthetic import make_graph
+
+
+def frontend_graph(num_nodes: int) -> Dict[str, Any]:
+    data = make_graph(num_nodes, edges_per_node=1.5)
+    nodes = []
+    for node in data["nodes"]:
+        light = {k: v for k, v in node["data"].items() if k != "rawJsonData"}
+        if "rawJsonData" in node["data"]:
+            light["hasDetails"] = True
+        nodes.append({"id": node["id"], "type": node["type"], "position": node["position"], "data": light})
+    edges = [{"id": edge["id"], "source": edge["source"], "target": edge["target"], "label": edge["label"],
+              "type": "smoothstep", "markerEnd": {"type": "arrowclosed"}} for edge in data["edges"]]
+    return {"nodes": nodes, "edges": edges}
+
+
+def fastapi_default(content: Any) -> bytes:
+    # Igual que fastapi.responses.JSONResponse.render tras jsonable_encoder
+    return json.dumps(jsonable_encoder(content), ensure_ascii=False, allow_nan=False,
+                      indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def timed(func: Callable[[], bytes], repeat: int):
+    best = float("inf")
+    body = b""
+    for _ in range(repeat):
+        started = time.perf_counter()
+        body = func()
+        best = min(best, time.perf_counter() - started)
+    return best, body
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"orjson={'sí' if serialization.orjson else 'no'}  brotli={'sí' if serialization.brotli else 'no'}")
+    print(f"{'nodos':>8} {'camino':>14} {'ms':>9} {'MB':>9}")
+    for size in args.sizes:
+        graph = frontend_graph(size)
+        cases = [("fastapi", lambda: fastapi_default(graph)), ("dumps", lambda: serialization.dumps(graph))]
+        for encoding in serialization.SUPPORTED_ENCODINGS:
+            cases.append((f"dumps+{encoding}",
+                          lambda encoding=encoding: serialization.compress(serialization.dumps(graph), encoding)))
+        for name, func in cases:
+            seconds, body = timed(func, args.repeat)
+            print(f"{size:>8} {name:>14} {seconds * 1000:9.1f} {len(body) / 1e6:9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+# backend/benchmarks/bench_users_me.py
+"""Mide peticiones por segundo de /users/me/, sola y durante una ráfaga de logins.
+
+Se ejecuta contra un backend ya levantado (docker-compose up):
+
+    cd backend
+    python -m benchmarks.bench_users_me --base-url http://localhost:8000 --clients 16 --seconds 10
+
+/users/me/ no hace más que autenticar, así que su RPS es el costo del camino
+de auth (token cacheado o no). La segunda medición lanza `--logins` clientes
+pidiendo /token en bucle: con bcrypt en el event loop, el RPS se desploma.
+"""
+import argparse
+import threading
+import time
+import urllib.parse
+import urllib.request
+from typing import List
+
+from .load_users_me import get_token, percentile, timed_get
+
+
+def login(base_url: str, username: str, password: str):
+    body = urllib.parse.urlencode({"username": username, "password": password}).encode()
+    with urllib.request.urlopen(urllib.request.Request(f"{base_url}/token", data=body)) as response:
+        response.read()
+
+
+def measure_rps(url: str, token: str, seconds: float, clients: int):
+    latencies: List[float] = []
+    errors = [0]
+    lock = threading.Lock()
+    deadline = time.monotonic() + seconds
+
+    def client():
+        local: List[float] = []
+        while time.monotonic() < deadline:
+            try:
+                local.append(timed_get(url, token))
+            except Exception:
+                errors[0] += 1
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return len(latencies) / (time.monotonic() - started), latencies, errors[0]
+
+
+def report(title: str, rps: float, latencies: List[float], errors: int):
+    print(f"{title:<30} {rps:9.1f} req/s  p50={percentile(latencies, 50):7.1f} ms  "
+          f"p99={percentile(latencies, 99):7.1f} ms  errores={errors}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--username", default="testuser")
+    parser.add_argument("--password", default="testpassword")
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--clients", type=int, default=16, help="Clientes concurrentes pidiendo /users/me/")
+    parser.add_argument("--logins", type=int, default=4, help="Clientes concurrentes pidiendo /token")
+    args = parser.parse_args()
+
+    base_url = args.base_url.rstrip("/")
+    token = get_token(base_url, args.username, args.password)
+    users_me = f"{base_url}/users/me/"
+
+    report("/users/me/", *measure_rps(users_me, token, args.seconds, args.clients))
+
+    stop = threading.Event()
+    logins = [0]
+
+    def login_loop():
+        while not stop.is_set():
+            try:
+                login(base_url, args.username, args.password)
+                logins[0] += 1
+            except Exception:
+                pass
+
+    threads = [threading.Thread(target=login_loop) for _ in range(args.logins)]
+    for thread in threads:
+        thread.start()
+    try:
+        result = measure_rps(users_me, token, args.seconds, args.clients)
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+    report(f"/users/me/ + {args.logins} logins", *result)
+    print(f"{'':<30} ({logins[0] / args.seconds:.1f} logins/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,879 @@
+# backend/benchmarks/fakes.py
+"""Redis + RedisGraph en proceso para correr la suite sin contenedor.
+
+`FakeRedis` implementa los comandos de redis-py 3.5 que usa el backend (con
+decode_responses=True) y `FakeGraph` el subconjunto de `Graph.query` que
+emite app/crud.py: las consultas se reconocen con las mismas plantillas de
+crud (CREATE_NODES_QUERY, EDGES_QUERY, ...) y los parámetros se leen de la
+cabecera `CYPHER k=v`. Una consulta que no esté en la lista falla con
+ResponseError, así que un cambio en las plantillas se nota en lugar de medir
+algo distinto.
+
+Los tiempos con el fake miden el trabajo de Python del backend (armar filas,
+serializar parámetros, decodificar resultados) más un RedisGraph idealizado;
+`latency_ms` simula el viaje de red de cada comando. Para números absolutos
+usar --target redis contra un RedisGraph real.
+"""
+import bisect
+import fnmatch
+import functools
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import redis
+
+from app import crud, dossiers, graphs
+from app.encoding import JSON_PROPS_KEY
+
+
+# --- PARÁMETROS (cabecera CYPHER k=v de crud.build_params_header) ---
+_STRING_RE = re.compile(r'"((?:[^"\\]|\\.)*)"', re.S)
+_UNESCAPE_RE = re.compile(r'\\(.)', re.S)
+_NUMBER_RE = re.compile(r'-?(?:inf|nan|\d+(?:\.\d*)?(?:[eE][+-]?\d+)?)')
+_KEY_RE = re.compile(r'\s*(\w+)\s*:\s*')
+_PARAM_RE = re.compile(r'(\w+)=')
+_CONSTANTS = {"null": None, "true": True, "false": False}
+
+
+def _skip_separator(text: str, pos: int, closing: str) -> Tuple[int, bool]:
+    """Salta ', ' y devuelve (posición, se_cerró)."""
+    while text[pos] == " ":
+        pos += 1
+    if text[pos] == closing:
+        return pos + 1, True
+    if text[pos] != ",":
+        raise ValueError(f"se esperaba ',' o '{closing}' en la posición {pos}")
+    pos += 1
+    while text[pos] == " ":
+        pos += 1
+    return pos, False
+
+
+def parse_literal(text: str, pos: int = 0) -> Tuple[Any, int]:
+    """Lee un literal de crud.to_cypher_param a partir de `pos`; devuelve (valor, posición siguiente)."""
+    char = text[pos]
+    if char == '"':
+        match = _STRING_RE.match(text, pos)
+        return _UNESCAPE_RE.sub(r"\1", match.group(1)), match.end()
+    if char == "{":
+        result: Dict[str, Any] = {}
+        pos += 1
+        if text[pos] == "}":
+            return result, pos + 1
+        while True:
+            match = _KEY_RE.match(text, pos)
+            result[match.group(1)], pos = parse_literal(text, match.end())
+            pos, closed = _skip_separator(text, pos, "}")
+            if closed:
+                return result, pos
+    if char == "[":
+        items: List[Any] = []
+        pos += 1
+        if text[pos] == "]":
+            return items, pos + 1
+        while True:
+            value, pos = parse_literal(text, pos)
+            items.append(value)
+            pos, closed = _skip_separator(text, pos, "]")
+            if closed:
+                return items, pos
+    for word, value in _CONSTANTS.items():
+        if text.startswith(word, pos):
+            return value, pos + len(word)
+    match = _NUMBER_RE.match(text, pos)
+    if not match:
+        raise ValueError(f"literal no reconocido en la posición {pos}: {text[pos:pos + 20]!r}")
+    token = match.group(0)
+    is_float = any(c in token for c in ".eEn")  # 'n': inf/nan
+    return (float(token) if is_float else int(token)), match.end()
+
+
+def split_params(query: str) -> Tuple[Dict[str, Any], str]:
+    """'CYPHER a=1 b="x" MATCH ...' -> ({'a': 1, 'b': 'x'}, 'MATCH ...')."""
+    if not query.startswith("CYPHER "):
+        return {}, query
+    params: Dict[str, Any] = {}
+    pos = len("CYPHER ")
+    while True:
+        match = _PARAM_RE.match(query, pos)
+        if not match:
+            return params, query[pos:]
+        params[match.group(1)], pos = parse_literal(query, match.end())
+        while query[pos] == " ":
+            pos += 1
+
+
+# --- GRAFO ---
+class FakeNode:
+    __slots__ = ("id", "label", "labels", "properties")
+
+    def __init__(self, node_id: int, label: str, properties: Dict[str, Any]):
+        self.id = node_id
+        self.label = label
+        self.labels = [label]
+        self.properties = properties
+
+
+class FakeEdge:
+    __slots__ = ("id", "relation", "src_node", "dest_node", "properties")
+
+    def __init__(self, edge_id: int, relation: str, src_node: int, dest_node: int, properties: Dict[str, Any]):
+        self.id = edge_id
+        self.relation = relation
+        self.src_node = src_node
+        self.dest_node = dest_node
+        self.properties = properties
+
+
+class FakeResult:
+    def __init__(self, result_set: Optional[List[List[Any]]] = None, **stats: int):
+        self.result_set = result_set or []
+        self.nodes_created = stats.get("nodes_created", 0)
+        self.nodes_deleted = stats.get("nodes_deleted", 0)
+        self.relationships_created = stats.get("relationships_created", 0)
+        self.relationships_deleted = stats.get("relationships_deleted", 0)
+
+
+def _clean(properties: Dict[str, Any]) -> Dict[str, Any]:
+    # SET n = r no guarda los null
+    return {k: v for k, v in properties.items() if v is not None}
+
+
+class GraphStore:
+    """Datos de un grafo: nodos por id interno, índice frontend_id por etiqueta y adyacencias."""
+
+    def __init__(self):
+        self.nodes: Dict[int, FakeNode] = {}
+        self.by_label: Dict[str, Dict[str, int]] = {}
+        self.edges: Dict[int, FakeEdge] = {}
+        self.outgoing: Dict[int, Dict[int, None]] = {}
+        self.incoming: Dict[int, Dict[int, None]] = {}
+        self.indices: set = set()
+        self._next_node = 0
+        self._next_edge = 0
+        self._sorted_ids: Optional[List[int]] = None
+
+    # Nodos
+    def add_node(self, label: str, properties: Dict[str, Any]) -> FakeNode:
+        node = FakeNode(self._next_node, label, _clean(properties))
+        self._next_node += 1
+        self.nodes[node.id] = node
+        self.outgoing[node.id], self.incoming[node.id] = {}, {}
+        frontend_id = node.properties.get("frontend_id")
+        if frontend_id is not None:
+            self.by_label.setdefault(label, {})[frontend_id] = node.id
+        else:
+            self.by_label.setdefault(label, {})
+        self._sorted_ids = None
+        return node
+
+    def find(self, label: Optional[str], frontend_id: Any) -> Optional[FakeNode]:
+        labels = [label] if label else list(self.by_label)
+        for name in labels:
+            node_id = self.by_label.get(name, {}).get(frontend_id)
+            if node_id is not None:
+                return self.nodes[node_id]
+        return None
+
+    def delete_node(self, node: FakeNode) -> int:
+        """DETACH DELETE; devuelve cuántas aristas se borraron."""
+        edge_ids = list(self.outgoing[node.id]) + list(self.incoming[node.id])
+        removed = sum(self.delete_edge(self.edges[edge_id]) for edge_id in edge_ids if edge_id in self.edges)
+        del self.outgoing[node.id], self.incoming[node.id], self.nodes[node.id]
+        index = self.by_label.get(node.label, {})
+        if index.get(node.properties.get("frontend_id")) == node.id:
+            del index[node.properties["frontend_id"]]
+        self._sorted_ids = None
+        return removed
+
+    def sorted_ids(self) -> List[int]:
+        if self._sorted_ids is None:
+            self._sorted_ids = sorted(self.nodes)
+        return self._sorted_ids
+
+    def ids_in_range(self, low: int, high: Optional[int] = None) -> List[int]:
+        ids = self.sorted_ids()
+        start = bisect.bisect_right(ids, low)
+        end = len(ids) if high is None else bisect.bisect_right(ids, high)
+        return ids[start:end]
+
+    # Aristas
+    def add_edge(self, relation: str, source: FakeNode, target: FakeNode, properties: Dict[str, Any]) -> FakeEdge:
+        edge = FakeEdge(self._next_edge, relation, source.id, target.id, _clean(properties))
+        self._next_edge += 1
+        self.edges[edge.id] = edge
+        self.outgoing[source.id][edge.id] = None
+        self.incoming[target.id][edge.id] = None
+        return edge
+
+    def delete_edge(self, edge: FakeEdge) -> int:
+        del self.edges[edge.id]
+        self.outgoing[edge.src_node].pop(edge.id, None)
+        self.incoming[edge.dest_node].pop(edge.id, None)
+        return 1
+
+    def edge_columns(self, edge: FakeEdge) -> List[Any]:
+        """Las columnas de crud.EDGE_COLUMNS."""
+        label = edge.properties.get("label")
+        return [self.nodes[edge.src_node].properties.get("frontend_id"),
+                self.nodes[edge.dest_node].properties.get("frontend_id"),
+                edge.relation if label is None else label, edge.id, edge.properties.get("frontend_id")]
+
+
+def _template(template: str, **groups: str) -> "re.Pattern":
+    """Expresión regular a partir de una plantilla de crud: {label} -> (?P<label>\\w+), etc.
+
+    `groups` da la expresión de cada marcador (por defecto, una etiqueta). Si un
+    marcador se repite, las demás apariciones deben valer lo mismo que la primera.
+    """
+    names = dict.fromkeys(re.findall(r"(?<!\{)\{(\w+)\}(?!\})", template))
+    markers = {name: f"MARKER{index}X" for index, name in enumerate(names)}
+    pattern = re.escape(template.format(**markers))
+    for name, marker in markers.items():
+        pattern = pattern.replace(marker, groups.get(name, rf"(?P<{name}>\w+)"), 1)
+        # Grupo opcional: la repetición solo se exige si la primera aparición coincidió.
+        pattern = pattern.replace(marker, rf"(?({name}):(?P={name}))" if name in groups else rf"(?P={name})")
+    return re.compile(pattern + "$")
+
+
+_LABEL = r"(?::(?P<label>\w+))?"
+
+
+class FakeGraph:
+    """Sustituto de redisgraph.Graph: los datos viven en el FakeRedis, compartidos entre handles."""
+
+    def __init__(self, name: str, conn: "FakeRedis"):
+        self.name = name
+        self.conn = conn
+
+    def query(self, q: str, params=None, timeout=None, read_only=False) -> FakeResult:
+        self.conn.round_trip()
+        query_params, text = split_params(q)
+        with self.conn.mutex:
+            store = self.conn.graphs.setdefault(self.name, GraphStore())
+            for pattern, handler in _HANDLERS:
+                match = pattern.match(text)
+                if match:
+                    return handler(store, match.groupdict(), query_params)
+        raise redis.exceptions.ResponseError(f"Query not supported by the benchmark fake: {text[:120]}")
+
+    def delete(self):
+        self.conn.round_trip()
+        with self.conn.mutex:
+            if self.conn.graphs.pop(self.name, None) is None:
+                raise redis.exceptions.ResponseError("Invalid graph operation on empty key")
+
+
+def _create_index(store: GraphStore, groups: Dict[str, str], params) -> FakeResult:
+    key = (groups["label"], groups["prop"])
+    if key in store.indices:
+        raise redis.exceptions.ResponseError(f"Attribute '{groups['prop']}' is already indexed")
+    store.indices.add(key)
+    store.by_label.setdefault(groups["label"], {})
+    return FakeResult()
+
+
+def _create_nodes(store: GraphStore, groups, params) -> FakeResult:
+    for row in params["rows"]:
+        store.add_node(groups["label"], row)
+    return FakeResult(nodes_created=len(params["rows"]))
+
+
+def _upsert_nodes(store: GraphStore, groups, params) -> FakeResult:
+    created = 0
+    for row in params["rows"]:
+        node = store.find(groups["label"], row.get("frontend_id"))
+        if node is None:
+            store.add_node(groups["label"], row)
+            created += 1
+        else:
+            node.properties = _clean(row)
+    return FakeResult(nodes_created=created)
+
+
+def _delete_nodes(store: GraphStore, groups, params) -> FakeResult:
+    deleted = edges = 0
+    for frontend_id in params["ids"]:
+        node = store.find(groups["label"], frontend_id)
+        if node is not None:
+            edges += store.delete_node(node)
+            deleted += 1
+    return FakeResult(nodes_deleted=deleted, relationships_deleted=edges)
+
+
+def _find_nodes(store: GraphStore, groups, params) -> FakeResult:
+    nodes = (store.find(groups["label"], frontend_id) for frontend_id in params["ids"])
+    return FakeResult([[node.properties.get("frontend_id")] for node in nodes if node is not None])
+
+
+def _set_positions(store: GraphStore, groups, params) -> FakeResult:
+    for row in params["rows"]:
+        node = store.find(groups["label"], row["id"])
+        if node is not None:
+            node.properties.update(x=row["x"], y=row["y"])
+    return FakeResult()
+
+
+def _find_people(store: GraphStore, groups, params) -> FakeResult:
+    rows = []
+    for value in params["values"]:
+        for node_id in store.by_label.get("person", {}).values():
+            node = store.nodes[node_id]
+            if node.properties.get(groups["prop"]) == value:
+                rows.append([value, node.properties.get("frontend_id"), node.properties.get("x"),
+                             node.properties.get("y"), node.properties.get(JSON_PROPS_KEY)])
+    return FakeResult(rows)
+
+
+def _update_people(store: GraphStore, groups, params) -> FakeResult:
+    for row in params["rows"]:
+        node = store.find("person", row["frontend_id"])
+        if node is not None:
+            node.properties = _clean({**node.properties, **row["props"], "content_hash": None})
+    return FakeResult()
+
+
+def _people_by_id(store: GraphStore, groups, params) -> FakeResult:
+    nodes = (store.find("person", frontend_id) for frontend_id in params["ids"])
+    return FakeResult([[node] for node in nodes if node is not None])
+
+
+def _stored_hashes(store: GraphStore, groups, params) -> FakeResult:
+    nodes = (store.find(groups["label"], frontend_id) for frontend_id in params["ids"])
+    return FakeResult([[node.properties.get("frontend_id"), node.properties.get("content_hash"),
+                        node.properties.get("payload_hash"), node.properties.get("x"), node.properties.get("y")]
+                       for node in nodes if node is not None])
+
+
+def _all_hashes(store: GraphStore, groups, params) -> FakeResult:
+    return FakeResult([[node.properties.get("frontend_id"), node.labels, node.properties.get("content_hash"),
+                        node.properties.get("payload_hash"), node.properties.get("x"), node.properties.get("y")]
+                       for node in store.nodes.values()])
+
+
+def _write_edges(merge: bool) -> Callable[..., FakeResult]:
+    def handler(store: GraphStore, groups, params) -> FakeResult:
+        created = 0
+        for row in params["rows"]:
+            source = store.find(groups["source_label"], row["source"])
+            target = store.find(groups["target_label"], row["target"])
+            if source is None or target is None:
+                continue
+            existing = None
+            if merge:
+                existing = next((store.edges[edge_id] for edge_id in store.outgoing[source.id]
+                                 if store.edges[edge_id].relation == groups["rel_type"]
+                                 and store.edges[edge_id].dest_node == target.id
+                                 and store.edges[edge_id].properties.get("frontend_id") == row["id"]), None)
+            if existing is None:
+                store.add_edge(groups["rel_type"], source, target, row["props"])
+                created += 1
+            else:
+                existing.properties = _clean(row["props"])
+        return FakeResult(relationships_created=created)
+    return handler
+
+
+def _delete_edges(store: GraphStore, groups, params) -> FakeResult:
+    deleted = 0
+    for row in params["rows"]:
+        source = store.find(groups["source_label"], row["source"])
+        if source is None:
+            continue
+        for edge_id in list(store.outgoing[source.id]):
+            edge = store.edges[edge_id]
+            if edge.relation == groups["rel_type"] and edge.properties.get("frontend_id") == row["id"]:
+                deleted += store.delete_edge(edge)
+    return FakeResult(relationships_deleted=deleted)
+
+
+def _stored_edges(store: GraphStore, groups, params) -> FakeResult:
+    rows = []
+    for edge in store.edges.values():
+        if edge.properties.get("frontend_id") is not None:
+            rows.append(_stored_edge_row(store, edge))
+    return FakeResult(rows)
+
+
+def _labels(store: GraphStore, groups, params) -> FakeResult:
+    return FakeResult([[label] for label in store.by_label])
+
+
+def _all_nodes(store: GraphStore, groups, params) -> FakeResult:
+    return FakeResult([[store.nodes[node_id]] for node_id in store.sorted_ids()])
+
+
+def _edges(store: GraphStore, groups, params) -> FakeResult:
+    label = groups.get("label")
+    rows = []
+    for node_id in store.ids_in_range(params.get("lo", -1), params.get("hi")):
+        if label and store.nodes[node_id].label != label:
+            continue
+        for edge_id in store.outgoing[node_id]:
+            edge = store.edges[edge_id]
+            if label and store.nodes[edge.dest_node].label != label:
+                continue
+            rows.append(store.edge_columns(edge))
+    return FakeResult(rows)
+
+
+def _nodes_page(store: GraphStore, groups, params) -> FakeResult:
+    rows = []
+    for node_id in store.ids_in_range(params["cursor"]):
+        node = store.nodes[node_id]
+        if groups.get("label") and node.label != groups["label"]:
+            continue
+        rows.append([node, node_id])
+        if len(rows) >= params["limit"]:
+            break
+    return FakeResult(rows)
+
+
+def _node_by_id(store: GraphStore, groups, params) -> FakeResult:
+    node = store.find(groups.get("label"), params["node_id"])
+    return FakeResult([[node]] if node is not None else [])
+
+
+def _delete_node_by_id(store: GraphStore, groups, params) -> FakeResult:
+    node = store.find(None, params["node_id"])
+    if node is None:
+        return FakeResult()
+    return FakeResult(nodes_deleted=1, relationships_deleted=store.delete_node(node))
+
+
+def _stored_edge_row(store: GraphStore, edge: FakeEdge) -> List[Any]:
+    source = store.nodes[edge.src_node]
+    return [edge.properties["frontend_id"], source.properties.get("frontend_id"), source.labels,
+            edge.relation, edge.properties.get("content_hash")]
+
+
+def _stored_edges_by(endpoint: str) -> Callable[..., FakeResult]:
+    def handler(store: GraphStore, groups, params) -> FakeResult:
+        rows = []
+        for row in params["rows"]:
+            node = store.find(groups[f"{endpoint}_label"], row[endpoint])
+            if node is None:
+                continue
+            adjacency = store.outgoing if endpoint == "source" else store.incoming
+            for edge_id in adjacency[node.id]:
+                edge = store.edges[edge_id]
+                if edge.properties.get("frontend_id") == row["id"]:
+                    rows.append(_stored_edge_row(store, edge))
+        return FakeResult(rows)
+    return handler
+
+
+def _node_edges(direction: str) -> Callable[..., FakeResult]:
+    def handler(store: GraphStore, groups, params) -> FakeResult:
+        rows = []
+        for frontend_id in params["ids"]:
+            node = store.find(groups["label"], frontend_id)
+            if node is None:
+                continue
+            adjacency = store.outgoing if direction == "out" else store.incoming
+            for edge_id in adjacency[node.id]:
+                edge = store.edges[edge_id]
+                rows.append([edge, store.nodes[edge.src_node].properties.get("frontend_id"),
+                             store.nodes[edge.dest_node].properties.get("frontend_id")])
+        return FakeResult(rows)
+    return handler
+
+
+def _adjacent(direction: str) -> Callable[..., FakeResult]:
+    def handler(store: GraphStore, groups, params) -> FakeResult:
+        rows = []
+        for frontend_id in params["ids"]:
+            node = store.find(groups["label"], frontend_id)
+            if node is None:
+                continue
+            adjacency = store.outgoing if direction == "out" else store.incoming
+            for edge_id in adjacency[node.id]:
+                edge = store.edges[edge_id]
+                neighbor = edge.dest_node if direction == "out" else edge.src_node
+                rows.append(store.edge_columns(edge) + [store.nodes[neighbor]])
+        return FakeResult(rows)
+    return handler
+
+
+_EDGE_WHERE = r"(?P<where>WHERE id\(s\) > \$lo (?:AND id\(s\) <= \$hi )?)?"
+_HANDLERS: List[Tuple["re.Pattern", Callable[..., FakeResult]]] = [
+    (re.compile(r"CREATE INDEX FOR \(n:(?P<label>\w+)\) ON \(n\.(?P<prop>\w+)\)$"), _create_index),
+    (re.compile(r"CALL db\.idx\.fulltext\.createNodeIndex\('(?P<label>\w+)', '(?P<prop>\w+)'\)$"),
+     lambda store, groups, params: _create_index(store, {"label": groups["label"], "prop": "fulltext"}, params)),
+    (_template(crud.CREATE_NODES_QUERY), _create_nodes),
+    (_template(crud.UPSERT_NODES_QUERY), _upsert_nodes),
+    (_template(crud.DELETE_NODES_QUERY), _delete_nodes),
+    (_template(crud.FIND_NODES_QUERY), _find_nodes),
+    (_template(crud.STORED_HASHES_QUERY), _stored_hashes),
+    (_template(crud.ALL_HASHES_QUERY), _all_hashes),
+    (_template(crud.SET_POSITIONS_QUERY), _set_positions),
+    (re.compile(re.escape(dossiers.FIND_PEOPLE_QUERY.format(prop="PROP")).replace("PROP", r"(?P<prop>\w+)") + "$"),
+     _find_people),
+    (re.compile(re.escape(dossiers.UPDATE_PEOPLE_QUERY) + "$"), _update_people),
+    (re.compile(re.escape(dossiers.PEOPLE_BY_ID_QUERY) + "$"), _people_by_id),
+    (_template(crud.CREATE_EDGES_QUERY), _write_edges(merge=False)),
+    (_template(crud.UPSERT_EDGES_QUERY), _write_edges(merge=True)),
+    (_template(crud.DELETE_EDGES_QUERY), _delete_edges),
+    (_template(crud.STORED_EDGES_QUERY), _stored_edges),
+    (_template(crud.STORED_EDGES_BY_SOURCE_QUERY), _stored_edges_by("source")),
+    (_template(crud.STORED_EDGES_BY_TARGET_QUERY), _stored_edges_by("target")),
+    (_template(crud.NODE_OUTGOING_EDGES_QUERY), _node_edges("out")),
+    (_template(crud.NODE_INCOMING_EDGES_QUERY), _node_edges("in")),
+    (_template("CALL db.labels()"), _labels),
+    (_template("MATCH (n) RETURN n"), _all_nodes),
+    (_template(crud.EDGES_QUERY, label=_LABEL, where=_EDGE_WHERE), _edges),
+    (re.compile(r"MATCH \(n" + _LABEL + r"\) WHERE id\(n\) > \$cursor RETURN n, id\(n\) LIMIT \$limit$"),
+     _nodes_page),
+    (re.compile(r"MATCH \(n" + _LABEL + r" \{frontend_id: \$node_id\}\) RETURN n LIMIT 1$"), _node_by_id),
+    (_template("MATCH (n {{frontend_id: $node_id}}) DETACH DELETE n"), _delete_node_by_id),
+    (_template(crud.OUTGOING_EDGES_QUERY), _adjacent("out")),
+    (_template(crud.INCOMING_EDGES_QUERY), _adjacent("in")),
+]
+
+
+# --- REDIS ---
+def _command(method: Callable) -> Callable:
+    """Un comando: un viaje de red simulado y ejecución atómica (Redis es de un solo hilo)."""
+    @functools.wraps(method)
+    def wrapper(self: "FakeRedis", *args, **kwargs):
+        self.round_trip()
+        with self.mutex:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+def _to_str(value: Any) -> str:
+    return value if isinstance(value, str) else repr(value) if isinstance(value, float) else str(value)
+
+
+class FakePipeline:
+    """pipeline(transaction=False): acumula comandos y los ejecuta en un solo viaje."""
+
+    def __init__(self, conn: "FakeRedis"):
+        self._conn = conn
+        self._calls: List[Tuple[str, tuple, dict]] = []
+
+    def __getattr__(self, name: str):
+        def queue(*args, **kwargs):
+            self._calls.append((name, args, kwargs))
+            return self
+        return queue
+
+    def execute(self) -> List[Any]:
+        calls, self._calls = self._calls, []
+        self._conn.round_trip()
+        with self._conn.mutex:
+            return [getattr(self._conn, name).__wrapped__(self._conn, *args, **kwargs)
+                    for name, args, kwargs in calls]
+
+
+class FakeLock:
+    """redis.lock.Lock con los métodos que usa jobs.graph_write_lock."""
+
+    def __init__(self, conn: "FakeRedis", name: str, timeout: Optional[float] = None):
+        self._conn = conn
+        self.name = name
+        self.timeout = timeout
+        self._token = object()
+
+    def _holder(self):
+        holder = self._conn.locks.get(self.name)
+        if holder is not None and holder[1] is not None and holder[1] < time.monotonic():
+            del self._conn.locks[self.name]  # expiró
+            return None
+        return holder
+
+    def _expiry(self) -> Optional[float]:
+        return None if self.timeout is None else time.monotonic() + self.timeout
+
+    def acquire(self, blocking: bool = True, blocking_timeout: Optional[float] = None) -> bool:
+        deadline = None if blocking_timeout is None else time.monotonic() + blocking_timeout
+        while True:
+            self._conn.round_trip()
+            with self._conn.mutex:
+                if self._holder() is None:
+                    self._conn.locks[self.name] = (self._token, self._expiry())
+                    return True
+            if not blocking or (deadline is not None and time.monotonic() >= deadline):
+                return False
+            time.sleep(0.01)
+
+    def locked(self) -> bool:
+        with self._conn.mutex:
+            return self._holder() is not None
+
+    def reacquire(self) -> bool:
+        with self._conn.mutex:
+            holder = self._holder()
+            if holder is None or holder[0] is not self._token:
+                raise redis.exceptions.LockNotOwnedError("Cannot reacquire a lock that's no longer owned")
+            self._conn.locks[self.name] = (self._token, self._expiry())
+            return True
+
+    def release(self):
+        with self._conn.mutex:
+            holder = self._holder()
+            if holder is None or holder[0] is not self._token:
+                raise redis.exceptions.LockNotOwnedError("Cannot release a lock that's no longer owned")
+            del self._conn.locks[self.name]
+
+
+class FakePubSub:
+    """PubSub con handlers: publish los llama en el hilo de quien publica (no hace falta el hilo lector)."""
+
+    class _Thread:
+        def stop(self):
+            pass
+
+    def __init__(self, conn: "FakeRedis"):
+        self.conn = conn
+
+    def subscribe(self, **handlers: Callable[[Dict[str, Any]], None]):
+        with self.conn.mutex:
+            for channel, handler in handlers.items():
+                self.conn.subscribers.setdefault(channel, []).append(handler)
+
+    def run_in_thread(self, sleep_time: float = 0, daemon: bool = False) -> "FakePubSub._Thread":
+        return self._Thread()
+
+
+class FakeRedis:
+    """Los comandos de redis-py 3.5 que usa el backend, sobre diccionarios en memoria.
+
+    Sin expiración de claves (`expire` no borra nada): las corridas son cortas.
+    """
+
+    def __init__(self, latency_ms: float = 0.0):
+        self.latency = latency_ms / 1000
+        self.mutex = threading.RLock()
+        self._changed = threading.Condition(self.mutex)  # despierta a XREAD bloqueantes
+        self.data: Dict[str, Any] = {}
+        self.graphs: Dict[str, GraphStore] = {}
+        self.locks: Dict[str, Tuple[object, Optional[float]]] = {}
+        self._last_stream_id = (0, 0)
+        self.subscribers: Dict[str, List[Callable[[Dict[str, Any]], None]]] = {}
+
+    def round_trip(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    @property
+    def connection_pool(self) -> "FakeRedis":
+        return self
+
+    def disconnect(self):
+        pass  # Hace también de connection pool (crud.close_db_connection, changes.stop_all)
+
+    def pipeline(self, transaction: bool = True) -> FakePipeline:
+        return FakePipeline(self)
+
+    def lock(self, name: str, timeout: Optional[float] = None, thread_local: bool = True, **kwargs) -> FakeLock:
+        return FakeLock(self, name, timeout)
+
+    def pubsub(self, ignore_subscribe_messages: bool = False) -> FakePubSub:
+        return FakePubSub(self)
+
+    @_command
+    def publish(self, channel: str, message: Any) -> int:
+        handlers = list(self.subscribers.get(channel, ()))
+        for handler in handlers:
+            handler({"type": "message", "channel": channel, "data": _to_str(message)})
+        return len(handlers)
+
+    def _typed(self, name: str, kind: type, create: bool = False):
+        value = self.data.get(name)
+        if value is None:
+            if not create:
+                return None
+            value = self.data[name] = kind()
+        if not isinstance(value, kind):
+            raise redis.exceptions.ResponseError("WRONGTYPE Operation against a key holding the wrong kind of value")
+        return value
+
+    # Claves
+    @_command
+    def ping(self) -> bool:
+        return True
+
+    @_command
+    def exists(self, *names: str) -> int:
+        return sum(name in self.data for name in names)
+
+    @_command
+    def delete(self, *names: str) -> int:
+        return sum(self.data.pop(name, None) is not None for name in names)
+
+    unlink = delete
+
+    @_command
+    def rename(self, src: str, dst: str) -> bool:
+        if src not in self.data:
+            raise redis.exceptions.ResponseError("no such key")
+        self.data[dst] = self.data.pop(src)
+        return True
+
+    @_command
+    def expire(self, name: str, seconds: int) -> bool:
+        return name in self.data
+
+    @_command
+    def scan_iter(self, match: Optional[str] = None, count: Optional[int] = None):
+        return iter([name for name in self.data if match is None or fnmatch.fnmatchcase(name, match)])
+
+    # Strings
+    @_command
+    def get(self, name: str) -> Optional[str]:
+        return self._typed(name, str)
+
+    @_command
+    def set(self, name: str, value: Any, **kwargs) -> bool:
+        self.data[name] = _to_str(value)
+        return True
+
+    @_command
+    def incr(self, name: str, amount: int = 1) -> int:
+        value = int(self._typed(name, str) or 0) + amount
+        self.data[name] = str(value)
+        return value
+
+    # Hashes
+    @_command
+    def hget(self, name: str, key: str) -> Optional[str]:
+        return (self._typed(name, dict) or {}).get(key)
+
+    @_command
+    def hmget(self, name: str, keys, *args) -> List[Optional[str]]:
+        keys = list(keys) + list(args) if isinstance(keys, (list, tuple)) else [keys, *args]
+        values = self._typed(name, dict) or {}
+        return [values.get(key) for key in keys]
+
+    @_command
+    def hgetall(self, name: str) -> Dict[str, str]:
+        return dict(self._typed(name, dict) or {})
+
+    @_command
+    def hset(self, name: str, key: Optional[str] = None, value: Any = None,
+             mapping: Optional[Dict[str, Any]] = None) -> int:
+        values = self._typed(name, dict, create=True)
+        items = dict(mapping or {})
+        if key is not None:
+            items[key] = value
+        added = sum(field not in values for field in items)
+        values.update((field, _to_str(item)) for field, item in items.items())
+        return added
+
+    @_command
+    def hsetnx(self, name: str, key: str, value: Any) -> int:
+        values = self._typed(name, dict, create=True)
+        if key in values:
+            return 0
+        values[key] = _to_str(value)
+        return 1
+
+    @_command
+    def hexists(self, name: str, key: str) -> bool:
+        return key in (self._typed(name, dict) or {})
+
+    @_command
+    def hdel(self, name: str, *keys: str) -> int:
+        values = self._typed(name, dict) or {}
+        removed = sum(values.pop(key, None) is not None for key in keys)
+        if not values:
+            self.data.pop(name, None)
+        return removed
+
+    @_command
+    def hscan(self, name: str, cursor: int = 0, match: Optional[str] = None, count: Optional[int] = None):
+        return 0, dict(self._typed(name, dict) or {})  # Todo en una sola página
+
+    # Sets
+    @_command
+    def sadd(self, name: str, *values: Any) -> int:
+        members = self._typed(name, set, create=True)
+        before = len(members)
+        members.update(_to_str(value) for value in values)
+        return len(members) - before
+
+    @_command
+    def smembers(self, name: str) -> set:
+        return set(self._typed(name, set) or ())
+
+    # Streams (lista de (id, campos) por clave)
+    def _next_stream_id(self) -> str:
+        millis, seq = int(time.time() * 1000), 0
+        last_millis, last_seq = self._last_stream_id
+        if millis <= last_millis:
+            millis, seq = last_millis, last_seq + 1
+        self._last_stream_id = (millis, seq)
+        return f"{millis}-{seq}"
+
+    @_command
+    def xadd(self, name: str, fields: Dict[str, Any], id: str = "*", maxlen: Optional[int] = None,
+             approximate: bool = True) -> str:
+        entries = self._typed(name, list, create=True)
+        entry_id = self._next_stream_id()
+        entries.append((entry_id, {key: _to_str(value) for key, value in fields.items()}))
+        if maxlen is not None and len(entries) > maxlen:
+            del entries[:len(entries) - maxlen]
+        self._changed.notify_all()
+        return entry_id
+
+    @staticmethod
+    def _stream_key(entry_id: str) -> Tuple[int, int]:
+        millis, _, seq = entry_id.partition("-")
+        return int(millis), int(seq or 0)
+
+    def _range(self, name: str, low: str, high: str) -> List[Tuple[str, Dict[str, str]]]:
+        low_key = (-1, -1) if low == "-" else self._stream_key(low)
+        high_key = (float("inf"), 0) if high == "+" else self._stream_key(high)
+        return [(entry_id, dict(fields)) for entry_id, fields in self._typed(name, list) or []
+                if low_key <= self._stream_key(entry_id) <= high_key]
+
+    @_command
+    def xrange(self, name: str, min: str = "-", max: str = "+", count: Optional[int] = None):
+        return self._range(name, min, max)[:count]
+
+    @_command
+    def xrevrange(self, name: str, max: str = "+", min: str = "-", count: Optional[int] = None):
+        return list(reversed(self._range(name, min, max)))[:count]
+
+    def xread(self, streams: Dict[str, str], count: Optional[int] = None, block: Optional[int] = None):
+        self.round_trip()
+        deadline = None if block is None else time.monotonic() + block / 1000
+        with self._changed:
+            while True:
+                result = []
+                for name, last_id in streams.items():
+                    last_key = self._stream_key(last_id)
+                    entries = [(entry_id, dict(fields)) for entry_id, fields in self._typed(name, list) or []
+                               if self._stream_key(entry_id) > last_key][:count]
+                    if entries:
+                        result.append([name, entries])
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if result or remaining is None or remaining <= 0:
+                    return result
+                self._changed.wait(remaining)
+
+
+def install_fake_backend(latency_ms: float = 0.0) -> FakeRedis:
+    """Conecta crud al fake en lugar de Redis: mismo executor y handles, otro backend.
+
+    También sustituye crud.init_db_connection, para que el evento de arranque
+    de la app (main.startup_event) use el fake.
+    """
+    fake = FakeRedis(latency_ms)
+
+    async def init_fake_connection():
+        if crud.db_executor is None:
+            crud.db_executor = ThreadPoolExecutor(max_workers=crud.REDIS_MAX_CONNECTIONS, thread_name_prefix="redis")
+        crud.redis_pool = crud.redis_conn = fake
+        crud.DB_POOL_SIZE.set(crud.REDIS_MAX_CONNECTIONS)
+
+    graphs.Graph = FakeGraph
+    graphs.registry.clear()
+    crud.init_db_connection = init_fake_connection
+    crud.connect_redis = lambda max_connections: fake  # lectores del feed de cambios
+    return fake
@@ -0,0 +1,110 @@
+# backend/benchmarks/load_users_me.py
+"""Mide la latencia p50/p99 de /users/me/ mientras /graph-data/ recibe carga.
+
+Se ejecuta contra un backend ya levantado (docker-compose up):
+
+    cd backend
+    python -m benchmarks.load_users_me --base-url http://localhost:8000 --hammers 8 --seconds 20
+
+Primero mide /users/me/ sin carga y después con `--hammers` clientes pidiendo
+/graph-data/ en bucle; si el event loop se bloquea, el p99 se dispara.
+"""
+import argparse
+import json
+import statistics
+import threading
+import time
+import urllib.parse
+import urllib.request
+from typing import List, Optional
+
+
+def get_token(base_url: str, username: str, password: str) -> str:
+    body = urllib.parse.urlencode({"username": username, "password": password}).encode()
+    with urllib.request.urlopen(urllib.request.Request(f"{base_url}/token", data=body)) as response:
+        return json.loads(response.read())["access_token"]
+
+
+def timed_get(url: str, token: str) -> float:
+    request = urllib.request.Request(url, headers={"Authorization": f"Bearer {token}"})
+    started = time.perf_counter()
+    with urllib.request.urlopen(request) as response:
+        response.read()
+    return (time.perf_counter() - started) * 1000
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    if not samples:
+        return float("nan")
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def sample_latency(url: str, token: str, seconds: float, probes: int) -> List[float]:
+    samples: List[float] = []
+    lock = threading.Lock()
+    deadline = time.monotonic() + seconds
+
+    def probe():
+        while time.monotonic() < deadline:
+            latency = timed_get(url, token)
+            with lock:
+                samples.append(latency)
+
+    threads = [threading.Thread(target=probe) for _ in range(probes)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return samples
+
+
+def hammer(url: str, token: str, stop: threading.Event, counter: List[int]):
+    while not stop.is_set():
+        try:
+            timed_get(url, token)
+            counter[0] += 1
+        except Exception:
+            pass
+
+
+def report(title: str, samples: List[float], extra: Optional[str] = None):
+    line = (f"{title:<28} n={len(samples):<6} p50={percentile(samples, 50):8.1f} ms "
+            f"p99={percentile(samples, 99):8.1f} ms  media={statistics.fmean(samples) if samples else 0:8.1f} ms")
+    print(line + (f"  {extra}" if extra else ""))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--username", default="testuser")
+    parser.add_argument("--password", default="testpassword")
+    parser.add_argument("--seconds", type=float, default=15)
+    parser.add_argument("--probes", type=int, default=2, help="Clientes concurrentes midiendo /users/me/")
+    parser.add_argument("--hammers", type=int, default=8, help="Clientes concurrentes pidiendo /graph-data/")
+    args = parser.parse_args()
+
+    base_url = args.base_url.rstrip("/")
+    token = get_token(base_url, args.username, args.password)
+    users_me = f"{base_url}/users/me/"
+
+    report("/users/me/ sin carga", sample_latency(users_me, token, args.seconds, args.probes))
+
+    stop = threading.Event()
+    counter = [0]
+    hammers = [threading.Thread(target=hammer, args=(f"{base_url}/graph-data/", token, stop, counter))
+               for _ in range(args.hammers)]
+    for thread in hammers:
+        thread.start()
+    try:
+        samples = sample_latency(users_me, token, args.seconds, args.probes)
+    finally:
+        stop.set()
+        for thread in hammers:
+            thread.join()
+    report("/users/me/ con /graph-data/", samples, f"({counter[0]} respuestas de /graph-data/)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,474 @@
+# backend/benchmarks/suite.py
+"""Suite de benchmarks del backend: ingest, lectura completa, borrados, auth y carga mixta.
+
+Corre en proceso: los escenarios de crud se llaman directamente y los de la API
+pasan por la app FastAPI completa (middleware, auth, dependencias) como
+peticiones ASGI, sin red de por medio. Dos destinos:
+
+    cd backend
+    # Sin Redis: backend en memoria (benchmarks/fakes.py)
+    python -m benchmarks.suite --target fake --scale small --output results.json
+    # RedisGraph real (REDIS_HOST, REDIS_PORT, ... como el backend), en un grafo propio
+    python -m benchmarks.suite --target redis --scale medium --output results.json
+
+El resultado es un JSON con los metadatos de la corrida y la mediana de cada
+métrica en --repeat repeticiones. Con --baseline se compara contra un
+resultado anterior: las métricas *_per_s son mejores si suben; *_s, *_ms,
+*_bytes, errors y conflicts, si bajan. Un cambio peor que --tolerance es una
+regresión (y con --fail-on-regression el proceso sale con código 1):
+
+    cp results.json baseline.json   # tras una corrida de referencia
+    python -m benchmarks.suite --target fake --baseline baseline.json --fail-on-regression
+
+Solo tiene sentido comparar corridas con el mismo destino, escala y máquina.
+Con --target redis el grafo --graph se sobrescribe y se borra al terminar.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+import urllib.parse
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from app import crud, serialization
+from app.main import app
+from benchmarks import synthetic
+from benchmarks.fakes import install_fake_backend
+from benchmarks.load_users_me import percentile
+
+SCENARIOS = ("ingest", "read", "delete", "auth", "mixed")
+# Operaciones de la carga mixta y su peso relativo
+MIXED_OPERATIONS = {
+    "graph_data": 20,
+    "node_details": 30,
+    "neighborhood": 20,
+    "users_me": 15,
+    "load_json_merge": 10,
+    "delete_node": 5,
+}
+MIXED_WRITE_NODES = 10  # nodos por cada load_json_merge
+
+
+async def asgi_request(app, method: str, path: str, headers: Optional[Dict[str, str]] = None,
+                       body: bytes = b"") -> Tuple[int, bytes]:
+    """Una petición HTTP directa a la app ASGI; devuelve (status, cuerpo)."""
+    path, _, query = path.partition("?")
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": method,
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": query.encode(),
+        "root_path": "", "client": ("127.0.0.1", 50000), "server": ("benchmark", 80),
+        "headers": [(name.lower().encode(), value.encode()) for name, value in (headers or {}).items()],
+    }
+    request_sent = False
+    response_done = asyncio.Event()
+    status = 500
+    chunks: List[bytes] = []
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await response_done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                response_done.set()
+
+    await app(scope, receive, send)
+    response_done.set()
+    return status, b"".join(chunks)
+
+
+async def timed(awaitable: Awaitable) -> Tuple[Any, float]:
+    started = time.perf_counter()
+    result = await awaitable
+    return result, time.perf_counter() - started
+
+
+def latency_metrics(prefix: str, latencies_ms: List[float]) -> Dict[str, float]:
+    return {f"{prefix}_p50_ms": percentile(latencies_ms, 50), f"{prefix}_p99_ms": percentile(latencies_ms, 99)}
+
+
+class Bench:
+    """Estado compartido por los escenarios: la app, el grafo de prueba y los datos sintéticos."""
+
+    def __init__(self, args: argparse.Namespace, data: Dict[str, List[Dict[str, Any]]]):
+        self.args = args
+        self.data = data
+        self.perturbed = synthetic.perturb_graph(data, seed=args.seed + 1, records=args.records)
+        self.batch_size = args.batch_size or crud.INGEST_BATCH_SIZE
+        self.rng = random.Random(args.seed)
+        self.token: Optional[str] = None
+
+    @property
+    def items(self) -> int:
+        return len(self.data["nodes"]) + len(self.data["edges"])
+
+    async def load(self):
+        """Carga el grafo completo en modo overwrite (preparación; no se mide)."""
+        report = await crud.process_and_store_json(self.data, "overwrite", self.batch_size)
+        if report["errors"]:
+            logging.getLogger(__name__).warning("La carga inicial tuvo %s errores", len(report["errors"]))
+
+    async def request(self, method: str, path: str, body: bytes = b"", content_type: Optional[str] = None,
+                      graph: bool = True) -> Tuple[int, bytes, float]:
+        """Petición a la app autenticada y sobre el grafo de prueba; devuelve (status, cuerpo, ms)."""
+        headers = {}
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        if content_type:
+            headers["Content-Type"] = content_type
+        if graph:
+            path += ("&" if "?" in path else "?") + urllib.parse.urlencode({"graph": self.args.graph})
+        started = time.perf_counter()
+        status, response = await asgi_request(app, method, path, headers, body)
+        return status, response, (time.perf_counter() - started) * 1000
+
+    async def login(self) -> Tuple[int, bytes, float]:
+        form = urllib.parse.urlencode({"username": self.args.username, "password": self.args.password})
+        return await self.request("POST", "/token", form.encode(), "application/x-www-form-urlencoded", graph=False)
+
+
+async def run_concurrent(total: int, concurrency: int,
+                         call: Callable[[int], Awaitable[Tuple[str, int, float]]]
+                         ) -> Tuple[Dict[str, List[float]], Dict[str, int], float]:
+    """Ejecuta `call(i)` para i en [0, total) con `concurrency` clientes.
+
+    `call` devuelve (operación, status, ms). Regresa las latencias por
+    operación, los conteos de errores (status >= 400, 409 aparte) y la duración.
+    """
+    latencies: Dict[str, List[float]] = {}
+    failures = {"errors": 0, "conflicts": 0}
+    next_index = iter(range(total))
+
+    async def client():
+        for index in next_index:
+            operation, status, elapsed_ms = await call(index)
+            latencies.setdefault(operation, []).append(elapsed_ms)
+            if status == 409:
+                failures["conflicts"] += 1
+            elif status >= 400:
+                failures["errors"] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return latencies, failures, time.perf_counter() - started
+
+
+# --- ESCENARIOS ---
+async def scenario_ingest(bench: Bench) -> Dict[str, float]:
+    """process_and_store_json: overwrite completo, merge sin cambios e incremental con ~5% de cambios."""
+    errors = 0
+    report, overwrite_s = await timed(crud.process_and_store_json(bench.data, "overwrite", bench.batch_size))
+    errors += len(report["errors"])
+    report, merge_s = await timed(crud.process_and_store_json(bench.data, "merge", bench.batch_size))
+    errors += len(report["errors"])
+    report, incremental_s = await timed(crud.process_and_store_json(bench.perturbed, "incremental", bench.batch_size))
+    errors += len(report["errors"])
+    return {
+        "overwrite_s": overwrite_s,
+        "overwrite_items_per_s": bench.items / overwrite_s,
+        "merge_unchanged_s": merge_s,
+        "incremental_s": incremental_s,
+        "errors": errors,
+    }
+
+
+async def scenario_read(bench: Bench) -> Dict[str, float]:
+    """Grafo completo: crud.fetch_all_graph_data, serialización, paginado y GET /graph-data/ (frío y cacheado)."""
+    await bench.load()
+    (nodes, edges), full_read_s = await timed(crud.fetch_all_graph_data())
+    started = time.perf_counter()
+    body = serialization.dumps({"nodes": nodes, "edges": edges})
+    serialize_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    async for _ in crud.iter_graph_pages(crud.GRAPH_PAGE_SIZE):
+        pass
+    paged_read_s = time.perf_counter() - started
+
+    cold_status, _, cold_ms = await bench.request("GET", "/graph-data/")
+    cached_status, _, cached_ms = await bench.request("GET", "/graph-data/")
+    return {
+        "full_read_s": full_read_s,
+        "full_read_nodes_per_s": len(nodes) / full_read_s,
+        "serialize_s": serialize_s,
+        "response_bytes": len(body),
+        "paged_read_s": paged_read_s,
+        "http_cold_ms": cold_ms,
+        "http_cached_ms": cached_ms,
+        "errors": sum(status >= 400 for status in (cold_status, cached_status)),
+    }
+
+
+async def scenario_delete(bench: Bench) -> Dict[str, float]:
+    """crud.delete_node_by_id de --deletes nodos al azar, uno tras otro."""
+    await bench.load()
+    node_ids = [node["id"] for node in bench.data["nodes"]]
+    targets = bench.rng.sample(node_ids, min(bench.args.deletes, len(node_ids)))
+    latencies, missing = [], 0
+    started = time.perf_counter()
+    for node_id in targets:
+        deleted, elapsed = await timed(crud.delete_node_by_id(node_id))
+        latencies.append(elapsed * 1000)
+        missing += not deleted
+    total_s = time.perf_counter() - started
+    return {"deletes_per_s": len(targets) / total_s, **latency_metrics("delete", latencies), "errors": missing}
+
+
+async def scenario_auth(bench: Bench) -> Dict[str, float]:
+    """POST /token (bcrypt) y GET /users/me/ (token cacheado) con --concurrency clientes."""
+    async def login(_):
+        status, _, elapsed_ms = await bench.login()
+        return "token", status, elapsed_ms
+
+    async def users_me(_):
+        status, _, elapsed_ms = await bench.request("GET", "/users/me/", graph=False)
+        return "users_me", status, elapsed_ms
+
+    token_latencies, token_failures, token_s = await run_concurrent(bench.args.logins, bench.args.concurrency, login)
+    me_latencies, me_failures, me_s = await run_concurrent(bench.args.requests, bench.args.concurrency, users_me)
+    return {
+        "token_per_s": bench.args.logins / token_s,
+        **latency_metrics("token", token_latencies["token"]),
+        "users_me_per_s": bench.args.requests / me_s,
+        **latency_metrics("users_me", me_latencies["users_me"]),
+        "errors": token_failures["errors"] + me_failures["errors"],
+    }
+
+
+async def scenario_mixed(bench: Bench) -> Dict[str, float]:
+    """Lecturas y escrituras concurrentes contra la API con la mezcla de MIXED_OPERATIONS."""
+    await bench.load()
+    rng = random.Random(bench.args.seed)
+    plan = rng.choices(list(MIXED_OPERATIONS), weights=list(MIXED_OPERATIONS.values()), k=bench.args.requests)
+    alive = [(node["id"], node["type"]) for node in bench.data["nodes"]]
+    next_new = [len(bench.data["nodes"]) * 10]
+
+    def pick() -> Tuple[str, str]:
+        node_id, label = rng.choice(alive)
+        return urllib.parse.quote(node_id, safe=""), label
+
+    async def call(index: int) -> Tuple[str, int, float]:
+        operation = plan[index]
+        if operation == "graph_data":
+            status, _, elapsed_ms = await bench.request("GET", "/graph-data/")
+        elif operation == "node_details":
+            node_id, label = pick()
+            status, _, elapsed_ms = await bench.request("GET", f"/node-details/{node_id}?type={label}")
+        elif operation == "neighborhood":
+            node_id, label = pick()
+            status, _, elapsed_ms = await bench.request("GET", f"/graph/neighborhood/{node_id}?type={label}&hops=1")
+        elif operation == "users_me":
+            status, _, elapsed_ms = await bench.request("GET", "/users/me/", graph=False)
+        elif operation == "load_json_merge":
+            start, next_new[0] = next_new[0], next_new[0] + MIXED_WRITE_NODES
+            nodes = [synthetic.make_dossier_person_node(start + offset, rng, bench.args.records)
+                     for offset in range(MIXED_WRITE_NODES)]
+            body = json.dumps({"jsonData": {"nodes": nodes, "edges": []}, "mode": "merge"}).encode()
+            status, _, elapsed_ms = await bench.request("POST", "/graph/load-json", body, "application/json")
+            if status < 400:
+                alive.extend((node["id"], node["type"]) for node in nodes)
+        else:
+            node_id, _ = alive.pop(rng.randrange(len(alive)))
+            status, _, elapsed_ms = await bench.request("DELETE", f"/graph/node/{urllib.parse.quote(node_id, safe='')}")
+        return operation, status, elapsed_ms
+
+    latencies, failures, total_s = await run_concurrent(bench.args.requests, bench.args.concurrency, call)
+    metrics = {"requests_per_s": bench.args.requests / total_s, **failures}
+    for operation in MIXED_OPERATIONS:
+        if latencies.get(operation):
+            metrics.update(latency_metrics(operation, latencies[operation]))
+    return metrics
+
+
+SCENARIO_FUNCTIONS = {
+    "ingest": scenario_ingest,
+    "read": scenario_read,
+    "delete": scenario_delete,
+    "auth": scenario_auth,
+    "mixed": scenario_mixed,
+}
+
+
+# --- RESULTADOS Y COMPARACIÓN ---
+def metric_direction(name: str) -> Optional[int]:
+    """+1 si más es mejor, -1 si menos es mejor, None si la métrica es solo informativa."""
+    if name.endswith("_per_s"):
+        return 1
+    if name.endswith(("_s", "_ms", "_bytes", "errors", "conflicts")):
+        return -1
+    return None
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[Dict[str, Any]]:
+    """Una fila por métrica presente en ambos resultados, con el cambio relativo y su estado."""
+    rows = []
+    for scenario, metrics in results["scenarios"].items():
+        previous_metrics = baseline.get("scenarios", {}).get(scenario, {})
+        for name, value in metrics.items():
+            direction, previous = metric_direction(name), previous_metrics.get(name)
+            if direction is None or previous is None:
+                continue
+            if previous == 0:
+                change = 0.0 if value == 0 else float("inf")
+                worse = 0.0 if value == 0 else -direction * float("inf")
+            else:
+                change = (value - previous) / abs(previous)
+                worse = -direction * change
+            status = "regression" if worse > tolerance else "improvement" if worse < -tolerance else "ok"
+            rows.append({"scenario": scenario, "metric": name, "baseline": previous, "current": value,
+                         "change": change, "status": status})
+    return rows
+
+
+def comparable(results: Dict[str, Any], baseline: Dict[str, Any]) -> List[str]:
+    """Diferencias de configuración que hacen poco fiable la comparación."""
+    keys = ("target", "nodes", "edges", "records", "batch_size", "concurrency", "requests", "latency_ms")
+    return [f"{key}: {baseline['meta'].get(key)} -> {results['meta'].get(key)}" for key in keys
+            if baseline.get("meta", {}).get(key) != results["meta"].get(key)]
+
+
+def print_results(results: Dict[str, Any]):
+    for scenario, metrics in results["scenarios"].items():
+        print(f"\n[{scenario}]")
+        for name, value in metrics.items():
+            print(f"  {name:<28} {value:>14.3f}" if isinstance(value, float) else f"  {name:<28} {value:>14}")
+
+
+def print_comparison(rows: List[Dict[str, Any]]):
+    print(f"\n{'escenario':<10} {'métrica':<28} {'base':>12} {'actual':>12} {'cambio':>9}  estado")
+    for row in rows:
+        change = f"{row['change'] * 100:+.1f}%" if row["change"] != float("inf") else "+inf"
+        print(f"{row['scenario']:<10} {row['metric']:<28} {row['baseline']:>12.3f} {row['current']:>12.3f} "
+              f"{change:>9}  {row['status']}")
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def aggregate(runs: List[Dict[str, float]]) -> Dict[str, float]:
+    """Mediana de cada métrica entre repeticiones."""
+    return {name: statistics.median(run[name] for run in runs if name in run) for name in runs[0]}
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    if args.target == "fake":
+        install_fake_backend(args.latency_ms)
+    logging.getLogger("app").setLevel(args.log_level)
+    num_nodes = args.nodes or synthetic.SCALES[args.scale]
+    started = time.perf_counter()
+    data = synthetic.make_case_graph(num_nodes, seed=args.seed, edges_per_node=args.edges_per_node,
+                                     records=args.records)
+    print(f"Grafo sintético: {len(data['nodes'])} nodos, {len(data['edges'])} aristas "
+          f"({time.perf_counter() - started:.1f} s)", file=sys.stderr)
+
+    scenarios: Dict[str, Dict[str, float]] = {}
+    async with app.router.lifespan_context(app):
+        await crud.open_graph(args.graph)
+        bench = Bench(args, data)
+        status, body, _ = await bench.login()
+        if status != 200:
+            raise SystemExit(f"No se pudo iniciar sesión como {args.username}: {status} {body[:200]!r}")
+        bench.token = json.loads(body)["access_token"]
+        try:
+            for scenario in args.scenarios:
+                runs = []
+                for repetition in range(args.repeat):
+                    print(f"{scenario} ({repetition + 1}/{args.repeat})...", file=sys.stderr)
+                    runs.append(await SCENARIO_FUNCTIONS[scenario](bench))
+                scenarios[scenario] = aggregate(runs)
+        finally:
+            await crud.delete_current_graph()
+
+    return {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "git_commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "target": args.target,
+            "latency_ms": args.latency_ms if args.target == "fake" else None,
+            "scale": args.scale if not args.nodes else None,
+            "nodes": len(data["nodes"]),
+            "edges": len(data["edges"]),
+            "records": args.records,
+            "seed": args.seed,
+            "batch_size": args.batch_size or crud.INGEST_BATCH_SIZE,
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "repeat": args.repeat,
+        },
+        "scenarios": scenarios,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", choices=("fake", "redis"), default="fake")
+    parser.add_argument("--scale", choices=list(synthetic.SCALES), default="small")
+    parser.add_argument("--nodes", type=int, default=None, help="Número de nodos (reemplaza a --scale)")
+    parser.add_argument("--edges-per-node", type=float, default=1.5)
+    parser.add_argument("--records", type=int, default=3, help="Registros por lista anidada del dossier (tamaño del payload)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--batch-size", type=int, default=None)
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=2000, help="Peticiones de /users/me/ (auth) y de la carga mixta")
+    parser.add_argument("--logins", type=int, default=32)
+    parser.add_argument("--deletes", type=int, default=200)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Viaje de red simulado por comando (solo fake)")
+    parser.add_argument("--graph", default="bench_suite", help="Grafo de prueba (se borra al terminar)")
+    parser.add_argument("--username", default="testuser")
+    parser.add_argument("--password", default="testpassword")
+    parser.add_argument("--output", default="benchmark-results.json")
+    parser.add_argument("--baseline", default=None, help="Resultado anterior contra el cual comparar")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="Cambio relativo tolerado antes de marcar regresión")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    parser.add_argument("--log-level", default="WARNING")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    print_results(results)
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        for difference in comparable(results, baseline):
+            print(f"Aviso: configuración distinta a la del baseline ({difference})", file=sys.stderr)
+        rows = compare(results, baseline, args.tolerance)
+        results["comparison"] = {"baseline": args.baseline, "tolerance": args.tolerance, "metrics": rows}
+        print_comparison(rows)
+        regressions = [row for row in rows if row["status"] == "regression"]
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+    print(f"\nResultados en {args.output}", file=sys.stderr)
+    if regressions and args.fail_on_regression:
+        print(f"{len(regressions)} regresiones por encima de {args.tolerance:.0%}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+# backend/benchmarks/synthetic.py
+"""Generador de grafos sintéticos con la misma forma que el payload del frontend.
+
+`make_graph` arma grafos con payloads mínimos (bench_decode, bench_serialization).
+`make_case_graph` arma un caso realista: personas con el dossier crudo completo
+en rawJsonData (las mismas rutas que lee app/dossiers.py), empresas con
+accionistas anidados y aristas tipadas con algunos nodos muy conectados.
+"""
+import copy
+import random
+import string
+from typing import Any, Dict, List, Optional
+
+# Tamaños de referencia (número de nodos) para --scale en suite.py.
+SCALES = {"small": 1_000, "medium": 10_000, "large": 100_000}
+
+NOMBRES = ["JOSÉ", "MARÍA", "JUAN", "GUADALUPE", "FRANCISCO", "VERÓNICA", "JESÚS", "ROCÍO", "ÁNGEL", "SOFÍA"]
+APELLIDOS = ["HERNÁNDEZ", "GARCÍA", "MARTÍNEZ", "LÓPEZ", "GONZÁLEZ", "PÉREZ", "RODRÍGUEZ", "SÁNCHEZ",
+             "RAMÍREZ", "NÚÑEZ", "CRUZ", "FLORES"]
+ENTIDADES = ["CIUDAD DE MÉXICO", "JALISCO", "NUEVO LEÓN", "PUEBLA", "VERACRUZ", "YUCATÁN", "SONORA"]
+# (tipo de nodo origen, tipo de nodo destino) -> etiquetas posibles
+EDGE_LABELS = {
+    ("person", "company"): ["Socio", "Representante legal", "Apoderado"],
+    ("person", "person"): ["Familiar", "Cónyuge", "Domicilio compartido"],
+    ("company", "company"): ["Proveedor", "Accionista"],
+}
+
+
+def _random_curp(rng: random.Random) -> str:
+    letters = "".join(rng.choices(string.ascii_uppercase, k=4))
+    digits = "".join(rng.choices(string.digits, k=6))
+    tail = "".join(rng.choices(string.ascii_uppercase + string.digits, k=8))
+    return f"{letters}{digits}{tail}"
+
+
+def make_person_node(index: int, rng: random.Random) -> Dict[str, Any]:
+    curp = _random_curp(rng)
+    return {
+        "id": f"person-{curp}-{index}",
+        "type": "person",
+        "position": {"x": float(index % 100) * 240, "y": float(index // 100) * 260},
+        "data": {
+            "name": f"Persona Sintetica {index}",
+            "title": f"CURP: {curp}",
+            "typeDetails": "Persona",
+            "status": "normal",
+            "details": {"RFC": curp[:10], "Fec. Nac.": "1990-01-01"},
+            "rawJsonData": {"curp_online": {"data": {"registros": [{"curp": curp}]}}},
+        },
+    }
+
+
+def make_company_node(index: int, rng: random.Random) -> Dict[str, Any]:
+    return {
+        "id": f"company-{index}",
+        "type": "company",
+        "position": {"x": rng.uniform(0, 20000), "y": rng.uniform(0, 20000)},
+        "data": {
+            "name": f"Empresa Sintetica {index} SA de CV",
+            "typeDetails": "Empresa",
+            "status": "normal",
+            "location": "CDMX",
+        },
+    }
+
+
+def make_edges(nodes: List[Dict[str, Any]], edges_per_node: float, rng: random.Random) -> List[Dict[str, Any]]:
+    """Aristas aleatorias entre los nodos dados (sin lazos), con etiqueta como las del frontend."""
+    edges = []
+    if len(nodes) < 2:
+        return edges
+    for index in range(int(len(nodes) * edges_per_node)):
+        source, target = rng.sample(nodes, 2)
+        edges.append({
+            "id": f"edge-{index}", "source": source["id"], "target": target["id"],
+            "label": rng.choice(["Socio", "Representante", "Familiar"]),
+        })
+    return edges
+
+
+def make_graph(num_nodes: int, company_ratio: float = 0.2, seed: int = 42,
+               edges_per_node: float = 0.0) -> Dict[str, List[Dict[str, Any]]]:
+    """Devuelve un payload `{nodes, edges}` con `num_nodes` nodos persona/empresa."""
+    rng = random.Random(seed)
+    nodes = []
+    for index in range(num_nodes):
+        if rng.random() < company_ratio:
+            nodes.append(make_company_node(index, rng))
+        else:
+            nodes.append(make_person_node(index, rng))
+    return {"nodes": nodes, "edges": make_edges(nodes, edges_per_node, rng)}
+
+
+def _birth_date(rng: random.Random) -> str:
+    return f"{rng.randint(1950, 2004)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+
+
+def _address(rng: random.Random) -> Dict[str, Any]:
+    return {
+        "calle": f"CALLE {rng.choice(APELLIDOS)} {rng.randint(1, 999)}",
+        "colonia": f"COL. {rng.choice(NOMBRES)}",
+        "codigo_postal": f"{rng.randint(1000, 99999):05d}",
+        "estado": rng.choice(ENTIDADES),
+        "fecha_reporte": _birth_date(rng),
+    }
+
+
+def make_dossier(index: int, rng: random.Random, records: int = 3) -> Dict[str, Any]:
+    """Dossier crudo de una persona con `records` registros en cada lista anidada.
+
+    `records` controla el tamaño del payload pesado (≈1 KB por registro).
+    """
+    nombres, paterno, materno = rng.choice(NOMBRES), rng.choice(APELLIDOS), rng.choice(APELLIDOS)
+    curp = _random_curp(rng)
+    rfc = curp[:10] + "".join(rng.choices(string.ascii_uppercase + string.digits, k=3))
+    birth_date = _birth_date(rng)
+    full_name = f"{nombres} {paterno} {materno}"
+    return {
+        "_id": {"$oid": f"{index:024x}"},
+        "curp_online": {"data": {"registros": [{
+            "curp": curp, "nombres": nombres, "primerApellido": paterno, "segundoApellido": materno,
+            "fechaNacimiento": birth_date, "sexo": rng.choice("HM"), "entidad": rng.choice(ENTIDADES),
+        }]}},
+        "buro1": {"data": [{
+            "nombre_completo": full_name, "rfc_completo": rfc, "curp": curp, "fecha_nacimiento": birth_date,
+            "domicilios": [_address(rng) for _ in range(records)],
+            "cuentas": [{"otorgante": f"BANCO {rng.choice(APELLIDOS)}", "tipo": rng.choice(["TC", "PP", "HIP"]),
+                         "saldo_actual": round(rng.uniform(0, 500000), 2), "pagos": "".join(rng.choices("1V-", k=24))}
+                        for _ in range(records)],
+        }]},
+        "ine1": {"data": [{"nombre": nombres, "paterno": paterno, "materno": materno, "fecha_nac": birth_date,
+                           "domicilio": _address(rng)}]},
+        "vacunacion": {"data": [{"NOMBRE": nombres, "PATERNO": paterno, "MATERNO": materno, "curp": curp,
+                                 "dosis": [{"fecha": _birth_date(rng), "biologico": rng.choice(["A", "B", "C"])}
+                                           for _ in range(records)]}]},
+        "telefonos": [f"55{rng.randint(0, 99999999):08d}" for _ in range(records)],
+    }
+
+
+def make_dossier_person_node(index: int, rng: random.Random, records: int = 3) -> Dict[str, Any]:
+    """Nodo persona como el que arma app/dossiers.person_node a partir de un dossier."""
+    doc = make_dossier(index, rng, records)
+    person = doc["curp_online"]["data"]["registros"][0]
+    buro = doc["buro1"]["data"][0]
+    return {
+        "id": f"person-{person['curp']}",
+        "type": "person",
+        "position": {"x": float(index % 100) * 240, "y": float(index // 100) * 260},
+        "data": {
+            "name": buro["nombre_completo"],
+            "title": f"CURP: {person['curp']}",
+            "typeDetails": "Persona",
+            "status": "normal",
+            "details": {"RFC": buro["rfc_completo"], "Fec. Nac.": person["fechaNacimiento"],
+                        "ID Doc.": doc["_id"]["$oid"][:10] + "..."},
+            "curp": person["curp"],
+            "rfc": buro["rfc_completo"],
+            "rawJsonData": doc,
+        },
+    }
+
+
+def make_case_company_node(index: int, rng: random.Random, records: int = 3) -> Dict[str, Any]:
+    node = make_company_node(index, rng)
+    node["data"]["details"] = {
+        "RFC": "".join(rng.choices(string.ascii_uppercase, k=3)) + f"{rng.randint(0, 999999):06d}",
+        "Giro": rng.choice(["COMERCIO", "CONSTRUCCIÓN", "SERVICIOS", "TRANSPORTE"]),
+    }
+    # Lista anidada pequeña: se queda en el nodo (bajo PAYLOAD_INLINE_LIMIT)
+    node["data"]["accionistas"] = [{"nombre": f"{rng.choice(NOMBRES)} {rng.choice(APELLIDOS)}",
+                                    "porcentaje": rng.randint(1, 100)} for _ in range(records)]
+    return node
+
+
+def _hub_weights(count: int) -> List[float]:
+    """Pesos acumulados tipo Zipf: pocos nodos concentran muchas aristas (como en un caso real)."""
+    cumulative, total = [], 0.0
+    for rank in range(count):
+        total += 1.0 / (rank + 1) ** 0.8
+        cumulative.append(total)
+    return cumulative
+
+
+def make_case_edges(nodes: List[Dict[str, Any]], edges_per_node: float, rng: random.Random) -> List[Dict[str, Any]]:
+    """Aristas tipadas según los tipos de sus extremos; los destinos siguen una distribución sesgada."""
+    by_type: Dict[str, List[Dict[str, Any]]] = {"person": [], "company": []}
+    for node in nodes:
+        by_type.setdefault(node["type"], []).append(node)
+    weights = {node_type: _hub_weights(len(group)) for node_type, group in by_type.items()}
+    pairs = [pair for pair in EDGE_LABELS if by_type.get(pair[0]) and len(by_type.get(pair[1], [])) > 1]
+    edges = []
+    if not pairs:
+        return edges
+    for index in range(int(len(nodes) * edges_per_node)):
+        source_type, target_type = rng.choice(pairs)
+        source = rng.choice(by_type[source_type])
+        target = rng.choices(by_type[target_type], cum_weights=weights[target_type])[0]
+        if target is source:
+            continue
+        label = rng.choice(EDGE_LABELS[(source_type, target_type)])
+        edges.append({"id": f"edge-{index}", "source": source["id"], "target": target["id"], "label": label,
+                      "data": {"label": label, "fuente": rng.choice(["buro1", "rpc", "sat"])}})
+    return edges
+
+
+def make_case_graph(num_nodes: int, company_ratio: float = 0.2, seed: int = 42, edges_per_node: float = 1.5,
+                    records: int = 3) -> Dict[str, List[Dict[str, Any]]]:
+    """Payload `{nodes, edges}` de un caso realista con `num_nodes` nodos (ver el docstring del módulo)."""
+    rng = random.Random(seed)
+    nodes = []
+    for index in range(num_nodes):
+        if rng.random() < company_ratio:
+            nodes.append(make_case_company_node(index, rng, records))
+        else:
+            nodes.append(make_dossier_person_node(index, rng, records))
+    return {"nodes": nodes, "edges": make_case_edges(nodes, edges_per_node, rng)}
+
+
+def perturb_graph(data: Dict[str, List[Dict[str, Any]]], changed: float = 0.05, removed: float = 0.01,
+                  added: float = 0.01, seed: int = 7, records: int = 3,
+                  rng: Optional[random.Random] = None) -> Dict[str, List[Dict[str, Any]]]:
+    """Copia de `data` con una fracción de nodos modificados, quitados y nuevos (para ingest incremental)."""
+    rng = rng or random.Random(seed)
+    kept = []
+    for node in data["nodes"]:
+        if rng.random() < removed:
+            continue
+        if rng.random() < changed:
+            node = copy.deepcopy(node)
+            node["data"]["status"] = rng.choice(["revisado", "alerta"])
+            node["position"] = {"x": node["position"]["x"] + 40.0, "y": node["position"]["y"]}
+        kept.append(node)
+    start = len(data["nodes"])
+    kept.extend(make_dossier_person_node(start + index, rng, records)
+                for index in range(int(len(data["nodes"]) * added)))
+    kept_ids = {node["id"] for node in kept}
+    edges = [edge for edge in data["edges"] if edge["source"] in kept_ids and edge["target"] in kept_ids]
+    return {"nodes": kept, "edges": edges}
@@ -0,0 +1,61 @@
+# backend/tests/conftest.py
+# Los tests corren la app completa en proceso contra el backend en memoria de
+# benchmarks/fakes.py, así que no necesitan Redis.
+import asyncio
+import json
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+import pytest
+
+from benchmarks.fakes import FakeRedis, install_fake_backend
+from benchmarks.suite import asgi_request
+
+from app import auth, cache
+from app.main import app
+
+
+class Client:
+    """Peticiones ASGI a la app; `login` guarda el token del usuario de prueba."""
+
+    def __init__(self, fake: FakeRedis):
+        self.fake = fake
+        self.headers: Dict[str, str] = {}
+
+    async def request(self, method: str, path: str, payload: Optional[Any] = None) -> Tuple[int, Any]:
+        headers = dict(self.headers)
+        body = b""
+        if payload is not None:
+            headers["Content-Type"] = "application/json"
+            body = json.dumps(payload).encode()
+        status, response = await asgi_request(app, method, path, headers, body)
+        try:
+            return status, json.loads(response) if response else None
+        except ValueError:
+            return status, response
+
+    async def login(self, username: str = "testuser", password: str = "testpassword"):
+        form = urllib.parse.urlencode({"username": username, "password": password}).encode()
+        status, response = await asgi_request(app, "POST", "/token",
+                                              {"Content-Type": "application/x-www-form-urlencoded"}, form)
+        assert status == 200, response
+        self.headers["Authorization"] = f"Bearer {json.loads(response)['access_token']}"
+
+
+@pytest.fixture
+def run_app() -> Callable[[Callable[[Client], Awaitable[None]]], None]:
+    """Corre `scenario(client)` dentro del ciclo de vida de la app, con un backend en memoria nuevo."""
+    fake = install_fake_backend()
+    cache.graph_cache.clear()  # Las versiones del grafo vuelven a empezar con cada backend nuevo
+    # El shutdown de la app cierra el pool de bcrypt; cada test arranca la app de nuevo.
+    auth.password_executor = ThreadPoolExecutor(max_workers=auth.PASSWORD_HASH_WORKERS)
+
+    def run(scenario: Callable[[Client], Awaitable[None]]):
+        async def main():
+            async with app.router.lifespan_context(app):
+                await scenario(Client(fake))
+
+        asyncio.run(main())
+
+    return run
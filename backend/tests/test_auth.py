@@ -0,0 +1,30 @@
+# backend/tests/test_auth.py
+from app import auth, crud
+
+
+def test_disabled_user_is_rejected_on_next_request(run_app):
+    async def scenario(client):
+        await client.login()
+        status, _ = await client.request("GET", "/users/me/")
+        assert status == 200  # el token queda en la caché
+        assert await auth.set_user_disabled("testuser")
+        status, _ = await client.request("GET", "/users/me/")
+        assert status == 401
+
+    run_app(scenario)
+
+
+def test_disable_from_another_worker_invalidates_cached_token(run_app):
+    async def scenario(client):
+        await client.login()
+        status, _ = await client.request("GET", "/users/me/")
+        assert status == 200
+        # Lo que hace set_user_disabled en otro worker: guardar y publicar, sin tocar esta caché.
+        user = await auth.user_store.get("testuser")
+        user.disabled = True
+        await auth.user_store.put(user)
+        await crud.run_db(crud.redis_conn.publish, auth.TOKEN_INVALIDATION_CHANNEL, "testuser")
+        status, _ = await client.request("GET", "/users/me/")
+        assert status == 401
+
+    run_app(scenario)
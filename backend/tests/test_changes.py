@@ -0,0 +1,21 @@
+# backend/tests/test_changes.py
+import asyncio
+
+from app import changes, crud
+
+
+def test_one_reader_serves_feeds_of_many_graphs(run_app):
+    async def scenario(client):
+        keys = [f"graph{i}:{crud.CHANGES_SUFFIX}" for i in range(8)]
+        feeds = [changes.get_feed(key) for key in keys]
+        queues = [await feed.subscribe() for feed in feeds]
+        for key in keys:
+            await crud.run_db(crud.redis_conn.xadd, key, {"type": "nodes_upserted", "items": "[]"})
+        for key, queue in zip(keys, queues):
+            event = await asyncio.wait_for(queue.get(), changes.READ_BLOCK_MS / 2000)
+            assert event.type == "nodes_upserted", key
+        for feed, queue in zip(feeds, queues):
+            feed.unsubscribe(queue)
+        assert not changes._reader.positions and not changes._feeds
+
+    run_app(scenario)
@@ -0,0 +1,40 @@
+# backend/tests/test_dossiers.py
+import json
+
+from app import crud, dossiers
+
+GRAPH = "dossier-test"
+CURP = "PEXJ800101HDFRRN09"
+
+
+def dossier(name):
+    return {"curp_online": {"data": {"registros": [{"curp": CURP}]}},
+            "buro1": {"data": [{"nombre_completo": name}]}}
+
+
+def test_matched_person_keeps_position_and_analyst_fields(run_app):
+    async def scenario(client):
+        await client.login()
+        existing = {"id": "p1", "type": "person", "position": {"x": 120.0, "y": -40.0},
+                    "data": {"name": "Juan", "curp": CURP, "notes": "visto en 2021",
+                             "tags": ["interés"], "rawJsonData": {"old": True}}}
+        status, body = await client.request("POST", f"/graph/load-json?graph={GRAPH}",
+                                            {"mode": "overwrite", "jsonData": {"nodes": [existing], "edges": []}})
+        assert status == 200, body
+
+        await crud.open_graph(GRAPH)
+        summary = await dossiers.import_dossiers([("a.json", json.dumps(dossier("JUAN PEREZ LOPEZ")).encode())])
+        assert summary["matched_existing"] == 1 and summary["report"]["updated"] == 1
+
+        status, body = await client.request("GET", f"/graph-data/?graph={GRAPH}")
+        assert status == 200, body
+        [node] = body["nodes"]
+        assert node["id"] == "p1"
+        assert node["position"] == {"x": 120.0, "y": -40.0}
+        assert node["data"]["name"] == "JUAN PEREZ LOPEZ"
+        assert node["data"]["notes"] == "visto en 2021" and node["data"]["tags"] == ["interés"]
+        status, details = await client.request("GET", f"/node-details/p1?graph={GRAPH}")
+        assert status == 200, details
+        assert details["data"]["rawJsonData"] == dossier("JUAN PEREZ LOPEZ")
+
+    run_app(scenario)
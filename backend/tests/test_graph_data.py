@@ -0,0 +1,26 @@
+# backend/tests/test_graph_data.py
+import pytest
+
+from app import crud
+
+GRAPH = "?graph=stream-test"
+
+
+def test_stream_error_aborts_response(run_app, monkeypatch):
+    async def scenario(client):
+        await client.login()
+        node = {"id": "p1", "type": "person", "position": {"x": 0, "y": 0}, "data": {"name": "Ana"}}
+        status, body = await client.request("POST", "/graph/load-json" + GRAPH,
+                                            {"mode": "overwrite", "jsonData": {"nodes": [node], "edges": []}})
+        assert status == 200, body
+
+        async def failing_edges(*args, **kwargs):
+            raise RuntimeError("Redis se fue")
+
+        monkeypatch.setattr(crud, "get_edges_from_sources", failing_edges)
+        for stream in ("json", "ndjson"):
+            # Sin el error, el cliente recibiría un 200 con un documento cortado.
+            with pytest.raises(RuntimeError):
+                await client.request("GET", f"/graph-data/{GRAPH}&stream={stream}")
+
+    run_app(scenario)
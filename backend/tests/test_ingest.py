@@ -0,0 +1,79 @@
+# backend/tests/test_ingest.py
+GRAPH = "?graph=ingest-test"
+
+
+def person(node_id, name, raw=None):
+    data = {"name": name}
+    if raw is not None:
+        data["rawJsonData"] = raw
+    return {"id": node_id, "type": "person", "position": {"x": 0, "y": 0}, "data": data}
+
+
+def edge(edge_id, source, target, label):
+    return {"id": edge_id, "source": source, "target": target, "label": label}
+
+
+async def load(client, mode, nodes, edges=()):
+    status, body = await client.request("POST", "/graph/load-json" + GRAPH,
+                                        {"mode": mode, "jsonData": {"nodes": nodes, "edges": list(edges)}})
+    assert status == 200, body
+    return body["report"]
+
+
+async def graph_data(client):
+    status, body = await client.request("GET", "/graph-data/" + GRAPH)
+    assert status == 200, body
+    return body
+
+
+async def graph_nodes(client):
+    return {node["id"]: node for node in (await graph_data(client))["nodes"]}
+
+
+async def graph_edges(client):
+    return sorted((e["id"], e["source"], e["target"], e["label"]) for e in (await graph_data(client))["edges"])
+
+
+def test_resend_without_payload_keeps_details(run_app):
+    async def scenario(client):
+        await client.login()
+        await load(client, "overwrite", [person("p1", "Ana", raw={"curp": "X" * 18})])
+        for mode in ("merge", "incremental", "merge"):
+            await load(client, mode, [person("p1", "Ana")])
+            assert (await graph_nodes(client))["p1"]["data"].get("hasDetails") is True, mode
+        status, details = await client.request("GET", "/node-details/p1" + GRAPH + "&type=person")
+        assert status == 200 and details, details
+        report = await load(client, "merge", [person("p1", "Ana")])
+        assert report["unchanged"] == 1
+
+    run_app(scenario)
+
+
+def test_merge_replaces_edge_with_changed_type_or_endpoints(run_app):
+    async def scenario(client):
+        await client.login()
+        nodes = [person(f"p{i}", f"Persona {i}") for i in range(4)]
+        await load(client, "overwrite", nodes, [edge("e1", "p0", "p1", "Socio de"), edge("e2", "p0", "p2", "Socio de")])
+        report = await load(client, "merge", [], [edge("e1", "p0", "p1", "Familiar de"),  # cambia el tipo
+                                                   edge("e2", "p3", "p2", "Socio de")])   # cambia el origen
+        assert await graph_edges(client) == [("e1", "p0", "p1", "Familiar de"), ("e2", "p3", "p2", "Socio de")]
+        report = await load(client, "merge", [], [edge("e1", "p0", "p1", "Familiar de")])
+        assert report["edges_unchanged"] == 1
+        assert len(await graph_edges(client)) == 2
+
+    run_app(scenario)
+
+
+def test_merge_relabel_replaces_node_and_keeps_its_edges(run_app):
+    async def scenario(client):
+        await client.login()
+        await load(client, "overwrite", [person("p1", "Ana"), person("p2", "Luis")],
+                   [edge("e1", "p1", "p2", "Socio de")])
+        relabeled = {"id": "p1", "type": "company", "position": {"x": 0, "y": 0}, "data": {"name": "Ana SA"}}
+        report = await load(client, "merge", [relabeled])
+        assert report["updated"] == 1
+        nodes = await graph_nodes(client)
+        assert len(nodes) == 2 and nodes["p1"]["type"] == "company"
+        assert await graph_edges(client) == [("e1", "p1", "p2", "Socio de")]
+
+    run_app(scenario)
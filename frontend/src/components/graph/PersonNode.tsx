@@ -132,12 +132,12 @@ const PersonNode: React.FC<NodeProps<DemoNodeData>> = ({ data, selected, id: nod
             <div className="flex items-center gap-2">
               <Fingerprint size={14} className="text-accent-main" />
               <span className="text-text-secondary">CURP:</span>
-              <span className="text-text-primary">{data.rawJsonData?.curp_online?.data?.registros?.[0]?.curp || 'N/A'}</span>
+              <span className="text-text-primary">{data.curp || data.rawJsonData?.curp_online?.data?.registros?.[0]?.curp || 'N/A'}</span>
             </div>
             <div className="flex items-center gap-2">
               <Briefcase size={14} className="text-accent-main" />
               <span className="text-text-secondary">RFC:</span>
-              <span className="text-text-primary">{data.rawJsonData?.buro1?.data?.[0]?.rfc_completo || 'N/A'}</span>
+              <span className="text-text-primary">{data.rfc || data.rawJsonData?.buro1?.data?.[0]?.rfc_completo || 'N/A'}</span>
             </div>
           </div>
 
@@ -8,8 +8,27 @@ export const config = {
       login: `${API_BASE_URL}/token`,
       graphData: `${API_BASE_URL}/graph-data/`,
       loadJson: `${API_BASE_URL}/graph/load-json`,
+      importDossiers: `${API_BASE_URL}/graph/import-dossiers`,
+      snapshot: `${API_BASE_URL}/graph/snapshot`,
+      changes: (token: string) => `${API_BASE_URL}/graph/changes?token=${encodeURIComponent(token)}`,
+      layout: (algorithm = 'force', incremental = false) =>
+        `${API_BASE_URL}/graph/layout?algorithm=${algorithm}&incremental=${incremental}`,
+      job: (jobId: string) => `${API_BASE_URL}/graph/jobs/${encodeURIComponent(jobId)}`,
       deleteNode: (nodeId: string) => `${API_BASE_URL}/graph/node/${nodeId}`,
+      nodeDetails: (nodeId: string, nodeType?: string) =>
+        `${API_BASE_URL}/node-details/${encodeURIComponent(nodeId)}${nodeType ? `?type=${encodeURIComponent(nodeType)}` : ''}`,
+      neighborhood: (nodeId: string, hops = 1) =>
+        `${API_BASE_URL}/graph/neighborhood/${encodeURIComponent(nodeId)}?hops=${hops}`,
+      viewport: (xMin: number, yMin: number, xMax: number, yMax: number) =>
+        `${API_BASE_URL}/graph/viewport?x_min=${xMin}&y_min=${yMin}&x_max=${xMax}&y_max=${yMax}`,
+      search: (query: string, offset = 0, limit = 20) =>
+        `${API_BASE_URL}/graph/search?q=${encodeURIComponent(query)}&offset=${offset}&limit=${limit}`,
+      graphs: `${API_BASE_URL}/graphs`,
+      deleteGraph: (name: string) => `${API_BASE_URL}/graphs/${encodeURIComponent(name)}`,
     },
+    // Los endpoints del grafo operan sobre el workspace por defecto salvo que se indique `graph`.
+    withGraph: (url: string, graph?: string) =>
+      graph ? `${url}${url.includes('?') ? '&' : '?'}graph=${encodeURIComponent(graph)}` : url,
   },
   // Add other configuration as needed
 } as const;
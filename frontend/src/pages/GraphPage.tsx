@@ -143,16 +143,36 @@ export const GraphPage: React.FC = () => {
   // --- RESTO DE LOS HOOKS Y FUNCIONES ---
 
   const onNodeClick = useCallback(
-    (event: ReactMouseEvent, node: Node<DemoNodeData>) => {
+    async (event: ReactMouseEvent, node: Node<DemoNodeData>) => {
       if (node.data?.rawJsonData) {
         setDetailsNode(node);
         setIsDetailPanelVisible(true);
-      } else {
-        setDetailsNode(null);
-        setIsDetailPanelVisible(false);
+        return;
+      }
+      setDetailsNode(null);
+      setIsDetailPanelVisible(false);
+      if (!node.data?.hasDetails) return;
+
+      // El documento completo no viene con /graph-data/: se pide bajo demanda.
+      const token = localStorage.getItem('access_token');
+      if (!token) return;
+      try {
+        const response = await fetch(config.api.endpoints.nodeDetails(node.id, node.type), {
+          headers: { 'Authorization': `Bearer ${token}` },
+        });
+        if (!response.ok) throw new Error(`Error API (${response.status}): ${response.statusText}`);
+        const details = await response.json();
+        const rawJsonData = details?.data?.rawJsonData;
+        if (!rawJsonData) return;
+        const nodeWithDetails = { ...node, data: { ...node.data, rawJsonData } };
+        setNodes(nds => nds.map(n => (n.id === node.id ? { ...n, data: { ...n.data, rawJsonData } } : n)));
+        setDetailsNode(nodeWithDetails);
+        setIsDetailPanelVisible(true);
+      } catch (error) {
+        console.error("onNodeClick: Error cargando detalles del nodo:", error);
       }
     },
-    []
+    [setNodes]
   );
 
   const onNodesChange: OnNodesChange = useCallback(
@@ -284,7 +304,10 @@ export const GraphPage: React.FC = () => {
             name: nFromApi.data?.name || "Sin Nombre",
             typeDetails: nFromApi.data?.typeDetails || "Sin Detalles",
             status: nFromApi.data?.status || "normal",
-            rawJsonData: nFromApi.data?.rawJsonData || {},
+            rawJsonData: nFromApi.data?.rawJsonData,
+            hasDetails: nFromApi.data?.hasDetails,
+            curp: nFromApi.data?.curp,
+            rfc: nFromApi.data?.rfc,
             imageUrl: nFromApi.data?.imageUrl,
             title: nFromApi.data?.title,
             icon: nFromApi.data?.icon,
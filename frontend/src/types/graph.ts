@@ -9,6 +9,9 @@ export interface DemoNodeData {
   title?: string;
   location?: string;
   rawJsonData?: any; // To store the complete JSON data for the person
+  hasDetails?: boolean; // rawJsonData vive en el backend; se pide a /node-details/ al abrir el nodo
+  curp?: string;
+  rfc?: string;
   imageUrl?: string; // For profile image
   onImageUpload?: (nodeId: string, file: File) => void; // For image upload functionality
   onDelete?: (nodeId: string) => void; // Nuevo callback para eliminar
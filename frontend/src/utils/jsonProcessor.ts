@@ -146,6 +146,8 @@ export const processJsonToSinglePersonNode = (
       title: `CURP: ${personInfo.curp}`, // Se mostrará debajo del nombre
       typeDetails: 'Persona', // Para consistencia con DemoNodeData
       status: 'normal',
+      ...(personInfo.curp !== "N/A" && { curp: personInfo.curp }),
+      ...(personInfo.rfc !== "N/A" && { rfc: personInfo.rfc }),
       details: { // Estos son los detalles que se muestran en el nodo mismo
           ...(personInfo.rfc !== "N/A" && { RFC: personInfo.rfc }),
           ...(personInfo.otherKeyData.fechaNacimiento && { "Fec. Nac.": personInfo.otherKeyData.fechaNacimiento }),